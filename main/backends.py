@@ -0,0 +1,268 @@
+# main/backends.py
+"""
+Pool of Ollama endpoints with least-outstanding-requests routing, model
+affinity, active health checks and a per-host circuit breaker that ejects
+failing hosts and re-admits them after a successful probe or trial request.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+from urllib.parse import urljoin
+
+import requests
+
+from .metrics import metrics
+
+DEFAULT_BASE_URL = "http://localhost:11434"
+HOSTS_ENV_VAR = "OLLAMA_HOSTS"  # Comma-separated endpoint list for the default pool
+
+
+class BackendUnavailableError(requests.RequestException):
+    """Raised when no backend can take a request."""
+
+
+class CircuitOpenError(BackendUnavailableError):
+    """Raised when every remaining backend has an open circuit."""
+
+
+@dataclass
+class Backend:
+    """State of a single Ollama endpoint."""
+    url: str
+    healthy: bool = True
+    outstanding: int = 0
+    consecutive_failures: int = 0
+    models: Set[str] = field(default_factory=set)  # Models installed on the host (/api/tags)
+    loaded_models: Set[str] = field(default_factory=set)  # Models resident in memory (/api/ps)
+    last_checked: float = 0.0
+    open_until: float = 0.0  # Circuit stays open (no traffic) until this time
+    trial_in_flight: bool = False  # Half-open: one trial request is probing the host
+
+    @property
+    def api_generate(self) -> str:
+        return urljoin(self.url, "/api/generate")
+
+    def has_model(self, model: str) -> bool:
+        """True if the host reports the model (with or without a :tag suffix)."""
+        return model in self.models or f"{model}:latest" in self.models
+
+    def has_loaded(self, model: str) -> bool:
+        """True if the model is currently loaded on the host."""
+        return model in self.loaded_models or f"{model}:latest" in self.loaded_models
+
+
+class BackendPool:
+    """Routes requests across Ollama endpoints."""
+
+    def __init__(self, urls: Iterable[str], health_interval: float = 10.0, health_timeout: float = 2.0,
+                 failure_threshold: int = 2, affinity_penalty: int = 2, circuit_cooldown: float = 5.0):
+        """
+        Initialize the pool.
+
+        Args:
+            urls: Ollama base URLs.
+            health_interval: Seconds between active health checks.
+            health_timeout: Timeout for each health probe.
+            failure_threshold: Consecutive failures before a host is ejected (circuit opens).
+            affinity_penalty: Outstanding-request equivalent charged to a host that
+                does not have the model loaded (doubled if it lacks the model).
+            circuit_cooldown: Seconds an open circuit waits before allowing one
+                half-open trial request.
+        """
+        self.backends = [Backend(url=url.rstrip("/")) for url in urls]
+        if not self.backends:
+            raise ValueError("BackendPool needs at least one endpoint")
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.failure_threshold = failure_threshold
+        self.affinity_penalty = affinity_penalty
+        self.circuit_cooldown = circuit_cooldown
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+
+    def acquire(self, model: str, exclude: Iterable[Backend] = ()) -> Backend:
+        """
+        Pick a backend and count the request as outstanding on it.
+
+        Ejected hosts are skipped until their circuit cooldown expires, after
+        which a single half-open trial request is let through.
+
+        Args:
+            model: Model the request will use (for affinity).
+            exclude: Backends already tried for this request.
+
+        Returns:
+            The chosen Backend; pair with release().
+
+        Raises:
+            BackendUnavailableError: If every backend is excluded.
+            CircuitOpenError: If every remaining backend's circuit is open.
+        """
+        excluded = {id(b) for b in exclude}
+        with self._lock:
+            candidates = [b for b in self.backends if id(b) not in excluded]
+            if not candidates:
+                raise BackendUnavailableError("No Ollama backend available")
+            now = time.monotonic()
+            candidates = [
+                b for b in candidates
+                if b.healthy or (now >= b.open_until and not b.trial_in_flight)
+            ]
+            if not candidates:
+                metrics.increment("backends.circuit_rejections")
+                raise CircuitOpenError("All Ollama backends are failing; circuit open")
+            backend = min(candidates, key=lambda b: (not b.healthy, self._score(b, model)))
+            if not backend.healthy:
+                backend.trial_in_flight = True
+            backend.outstanding += 1
+            return backend
+
+    def release(self, backend: Backend, success: Optional[bool]):
+        """
+        Finish a request on a backend.
+
+        Args:
+            backend: Backend returned by acquire().
+            success: False if the request failed because of the backend; None
+                for best-effort requests whose outcome says nothing about health.
+        """
+        with self._lock:
+            backend.outstanding = max(0, backend.outstanding - 1)
+            backend.trial_in_flight = False
+            if success:
+                self._record_success(backend)
+            elif success is not None:
+                self._record_failure(backend)
+
+    @contextmanager
+    def lease(self, model: str, exclude: Iterable[Backend] = ()) -> Iterator[Backend]:
+        """Context manager around acquire()/release(); exceptions count as failures."""
+        backend = self.acquire(model, exclude)
+        success = False
+        try:
+            yield backend
+            success = True
+        finally:
+            self.release(backend, success)
+
+    def may_have_model(self, model: str) -> bool:
+        """
+        True unless every host that has reported its models (via health checks) lacks ``model``.
+
+        Hosts that have not been probed yet are not counted, so before the
+        first health check every model may be available.
+        """
+        with self._lock:
+            reported = [b for b in self.backends if b.models]
+            return not reported or any(b.has_model(model) for b in reported)
+
+    def check_health(self):
+        """Probe every backend once, refreshing model lists and health."""
+        for backend in self.backends:
+            try:
+                tags = requests.get(urljoin(backend.url, "/api/tags"), timeout=self.health_timeout)
+                tags.raise_for_status()
+                models = {m.get("name", "") for m in tags.json().get("models", [])}
+                try:
+                    ps = requests.get(urljoin(backend.url, "/api/ps"), timeout=self.health_timeout)
+                    loaded = {m.get("name", "") for m in ps.json().get("models", [])} if ps.ok else set()
+                except (requests.RequestException, ValueError):
+                    loaded = set()
+                with self._lock:
+                    self._record_success(backend)
+                    backend.models = models
+                    backend.loaded_models = loaded
+                    backend.last_checked = time.time()
+            except (requests.RequestException, ValueError):
+                with self._lock:
+                    self._record_failure(backend)
+                    backend.last_checked = time.time()
+
+    def start_health_checks(self):
+        """Start the background health-check thread (idempotent)."""
+        if self._health_thread and self._health_thread.is_alive():
+            return
+        self._stop.clear()
+        self._health_thread = threading.Thread(target=self._health_loop, name="ollama-health", daemon=True)
+        self._health_thread.start()
+
+    def stop(self):
+        """Stop the health-check thread."""
+        self._stop.set()
+        if self._health_thread:
+            self._health_thread.join(timeout=self.health_timeout + 1)
+
+    def status(self) -> List[Dict]:
+        """Snapshot of backend state for diagnostics."""
+        with self._lock:
+            return [
+                {
+                    "url": b.url,
+                    "healthy": b.healthy,
+                    "outstanding": b.outstanding,
+                    "consecutive_failures": b.consecutive_failures,
+                    "circuit": "closed" if b.healthy else ("half-open" if b.trial_in_flight else "open"),
+                    "loaded_models": sorted(b.loaded_models),
+                }
+                for b in self.backends
+            ]
+
+    def _score(self, backend: Backend, model: str) -> int:
+        """Lower is better: outstanding requests plus a model-affinity penalty."""
+        if backend.has_loaded(model):
+            return backend.outstanding
+        if backend.has_model(model) or not backend.models:
+            return backend.outstanding + self.affinity_penalty
+        return backend.outstanding + 2 * self.affinity_penalty
+
+    def _record_success(self, backend: Backend):
+        """Reset failures and close the circuit (lock held)."""
+        if not backend.healthy:
+            metrics.increment("backends.readmitted")
+        backend.healthy = True
+        backend.consecutive_failures = 0
+
+    def _record_failure(self, backend: Backend):
+        """Count a failure and open the circuit at the threshold (lock held)."""
+        backend.consecutive_failures += 1
+        if backend.consecutive_failures >= self.failure_threshold:
+            if backend.healthy:
+                metrics.increment("backends.ejected")
+            backend.healthy = False
+            backend.open_until = time.monotonic() + self.circuit_cooldown
+
+    def _health_loop(self):
+        while not self._stop.is_set():
+            self.check_health()
+            self._stop.wait(self.health_interval)
+
+
+_default_pool: Optional[BackendPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool() -> BackendPool:
+    """
+    Process-wide pool built from $OLLAMA_HOSTS (comma-separated), falling back
+    to the local server. Sharing one pool keeps outstanding counts accurate
+    across every assistant in the process.
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            hosts = [h.strip() for h in os.environ.get(HOSTS_ENV_VAR, "").split(",") if h.strip()]
+            _default_pool = BackendPool(hosts or [DEFAULT_BASE_URL])
+            if len(_default_pool.backends) > 1:
+                _default_pool.start_health_checks()
+        return _default_pool
+
+
+if __name__ == "__main__":
+    pool = get_default_pool()
+    pool.check_health()
+    for entry in pool.status():
+        print(entry)
@@ -0,0 +1,266 @@
+# main/batch.py
+"""
+Offline batch inference: runs a JSONL file of prompts through the MCP pipeline
+with bounded concurrency (requests spread over the backend pool) and writes
+JSONL results with generation stats. Items that succeed are checkpointed so
+an interrupted run resumes where it stopped; failed items are written with
+their error and retried on the next run, after compact_output() has dropped
+their earlier records so each id appears in the output once.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Dict, IO, Iterator, Optional, Set, Tuple
+
+from .cancellation import CancellationToken
+from .generation import GenerationProfile
+from .mcp import MCP
+
+PROFILE_FIELDS = {f.name for f in fields(GenerationProfile)}
+
+
+@dataclass
+class BatchItem:
+    """One prompt from the input file."""
+    id: str
+    persona: str
+    input: str
+    params: Dict[str, Any]
+
+
+def read_items(path: str) -> Iterator[BatchItem]:
+    """
+    Stream items from a JSONL file of {id?, persona, input, params?}.
+
+    Items without an id get their 1-based line number. Blank lines are skipped.
+
+    Args:
+        path: Input file.
+
+    Yields:
+        BatchItem per line.
+
+    Raises:
+        ValueError: If a line is not valid JSON or has no input.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: {str(e)}")
+            if "input" not in record:
+                raise ValueError(f"{path}:{line_number}: missing 'input'")
+            yield BatchItem(
+                id=str(record.get("id", line_number)),
+                persona=record.get("persona", "generalist"),
+                input=record["input"],
+                params=record.get("params") or {},
+            )
+
+
+class Checkpoint:
+    """Append-only file of completed item ids."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Set[str] = set()
+        self.resuming = os.path.exists(path)  # A previous run used this checkpoint
+        if self.resuming:
+            with open(path, "r", encoding="utf-8") as f:
+                self.done = {line.rstrip("\n") for line in f if line.strip()}
+        self._file = open(path, "a", encoding="utf-8")
+
+    def mark(self, item_id: str):
+        """Record an item as written to the output."""
+        self._file.write(item_id + "\n")
+        self._file.flush()
+        self.done.add(item_id)
+
+    def close(self):
+        self._file.close()
+
+
+def compact_output(path: str, done: Set[str]) -> int:
+    """
+    Rewrite a results file to keep one record per checkpointed id.
+
+    Records of items that are not in the checkpoint (failures, or a result
+    written just before an interruption) are dropped because the resumed run
+    writes them again. The file is replaced atomically.
+
+    Args:
+        path: Results file (JSONL); nothing happens if it does not exist.
+        done: Checkpointed item ids.
+
+    Returns:
+        Number of records dropped.
+    """
+    if not os.path.exists(path):
+        return 0
+    kept: Set[str] = set()
+    dropped = 0
+    temp_path = f"{path}.tmp"
+    with open(path, "r", encoding="utf-8") as src, open(temp_path, "w", encoding="utf-8") as dst:
+        for line in src:
+            if not line.strip():
+                continue
+            try:
+                item_id = str(json.loads(line)["id"])
+            except (json.JSONDecodeError, KeyError, TypeError):
+                item_id = None  # Torn last line from an interrupted write
+            if item_id in done and item_id not in kept:
+                kept.add(item_id)
+                dst.write(line if line.endswith("\n") else line + "\n")
+            else:
+                dropped += 1
+    os.replace(temp_path, path)
+    return dropped
+
+
+class BatchRunner:
+    """Runs BatchItems through an MCP with a fixed number of requests in flight."""
+
+    def __init__(self, mcp: MCP, concurrency: int = 4, ordered: bool = True, session_prefix: str = "batch"):
+        """
+        Initialize the runner.
+
+        Args:
+            mcp: Pipeline to run items through.
+            concurrency: Items processed at once.
+            ordered: Write results in input order (otherwise as they finish).
+            session_prefix: Memory session for items that do not set params.session_id.
+        """
+        self.mcp = mcp
+        self.concurrency = max(1, concurrency)
+        self.ordered = ordered
+        self.session_prefix = session_prefix
+        self.cancel_token = CancellationToken()
+
+    def run_item(self, item: BatchItem) -> Dict[str, Any]:
+        """
+        Run one item to completion.
+
+        ``params`` may carry session_id, collaborate and any GenerationProfile
+        field (max_tokens, temperature, ...), applied on top of the persona's
+        profile.
+
+        Args:
+            item: Item to run.
+
+        Returns:
+            Result record for the output file; 'error' is set if generation
+            failed or was cancelled.
+        """
+        params = dict(item.params)
+        context: Dict[str, Any] = {
+            "current_persona": item.persona.lower(),
+            "session_id": params.pop("session_id", f"{self.session_prefix}-{item.id}"),
+            "collaborate": params.pop("collaborate", False),
+        }
+        overrides = {key: params[key] for key in list(params) if key in PROFILE_FIELDS}
+        if overrides:
+            persona = self.mcp.personas.get(item.persona.lower())
+            base = persona.generation if persona else GenerationProfile()
+            context["generation_profile"] = base.with_overrides(**overrides)
+
+        started = time.monotonic()
+        chunks = []
+        error = None
+        try:
+            for chunk in self.mcp.process_input(item.input, context, cancel_token=self.cancel_token):
+                chunks.append(chunk)
+        except Exception as e:
+            error = str(e)
+        if error is None:
+            # MCP reports generation failures as reply text; the context says whether it failed
+            error = context.get("last_error")
+        if error is None and self.cancel_token.cancelled:
+            error = "cancelled"
+        return {
+            "id": item.id,
+            "persona": item.persona,
+            "input": item.input,
+            "output": "".join(chunks),
+            "error": error,
+            "elapsed": round(time.monotonic() - started, 4),
+            "generation": context.get("last_generation"),
+        }
+
+    def run(self, items: Iterator[BatchItem], out: IO[str], checkpoint: Checkpoint,
+            on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> int:
+        """
+        Process items, skipping those already in the checkpoint.
+
+        At most ``concurrency * 2`` items are read ahead, so memory stays flat
+        for arbitrarily large inputs. In ordered mode a finished item waits
+        until every earlier item has been written.
+
+        Args:
+            items: Items to process.
+            out: Output stream (JSONL).
+            checkpoint: Completed ids; updated after each successful result is written.
+            on_result: Called with each result record as it is written.
+
+        Returns:
+            Number of items processed in this run.
+        """
+        lock = threading.Lock()
+        written = 0
+        pending: Dict[Future, Tuple[int, BatchItem]] = {}
+        finished: Dict[int, Dict[str, Any]] = {}
+        next_index = 0
+        submitted = 0
+
+        def emit(result: Dict[str, Any]):
+            nonlocal written
+            with lock:
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+                if result["error"] is None:
+                    checkpoint.mark(result["id"])  # Failed items run again on resume
+                written += 1
+            if on_result:
+                on_result(result)
+
+        def drain(done):
+            nonlocal next_index
+            for future in done:
+                index, item = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"id": item.id, "persona": item.persona, "input": item.input,
+                              "output": "", "error": str(e), "elapsed": 0.0, "generation": None}
+                if not self.ordered:
+                    emit(result)
+                    continue
+                finished[index] = result
+            while self.ordered and next_index in finished:
+                emit(finished.pop(next_index))
+                next_index += 1
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch") as executor:
+            try:
+                for item in items:
+                    if item.id in checkpoint.done:
+                        continue
+                    pending[executor.submit(self.run_item, item)] = (submitted, item)
+                    submitted += 1
+                    while len(pending) + len(finished) >= self.concurrency * 2:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        drain(done)
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    drain(done)
+            except BaseException:
+                # Ctrl-C: stop in-flight generations; the checkpoint lets the next run resume
+                self.cancel_token.cancel()
+                raise
+        return written
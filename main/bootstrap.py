@@ -0,0 +1,81 @@
+# main/bootstrap.py
+"""
+Builds the assistant stack (tools, personas, memory, MCP) for the entry points.
+
+Construction is cheap on purpose: memory shards open on first use, tools are
+built by the registry the first time they are called, MCP and the tools share
+one backend client resolved on first request, and nothing here touches the
+network. That keeps CLI start-up interactive in well under half a
+second (see scripts/bench_startup.py).
+"""
+from typing import Any, List, Optional, Tuple, Union
+
+from .mcp import MCP
+from .memory import MAINTENANCE_INTERVAL, Memory
+from .memory_archive import DEFAULT_RETENTION_DAYS, DEFAULT_RETENTION_ROWS, RetentionPolicy
+from .memory_shards import ShardedMemory
+from .personas import Persona
+from .tools import ToolRegistry
+
+# (name, color, tone, description) of the built-in personas
+PERSONA_SPECS: List[Tuple[str, str, str, str]] = [
+    ("generalist", "#28a745", "neutral",
+     "Everyday questions, practical advice, planning, writing, summaries, notes and tasks."),
+    ("zen_monk", "#6f42c1", "calm",
+     "Mindfulness, meditation, stress, balance, wellbeing, philosophy, purpose and life advice."),
+    ("shakespeare", "#dc3545", "poetic",
+     "Poetry, poems, sonnets, literature, drama, theatre, storytelling, creative writing and rhetoric."),
+    ("quantum_mentor", "#007bff", "technical",
+     "Physics, quantum mechanics, mathematics, science, engineering, computing, algorithms and "
+     "technical explanations."),
+]
+
+
+def default_tools() -> ToolRegistry:
+    """Registry of the built-in tools (constructed on first use)."""
+    return ToolRegistry.builtin()
+
+
+def default_personas(tools: ToolRegistry, memory: Union[Memory, ShardedMemory]) -> List[Persona]:
+    """The built-in personas sharing one tool set and memory store."""
+    return [Persona(name=name, color=color, tone=tone, tools=tools, memory=memory, description=description)
+            for name, color, tone, description in PERSONA_SPECS]
+
+
+def build_mcp(memory: Optional[Union[Memory, ShardedMemory]] = None, tools: Optional[ToolRegistry] = None,
+              **options: Any) -> MCP:
+    """
+    MCP with the built-in personas and tools.
+
+    Args:
+        memory: Memory store (default: ShardedMemory.shared()).
+        tools: Tool registry (default: default_tools()).
+        **options: Passed to MCP (router, response_cache, ollama).
+
+    Returns:
+        Ready-to-use MCP.
+    """
+    memory = memory if memory is not None else ShardedMemory.shared()
+    tools = tools if tools is not None else default_tools()
+    return MCP(personas=default_personas(tools, memory), tools=tools, memory=memory, **options)
+
+
+def start_memory_maintenance(memory: Optional[Union[Memory, ShardedMemory]] = None,
+                             retention_days: Optional[float] = DEFAULT_RETENTION_DAYS,
+                             retention_rows: Optional[int] = DEFAULT_RETENTION_ROWS,
+                             interval: float = MAINTENANCE_INTERVAL):
+    """
+    Enforce a retention policy in the background (used by the long-running launchers).
+
+    Expired context is moved to the archive segments, not lost; see
+    main/memory_archive.py.
+
+    Args:
+        memory: Memory store (default: ShardedMemory.shared()).
+        retention_days: Oldest context kept per persona, in days (None or 0: no age limit).
+        retention_rows: Rows kept per persona (None or 0: no row limit).
+        interval: Seconds between retention passes.
+    """
+    memory = memory if memory is not None else ShardedMemory.shared()
+    memory.set_retention(RetentionPolicy.bounded(retention_days, retention_rows))
+    memory.start_maintenance(interval)
@@ -0,0 +1,71 @@
+# main/cancellation.py
+"""
+Cancellation tokens shared by the UI, MCP, tools and the Ollama client so an
+abandoned request can close its upstream generation promptly.
+"""
+import threading
+from typing import Callable, List
+
+
+class CancelledError(Exception):
+    """Raised when work is attempted under a cancelled token."""
+
+
+class CancellationToken:
+    """Thread-safe, one-shot cancellation flag with close callbacks."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        """True once cancel() has been called."""
+        return self._event.is_set()
+
+    def cancel(self):
+        """Cancel the token and run registered callbacks (once)."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def register(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Run ``callback`` when the token is cancelled (immediately if it already is).
+
+        Args:
+            callback: Function with no arguments, e.g. ``response.close``.
+
+        Returns:
+            Function that unregisters the callback.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._unregister(callback)
+        callback()
+        return lambda: None
+
+    def raise_if_cancelled(self):
+        """Raise CancelledError if the token has been cancelled."""
+        if self._event.is_set():
+            raise CancelledError("Operation cancelled")
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until cancelled or timeout; returns True if cancelled."""
+        return self._event.wait(timeout)
+
+    def _unregister(self, callback: Callable[[], None]):
+        with self._lock:
+            try:
+                self._callbacks.remove(callback)
+            except ValueError:
+                pass
@@ -0,0 +1,149 @@
+# main/frames.py
+"""
+Streaming decoder for Ollama's NDJSON generate frames.
+
+Replaces iter_lines() + decode + json.loads on the stream path. The socket is
+read in large reads that return as soon as any data is available (a read never
+waits for a full buffer, so tokens are not delayed). All complete frames of a
+read are parsed with one JSON call, as a single array built by turning their
+newlines into commas, so the per-call overhead is paid once per read instead
+of once per token; only a partial trailing frame is carried over to the next
+read. orjson is used when installed, else the stdlib json module. A region
+that is not a valid array (blank lines, a malformed frame) falls back to
+parsing line by line, so errors still point at the bad frame.
+
+Frames are small __slots__ objects exposing response, done, error and the
+timing/count stats of the final frame.
+"""
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import orjson  # Optional fast JSON backend
+except ImportError:
+    orjson = None
+
+STATS_FIELDS = ("total_duration", "load_duration", "prompt_eval_count",
+                "prompt_eval_duration", "eval_count", "eval_duration", "done_reason")
+READ_SIZE = 64 * 1024  # Bytes requested per socket read
+
+
+def stdlib_loads(data: bytes) -> Any:
+    """Parse JSON bytes with the json module."""
+    return json.loads(data)
+
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+_loads: Callable[[bytes], Any] = orjson.loads if orjson is not None else stdlib_loads
+
+
+class Frame:
+    """One decoded stream frame."""
+
+    __slots__ = ("response", "done", "error", "_data")
+
+    def __init__(self, data: Dict[str, Any]):
+        self.response: str = data.get("response") or ""
+        self.done: bool = bool(data.get("done"))
+        self.error: Optional[str] = data.get("error")
+        self._data = data
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Timing/count stats (present on the final frame)."""
+        return {k: self._data[k] for k in STATS_FIELDS if k in self._data}
+
+    def __repr__(self) -> str:
+        return f"Frame(response={self.response!r}, done={self.done}, error={self.error!r})"
+
+
+class FrameDecoder:
+    """Incremental NDJSON decoder: feed raw chunks, get whole frames back."""
+
+    def __init__(self, loads: Optional[Callable[[bytes], Any]] = None):
+        """
+        Initialize the decoder.
+
+        Args:
+            loads: JSON parser accepting bytes (default: orjson, else json).
+        """
+        self._loads = loads or _loads
+        self._pending = bytearray()  # Partial frame carried between chunks
+
+    def feed(self, chunk: bytes) -> List[Frame]:
+        """
+        Decode every complete frame in ``chunk`` (plus any carried-over prefix).
+
+        Args:
+            chunk: Bytes read from the stream.
+
+        Returns:
+            Frames completed by this chunk, in order; blank lines are skipped.
+        """
+        if self._pending:
+            self._pending += chunk
+            data = self._pending
+        else:
+            data = chunk
+        end = data.rfind(b"\n")
+        if end < 0:
+            if data is not self._pending:
+                self._pending += data
+            return []
+        frames = self._decode(data[:end])
+        self._pending = bytearray(data[end + 1:])
+        return frames
+
+    def flush(self) -> List[Frame]:
+        """Decode a final frame that was not newline-terminated."""
+        data, self._pending = bytes(self._pending), bytearray()
+        return self._decode(data)
+
+    def _decode(self, region: bytes) -> List[Frame]:
+        """Frames of newline-separated JSON lines, parsed with one call when possible."""
+        if not region.strip():
+            return []
+        try:
+            values = self._loads(b"[" + region.replace(b"\n", b",") + b"]")
+        except ValueError:
+            values = [self._loads(line) for line in region.split(b"\n") if line.strip()]
+        return [Frame(value) for value in values]
+
+    def iter_frames(self, chunks: Iterable[bytes]) -> Iterator[Frame]:
+        """Frames decoded from an iterable of raw chunks."""
+        for chunk in chunks:
+            yield from self.feed(chunk)
+        yield from self.flush()
+
+
+def iter_chunks(response, read_size: int = READ_SIZE) -> Iterator[bytes]:
+    """
+    Raw body chunks of a streaming requests.Response, as soon as they arrive.
+
+    Uses urllib3's read1(), which returns whatever is available up to
+    ``read_size`` instead of blocking for a full buffer; falls back to
+    iter_content() on urllib3 versions without it.
+    """
+    read1 = getattr(response.raw, "read1", None)
+    if read1 is None:
+        yield from response.iter_content(chunk_size=read_size)
+        return
+    while True:
+        chunk = read1(read_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_frames(response, read_size: int = READ_SIZE) -> Iterator[Frame]:
+    """Decoded frames of a streaming /api/generate response."""
+    return FrameDecoder().iter_frames(iter_chunks(response, read_size))
+
+
+if __name__ == "__main__":
+    decoder = FrameDecoder()
+    stream = b'{"response":"Hel","done":false}\n{"response":"lo","done":false}\n{"response":"","done":true,"eval_count":2}\n'
+    for chunk in (stream[:20], stream[20:45], stream[45:]):
+        for frame in decoder.feed(chunk):
+            print(frame, frame.stats if frame.done else "")
+    print("JSON backend:", JSON_BACKEND)
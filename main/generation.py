@@ -0,0 +1,61 @@
+# main/generation.py
+"""
+Generation profiles: per-persona and per-tool limits (max tokens, context size,
+stop sequences, temperature, wall-clock budget) sent to the Ollama backend so
+tail latency is bounded by configuration rather than by the model.
+"""
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class GenerationProfile:
+    """Limits and sampling options for one kind of generation."""
+    max_tokens: Optional[int] = 512  # Ollama num_predict
+    num_ctx: Optional[int] = None  # Context window; None keeps the model default
+    stop: List[str] = field(default_factory=list)
+    temperature: Optional[float] = None
+    time_budget: Optional[float] = 60.0  # Wall-clock seconds before the reply is truncated
+    truncation_marker: str = " …"  # Appended when a reply is cut short by a limit
+
+    def to_options(self) -> Dict[str, Any]:
+        """Ollama ``options`` for this profile (unset fields are omitted)."""
+        options: Dict[str, Any] = {}
+        if self.max_tokens is not None:
+            options["num_predict"] = self.max_tokens
+        if self.num_ctx is not None:
+            options["num_ctx"] = self.num_ctx
+        if self.stop:
+            options["stop"] = list(self.stop)
+        if self.temperature is not None:
+            options["temperature"] = self.temperature
+        return options
+
+    def with_overrides(self, **changes: Any) -> "GenerationProfile":
+        """Copy of the profile with the given fields replaced."""
+        return replace(self, **changes)
+
+
+DEFAULT_PROFILE = GenerationProfile()
+
+# Built-in personas; unknown personas fall back to DEFAULT_PROFILE
+PERSONA_PROFILES: Dict[str, GenerationProfile] = {
+    'generalist': GenerationProfile(max_tokens=512, temperature=0.7, time_budget=45.0),
+    'zen_monk': GenerationProfile(max_tokens=256, temperature=0.8, time_budget=30.0),
+    'shakespeare': GenerationProfile(max_tokens=300, temperature=0.9, time_budget=30.0,
+                                     stop=["\n\n\n"]),
+    'quantum_mentor': GenerationProfile(max_tokens=768, num_ctx=8192, temperature=0.4, time_budget=60.0),
+}
+
+
+def profile_for_persona(name: str) -> GenerationProfile:
+    """
+    Default generation profile for a persona.
+
+    Args:
+        name: Persona name (case-insensitive).
+
+    Returns:
+        The persona's profile, or DEFAULT_PROFILE.
+    """
+    return PERSONA_PROFILES.get(name.lower(), DEFAULT_PROFILE)
@@ -5,14 +5,31 @@ and streams AI responses using Ollama. Enhanced for advanced tag parsing, reason
 """
 import re
 import json
-from typing import Dict, List, Generator, Optional, Any
-from functools import lru_cache
-import requests
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from typing import Dict, List, Generator, Optional, Any, Iterable, Tuple, Union
 
 from .personas import Persona
-from .tools import Tool
+from .tools import Tool, ToolRegistry
 from .memory import Memory
-from .ollama_assistant import OllamaAssistant
+from .memory_shards import ShardedMemory
+from .ollama_assistant import OllamaAssistant, DoneEvent, ErrorEvent, get_default_assistant
+from .router import ModelRouter, default_router
+from .cancellation import CancellationToken
+from .metrics import metrics
+from .shared_cache import SharedCache, default_response_cache
+
+# Matches @words at the start of the input or after whitespace (so emails are left alone);
+# only names of registered tools are treated as tags
+TAG_PATTERN = re.compile(r"(?:^|(?<=\s))@(\w+)")
+DEFAULT_TOOL_TIMEOUT = 10.0
+MAX_TOOL_WORKERS = 8
+CANCEL_POLL_INTERVAL = 0.1  # Seconds between cancellation checks while waiting on tools
+COLLABORATORS = 2  # Most relevant other personas consulted on complex queries
+WARM_INTERVAL = 60.0  # Minimum seconds between prefetch keep-alive pings per model
 
 
 @dataclass
@@ -26,38 +43,145 @@ class ToolCall:
 class MCP:
     """Coordinates input routing, persona selection, tool execution, and response streaming."""
     
-    def __init__(self, personas: List[Persona], tools: List[Tool], memory: Memory):
+    def __init__(self, personas: List[Persona], tools: Union[List[Tool], ToolRegistry],
+                 memory: Union[Memory, ShardedMemory],
+                 router: Optional[ModelRouter] = None,
+                 response_cache: Optional[Union[SharedCache, Dict[str, str]]] = None,
+                 ollama: Optional[OllamaAssistant] = None):
         """
         Initialize MCP with personas, tools, and memory backend.
         
         Args:
             personas: List of Persona instances.
-            tools: List of Tool instances.
-            memory: Memory backend for context storage.
+            tools: Tool instances, or a ToolRegistry (tools built on first use,
+                results of cacheable tools reused).
+            memory: Memory backend for context storage (Memory or ShardedMemory).
+            router: Model router (default: small/large cascade from main.router).
+            response_cache: Cache for repeated queries (default: shared across
+                worker processes when $QUIETEDGE_SHARED_CACHE is set, else a dict).
+            ollama: Backend client (default: the process-wide shared assistant).
         """
         self.personas = {persona.name.lower(): persona for persona in personas}
-        self.tools = {tool.name.lower(): tool for tool in tools}
+        self.tools = tools if isinstance(tools, ToolRegistry) else ToolRegistry(tools)
         self.memory = memory
-        self.ollama = OllamaAssistant()
-        self.response_cache = {}  # In-memory cache for repeated queries
+        self.ollama = ollama or get_default_assistant()
+        self.router = router or default_router
+        self.response_cache = response_cache if response_cache is not None else default_response_cache()
+        self.tool_executor = ThreadPoolExecutor(max_workers=MAX_TOOL_WORKERS, thread_name_prefix="mcp-tool")
+        self._persona_ranker = None
+        self._ranked_personas: Tuple[Persona, ...] = ()
+        self._warmed_at: Dict[str, float] = {}  # Model -> monotonic time of the last prefetch ping
+        self._warm_lock = threading.Lock()
+
+    @property
+    def persona_ranker(self):
+        """PersonaRanker over the current personas (built on first use, rebuilt if they change)."""
+        personas = tuple(self.personas.values())
+        if self._persona_ranker is None or personas != self._ranked_personas:
+            from .persona_relevance import PersonaRanker  # numpy stays off the start-up path
+            self._persona_ranker = PersonaRanker(personas)
+            self._ranked_personas = personas
+        return self._persona_ranker
 
-    def process_input(self, user_input: str, context: Dict[str, Any]) -> Generator[str, None, None]:
+    def process_input(self, user_input: str, context: Dict[str, Any],
+                      cancel_token: Optional[CancellationToken] = None) -> Generator[str, None, None]:
         """
         Process user input, route to persona/tools, and yield response chunks.
         
+        Cancelling ``cancel_token`` or closing the generator stops tool calls,
+        closes the upstream generation and skips the remaining memory writes.
+        
         Args:
             user_input: Raw user input string.
-            context: Dictionary with current persona and session state.
+            context: Dictionary with current persona and session state; its
+                'session_id' (if any) scopes every memory read and write and
+                'generation_profile' (if any) replaces the persona's limits,
+                and 'collaborators' (if any) caps the personas consulted on
+                complex queries (default COLLABORATORS).
+                After the reply, 'last_generation' holds the model, timings
+                and backend stats; if generation failed, 'last_error' holds
+                the error (the reply then ends with an error message).
+            cancel_token: Optional token the caller cancels to abandon the request.
             
         Yields:
             Response chunks as plain text.
         """
+        cancel_token = cancel_token or CancellationToken()
+        try:
+            yield from self._process_input(user_input, context, cancel_token)
+        except GeneratorExit:
+            # Consumer went away (UI disconnect, new message); stop the backend too
+            cancel_token.cancel()
+            raise
+        finally:
+            if cancel_token.cancelled:
+                metrics.increment("mcp.cancelled")
+
+    def prefetch(self, partial_input: str, context: Dict[str, Any],
+                 cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        """
+        Warm what a request for ``partial_input`` would need, without side effects.
+
+        Reads the persona's memory into the memory cache, runs the
+        ``prefetchable`` tools among its @tags through the tool registry (so
+        the same call on submit is a result-cache hit) and pings the model the
+        router would pick so it is loaded, at most once per WARM_INTERVAL per
+        model. Nothing is stored for the request itself: results for input
+        that is edited before it is sent are simply never looked up.
+
+        Args:
+            partial_input: Text typed so far.
+            context: As for process_input ('current_persona', 'session_id').
+            cancel_token: Token cancelled once the input changes or is sent.
+
+        Returns:
+            What was warmed: 'persona', 'tools' (names run) and 'model'
+            (None unless it was pinged by this call).
+        """
+        cancel_token = cancel_token or CancellationToken()
+        warmed: Dict[str, Any] = {"persona": None, "tools": [], "model": None}
+        if not partial_input.strip() or self._is_switch_command(partial_input):
+            return warmed
+        persona_name = context.get('current_persona', 'generalist').lower()
+        persona = self.personas.get(persona_name) or self.personas.get('generalist')
+        if persona is not None:
+            self.memory.retrieve_context(persona.name, session_id=context.get('session_id'))
+            warmed["persona"] = persona.name
+
+        for tool_call in self._parse_message_tags(partial_input):
+            tool = self.tools.get(tool_call.tool_name)
+            if cancel_token.cancelled:
+                return warmed
+            if tool is None or not tool.prefetchable or not tool_call.input:
+                continue
+            try:
+                self.tools.run(tool_call.tool_name, tool_call.input, tool_call.params, cancel_token)
+                warmed["tools"].append(tool_call.tool_name)
+            except Exception:
+                pass  # Cancelled, or an error the real request will report
+
+        model = self.router.route(partial_input, record=False).model
+        now = time.monotonic()
+        with self._warm_lock:
+            due = now - self._warmed_at.get(model, float("-inf")) >= WARM_INTERVAL
+            if due:
+                self._warmed_at[model] = now
+        if due and not cancel_token.cancelled and self.ollama.warm(model):
+            warmed["model"] = model
+        return warmed
+
+    def _process_input(self, user_input: str, context: Dict[str, Any],
+                       cancel_token: CancellationToken) -> Generator[str, None, None]:
+        """Body of process_input; see there."""
+        session_id = context.get('session_id')
+
         # Handle persona switch
         if self._is_switch_command(user_input):
             new_persona = self._extract_persona_from_command(user_input)
             if new_persona in self.personas:
                 context['current_persona'] = new_persona
-                self.memory.store_context(new_persona, {"last_switch": user_input, "timestamp": time.time()})
+                self.memory.store_context(new_persona, {"last_switch": user_input, "timestamp": time.time()},
+                                          session_id=session_id)
                 yield f"Switched to persona '{new_persona}'"
             else:
                 yield f"Persona '{new_persona}' not found"
@@ -70,28 +194,37 @@ class MCP:
             context['current_persona'] = current_persona_name
         persona = self.personas[current_persona_name]
 
-        # Check for message tags (e.g., @note priority=high)
+        # Check for message tags (e.g., @search meeting @note priority=high Call Bob)
         tool_output: Optional[str] = None
-        tool_call = self._parse_message_tag(user_input)
-        if tool_call:
-            if tool_call.tool_name in self.tools:
-                tool = self.tools[tool_call.tool_name]
-                try:
-                    tool_output = tool.execute(tool_call.input, tool_call.params)
-                    self.memory.store_context(current_persona_name, {
-                        "tool_call": {
-                            "tool_name": tool_call.tool_name,
-                            "input": tool_call.input,
-                            "params": tool_call.params
-                        },
-                        "output": tool_output,
-                        "timestamp": time.time()
-                    })
-                except Exception as e:
-                    yield f"Error executing tool '{tool_call.tool_name}': {str(e)}"
-                    return
+        tool_calls = self._parse_message_tags(user_input)
+        loadable = []
+        for tool_call in tool_calls:
+            if self.tools.get(tool_call.tool_name) is None:  # Registered, but failed to load
+                yield f"Tool '{tool_call.tool_name}' is unavailable\n"
             else:
-                yield f"Tool '{tool_call.tool_name}' not recognized"
+                loadable.append(tool_call)
+        tool_calls = loadable
+        if tool_calls:
+            tool_outputs = []
+            for tool_call, kind, output in self._execute_tool_calls(tool_calls, cancel_token):
+                if kind == "progress":
+                    yield f"[{tool_call.tool_name}] {output}\n"
+                    continue
+                if kind == "error":
+                    yield f"Error executing tool '{tool_call.tool_name}': {output}\n"
+                    continue
+                tool_outputs.append(f"[{tool_call.tool_name}] {output}")
+                self.memory.store_context(current_persona_name, {
+                    "tool_call": {
+                        "tool_name": tool_call.tool_name,
+                        "input": tool_call.input,
+                        "params": tool_call.params
+                    },
+                    "output": output,
+                    "timestamp": time.time()
+                }, session_id=session_id)
+            tool_output = "\n".join(tool_outputs) or None
+            if cancel_token.cancelled:
                 return
 
         # Prepare state for reasoning
@@ -105,33 +238,63 @@ class MCP:
 
         # Multi-step reasoning
         prompt = self._reason_multi_step(state)
-        cache_key = f"{current_persona_name}:{user_input}"
-        if cache_key in self.response_cache:
-            yield self.response_cache[cache_key]
+        # Only a reply built on this session's history is private to it; the rest are
+        # keyed without the session so every session (and worker) can reuse them
+        scope = session_id if session_id and state.get('history_used') else ''
+        cache_key = f"{scope}:{current_persona_name}:{user_input}"
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            context['last_generation'] = {"cached": True}
+            yield cached
             return
 
-        # Stream response
+        # Stream response from the model the router picks for this query
+        decision = self.router.route(user_input)
+        started_at = time.monotonic()
+        ttft = None
         full_response = ""
         try:
-            for chunk in self.ollama.generate_stream(prompt):
+            profile = context.get('generation_profile') or persona.generation
+            for event in self.ollama.generate_events(prompt, cancel_token=cancel_token, model=decision.model,
+                                                     profile=profile):
+                if cancel_token.cancelled:
+                    break
+                if isinstance(event, ErrorEvent):
+                    raise event.error
+                if isinstance(event, DoneEvent):
+                    latency = time.monotonic() - started_at
+                    self.router.record(decision, latency, ttft, event.stats)
+                    context['last_generation'] = {
+                        "model": decision.model, "route": decision.reason, "latency": latency,
+                        "ttft": ttft, "stats": event.stats,
+                    }
+                    if event.stats.get("truncated"):
+                        metrics.increment(f"mcp.truncated.{current_persona_name}")
+                    continue
+                chunk = event.text
+                if ttft is None:
+                    ttft = time.monotonic() - started_at
                 full_response += chunk
                 yield chunk
                 self.memory.store_context(current_persona_name, {
                     "response_chunk": chunk,
                     "timestamp": time.time()
-                })
+                }, session_id=session_id)
+            if cancel_token.cancelled:
+                return
             self.response_cache[cache_key] = full_response
         except Exception as e:
+            context['last_error'] = str(e)
             yield f"Error generating response: {str(e)}"
 
-        # Experiment: Cross-persona collaboration for complex queries
-        if self._is_complex_query(user_input):
-            for chunk in self._collaborate_personas(user_input, context):
+        # Experiment: Cross-persona collaboration for complex queries (context['collaborate']=False skips it)
+        if context.get('collaborate', True) and self._is_complex_query(user_input):
+            for chunk in self._collaborate_personas(user_input, context, cancel_token):
                 yield chunk
 
     def _parse_message_tag(self, user_input: str) -> Optional[ToolCall]:
         """
-        Parse message tags like @note priority=high.
+        Parse the first message tag like @note priority=high.
         
         Args:
             user_input: Input string to parse.
@@ -139,19 +302,102 @@ class MCP:
         Returns:
             ToolCall object or None if no valid tag.
         """
-        if not user_input.strip().startswith("@"):
-            return None
-        match = re.match(r"@(\w+)(?:\s+(.+?))?(?:\s+(.+))?$", user_input.strip())
-        if not match:
-            return None
-        tool_name, input_text, params_str = match.groups()
-        params = {}
-        if params_str:
-            for param in params_str.split():
-                if '=' in param:
-                    key, value = param.split('=', 1)
+        tool_calls = self._parse_message_tags(user_input)
+        return tool_calls[0] if tool_calls else None
+
+    def _parse_message_tags(self, user_input: str) -> List[ToolCall]:
+        """
+        Parse every message tag, e.g. "@search meeting @note priority=high Call Bob".
+        
+        Only @names of registered tools are tags; other @words ("ping @bob")
+        are plain text. Each tag owns the text up to the next tag; key=value
+        tokens become params and the remaining words become the tool input.
+        
+        Args:
+            user_input: Input string to parse.
+            
+        Returns:
+            ToolCall objects in the order they appear (empty if no tags).
+        """
+        text = user_input.strip()
+        matches = [match for match in TAG_PATTERN.finditer(text) if match.group(1).lower() in self.tools]
+        tool_calls = []
+        for i, match in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+            words = []
+            params = {}
+            for token in text[match.end():end].split():
+                if '=' in token and not token.startswith('='):
+                    key, value = token.split('=', 1)
                     params[key.lower()] = value
-        return ToolCall(tool_name=tool_name.lower(), input=input_text or "", params=params)
+                else:
+                    words.append(token)
+            tool_calls.append(ToolCall(tool_name=match.group(1).lower(), input=" ".join(words), params=params))
+        return tool_calls
+
+    def _execute_tool_calls(self, tool_calls: Iterable[ToolCall],
+                            cancel_token: Optional[CancellationToken] = None
+                            ) -> Generator[Tuple[ToolCall, str, str], None, None]:
+        """
+        Run tool calls concurrently and yield results as they complete.
+        
+        Each call is bounded by its tool's ``timeout``; calls that overrun are
+        cancelled (or abandoned if already running) so one hung tool cannot
+        wedge the turn. Cancelling ``cancel_token`` stops waiting and cancels
+        whatever has not finished. While calls run, the latest progress message
+        each one reported (e.g. a chunked summary's chunk count) is yielded
+        once per poll.
+        
+        Args:
+            tool_calls: Parsed tool calls with registered tool names.
+            cancel_token: Optional token forwarded to the tools.
+            
+        Yields:
+            (tool_call, kind, text) tuples; kind is 'progress' for a progress
+            message, then exactly one 'output' or 'error' per call.
+        """
+        progress: "queue.SimpleQueue[Tuple[ToolCall, str]]" = queue.SimpleQueue()
+        futures = {}
+        for tool_call in tool_calls:
+            tool = self.tools[tool_call.tool_name]
+            timeout = getattr(tool, 'timeout', DEFAULT_TOOL_TIMEOUT)
+            report = lambda message, call=tool_call: progress.put((call, message))
+            future = self.tool_executor.submit(self.tools.run, tool_call.tool_name, tool_call.input,
+                                               tool_call.params, cancel_token, report)
+            futures[future] = (tool_call, time.monotonic() + timeout, timeout)
+
+        pending = set(futures)
+        try:
+            while pending:
+                if cancel_token is not None and cancel_token.cancelled:
+                    return
+                next_deadline = min(futures[f][1] for f in pending)
+                wait_timeout = min(max(0.0, next_deadline - time.monotonic()), CANCEL_POLL_INTERVAL)
+                done, pending = wait(pending, timeout=wait_timeout, return_when=FIRST_COMPLETED)
+                latest: Dict[int, Tuple[ToolCall, str]] = {}
+                while not progress.empty():
+                    tool_call, message = progress.get()
+                    latest[id(tool_call)] = (tool_call, message)
+                finished = {id(futures[future][0]) for future in done}
+                for key, (tool_call, message) in latest.items():
+                    if key not in finished:
+                        yield tool_call, "progress", message
+                for future in done:
+                    tool_call = futures[future][0]
+                    try:
+                        yield tool_call, "output", future.result()
+                    except Exception as e:
+                        yield tool_call, "error", str(e)
+
+                now = time.monotonic()
+                for future in [f for f in pending if futures[f][1] <= now]:
+                    tool_call, _, timeout = futures[future]
+                    future.cancel()
+                    pending.discard(future)
+                    yield tool_call, "error", f"timed out after {timeout:g}s"
+        finally:
+            for future in pending:
+                future.cancel()
 
     def _is_switch_command(self, user_input: str) -> bool:
         """Check if input is a persona switch command."""
@@ -173,7 +419,8 @@ class MCP:
         Implement chain-of-thought reasoning for complex queries.
         
         Args:
-            state: Dictionary with user_input, tool_output, context, memory, persona.
+            state: Dictionary with user_input, tool_output, context, memory, persona;
+                'history_used' is set to whether past context went into the prompt.
             
         Returns:
             Formatted prompt for Ollama.
@@ -181,11 +428,14 @@ class MCP:
         user_input = state['user_input']
         persona = state['persona']
         memory = state['memory']
-        past_context = memory.retrieve_context(persona.name)
+        past_context = memory.retrieve_context(persona.name, session_id=state['context'].get('session_id'))
+        state['history_used'] = bool(past_context)
 
         prompt = f"Persona: {persona.name} (Tone: {persona.tone})\n"
         if past_context:
             prompt += f"Previous context: {json.dumps(past_context)}\n"
+        if state.get('tool_output'):
+            prompt += f"Tool results:\n{state['tool_output']}\n"
         prompt += (
             f"Input: {user_input}\n"
             f"Step 1: Identify key components of the query.\n"
@@ -194,34 +444,45 @@ class MCP:
         )
         return prompt
 
-    def _collaborate_personas(self, user_input: str, context: Dict[str, Any]) -> Generator[str, None, None]:
+    def _collaborate_personas(self, user_input: str, context: Dict[str, Any],
+                              cancel_token: Optional[CancellationToken] = None) -> Generator[str, None, None]:
         """
-        Experiment: Route complex queries to multiple personas for collaborative response.
+        Experiment: Route complex queries to the most relevant other personas.
+        
+        Only the top context['collaborators'] personas by PersonaRanker score
+        are consulted, and none that score below its relevance threshold, so
+        backend cost does not grow with the number of personas.
         
         Args:
             user_input: User input string.
             context: Current context dictionary.
+            cancel_token: Token shared with the originating request.
             
         Yields:
             Collaborative response chunks.
         """
-        for persona_name in self.personas:
-            if persona_name != context.get('current_persona'):
-                temp_context = context.copy()
-                temp_context['current_persona'] = persona_name
-                yield f"[{persona_name}]: "
-                for chunk in self.process_input(user_input, temp_context):
-                    yield chunk
+        cancel_token = cancel_token or CancellationToken()
+        limit = int(context.get('collaborators', COLLABORATORS))
+        ranked = self.persona_ranker.top_k(user_input, limit, exclude=[context.get('current_persona')])
+        metrics.increment("mcp.collaborators", len(ranked))
+        for persona_name, _ in ranked:
+            if cancel_token.cancelled:
+                return
+            temp_context = context.copy()
+            temp_context['current_persona'] = persona_name
+            temp_context['collaborate'] = False  # One level only; nested calls would recurse forever
+            yield f"[{persona_name}]: "
+            for chunk in self._process_input(user_input, temp_context, cancel_token):
+                yield chunk
 
 
 if __name__ == "__main__":
     from .personas import Persona
     from .tools import NoteTaker
     from .memory import Memory
-    import time
-    dummy_persona = Persona(name="generalist", color="#28a745", tone="neutral", tools=[NoteTaker()], memory=Memory())
+    dummy_persona = Persona(name="generalist", color="#28a745", tone="neutral", tools=[NoteTaker()], memory=Memory.shared())
     dummy_tools = [NoteTaker()]
-    mcp = MCP(personas=[dummy_persona], tools=dummy_tools, memory=Memory())
+    mcp = MCP(personas=[dummy_persona], tools=dummy_tools, memory=Memory.shared())
     context = {"current_persona": "generalist"}
     for chunk in mcp.process_input("Hello, @note priority=high Meeting at 3pm", context):
         print(chunk, end="")
@@ -1,115 +1,645 @@
 # main/memory.py
 """
 Manages persona-specific context storage with SQLite and auto-summarization.
+
+One Memory per database file is shared process-wide (Memory.shared). Reads use
+a per-thread connection, all writes go through a single writer thread that
+batches them into one transaction, and the database runs in WAL mode so
+readers never block the writer. Auto-summarization runs in the background
+instead of on the caller's thread. The schema is versioned and migrated on
+open (see main/memory_schema.py). The latest context per persona is kept in a
+bounded write-through cache so prompt building normally skips the database.
+Rows outside a persona's retention policy are archived to compressed segment
+files and deleted by a background maintenance job that also compacts the file.
+Contexts can be namespaced by session (see scoped_persona); ShardedMemory in
+main/memory_shards.py spreads sessions over several database files.
 """
 import sqlite3
-import json
+import os
+import queue
+import threading
 import time
-from typing import Dict, Any
-from main.tools.summarize import Summarizer
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Dict, Any, List, Optional, Set
+from main.metrics import metrics
+from main.memory_archive import ArchiveStore, RetentionPolicy
+from main.memory_schema import decode_context, encode_context, migrate
+
+if TYPE_CHECKING:
+    from main.tools.summarize import Summarizer
+
+BUSY_TIMEOUT = 5.0  # Seconds a connection waits on a locked database
+WRITE_BATCH_SIZE = 256  # Max queued writes committed in one transaction
+WRITE_RETRIES = 3
+CACHE_SIZE = 1024  # Personas whose latest context is kept in memory
+ARCHIVE_BATCH_SIZE = 1000  # Rows archived and deleted per write transaction
+MAINTENANCE_INTERVAL = 3600.0  # Seconds between background retention passes
+SESSION_SEPARATOR = "/"  # Joins session id and persona in storage keys
+
+
+class _WriteOp:
+    """A queued write; ``fn`` is None for flush markers."""
+
+    __slots__ = ("fn", "persona", "done")
+
+    def __init__(self, fn: Optional[Callable[[sqlite3.Connection], None]], persona: Optional[str] = None):
+        self.fn = fn
+        self.persona = persona
+        self.done = threading.Event()
+
+
+_STOP = _WriteOp(None)
+
+
+def _shutdown(writes: "queue.Queue", writer: threading.Thread, connections: List[sqlite3.Connection]):
+    """Drain the writer and close connections (used by close() and at exit)."""
+    if writer.is_alive():
+        writes.put(_STOP)
+        writer.join(timeout=BUSY_TIMEOUT * 2)
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    connections.clear()
+
+
+def scoped_persona(persona: str, session_id: Optional[str] = None) -> str:
+    """
+    Storage key for a persona's contexts.
+
+    Args:
+        persona: Persona name (case-insensitive).
+        session_id: Session the context belongs to; None is the global scope.
+
+    Returns:
+        'persona', or 'session_id/persona' for a session.
+    """
+    persona = persona.lower()
+    return f"{session_id}{SESSION_SEPARATOR}{persona}" if session_id else persona
+
+
+class PersonaMemory:
+    """View of a Memory scoped to a single persona (and optionally a session)."""
+
+    def __init__(self, memory: "Memory", persona: str, session_id: Optional[str] = None):
+        self.memory = memory
+        self.persona = persona.lower()
+        self.session_id = session_id
+
+    def store(self, context: Dict[str, Any]):
+        """Store context for this persona."""
+        self.memory.store_context(self.persona, context, session_id=self.session_id)
+
+    def retrieve(self) -> Dict[str, Any]:
+        """Retrieve the latest context for this persona."""
+        return self.memory.retrieve_context(self.persona, session_id=self.session_id)
 
 
 class Memory:
     """Stores and retrieves persona-specific context using SQLite."""
-    
-    def __init__(self, db_path: str = "memory.db"):
+
+    _instances: Dict[str, "Memory"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, db_path: str = "memory.db", cache_size: int = CACHE_SIZE,
+                 retention: Optional[RetentionPolicy] = None, archive_dir: Optional[str] = None):
         """
         Initialize SQLite database for context storage.
-        
+
+        Prefer Memory.shared() so every component in the process uses one
+        writer and one connection pool per database file.
+
         Args:
             db_path: Path to SQLite database file.
+            cache_size: Max personas in the latest-context cache (0 disables it).
+            retention: Default retention policy (None keeps everything).
+            archive_dir: Directory for archive segments (default: '<db_path>.archive').
         """
-        self.conn = sqlite3.connect(db_path)
-        self.cursor = self.conn.cursor()
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS contexts (
-                persona TEXT,
-                context_key TEXT,
-                context_value TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        self.conn.commit()
-        self.summarizer = Summarizer()
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_version = 0  # Bumped on every cache write so stale fills are dropped
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT)  # Before WAL so a new file gets auto_vacuum
+        try:
+            migrate(conn)
+        finally:
+            conn.close()
+
+        self.retention = retention or RetentionPolicy()
+        self.persona_retention: Dict[str, RetentionPolicy] = {}
+        self.archive = ArchiveStore(archive_dir or f"{db_path}.archive")
+        self._maintenance_stop = threading.Event()
+        self._maintenance_thread: Optional[threading.Thread] = None
+
+        self._summarizer: Optional["Summarizer"] = None
         self.max_contexts = 5  # Threshold for auto-summarization
+        self._summarizing: Set[str] = set()
+        self._summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summary")
+
+        self._writes: "queue.Queue[_WriteOp]" = queue.Queue()
+        self._pending = 0  # Writes submitted but not yet committed
+        self._pending_lock = threading.Lock()
+        self._writer = threading.Thread(target=self._writer_loop, name="memory-writer", daemon=True)
+        self._writer.start()
+        self._finalizer = weakref.finalize(self, _shutdown, self._writes, self._writer, self._connections)
 
-    def store_context(self, persona: str, context: Dict[str, Any]):
+    @property
+    def summarizer(self) -> "Summarizer":
+        """Summarizer for auto-summarization (created on first use)."""
+        if self._summarizer is None:
+            from main.tools.summarize import Summarizer  # Imported with the tools, on first use
+            self._summarizer = Summarizer()
+        return self._summarizer
+
+    @classmethod
+    def shared(cls, db_path: str = "memory.db") -> "Memory":
+        """
+        Process-wide Memory for a database file.
+
+        Args:
+            db_path: Path to SQLite database file.
+
+        Returns:
+            The single Memory instance for that path.
+        """
+        key = os.path.abspath(db_path)
+        with cls._instances_lock:
+            memory = cls._instances.get(key)
+            if memory is None:
+                memory = cls._instances[key] = cls(db_path)
+            return memory
+
+    def for_persona(self, persona: str, session_id: Optional[str] = None) -> PersonaMemory:
+        """Namespaced view for one persona."""
+        return PersonaMemory(self, persona, session_id)
+
+    def store_context(self, persona: str, context: Dict[str, Any], wait: bool = False,
+                      session_id: Optional[str] = None):
         """
         Store context for a persona.
-        
+
+        The write is queued for the writer thread; reads from any thread see
+        it because retrieve_context flushes pending writes first.
+
         Args:
             persona: Persona name.
             context: Context dictionary to store.
+            wait: Block until the write is committed.
+            session_id: Session scope; None stores in the global scope.
         """
         try:
-            context_json = json.dumps(context)
-            self.cursor.execute(
-                "INSERT INTO contexts (persona, context_key, context_value) VALUES (?, ?, ?)",
-                (persona.lower(), context.get('context_key', f"ctx_{int(time.time())}"), context_json)
-            )
-            self.conn.commit()
-            self._auto_summarize(persona)
-        except sqlite3.Error as e:
+            value, encoding = encode_context(context)
+        except (TypeError, ValueError) as e:
             print(f"Error storing context: {str(e)}")
+            return
+        persona = scoped_persona(persona, session_id)
+        now = time.time()
+        context_key = context.get('context_key', f"ctx_{int(now)}")
+
+        def insert(conn: sqlite3.Connection):
+            self._insert(conn, persona, context_key, value, encoding, now)
+
+        cached = decode_context(value, encoding)
+        with self._cache_lock:  # Cache and queue order must agree across threads
+            self._cache_version += 1
+            self._cache_put_locked(persona, cached)
+            op = self._submit(insert, persona)
+        if wait:
+            op.done.wait()
 
-    def retrieve_context(self, persona: str) -> Dict[str, Any]:
+    def retrieve_context(self, persona: str, session_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Retrieve the latest context for a persona.
-        
+
         Args:
             persona: Persona name.
-            
+            session_id: Session scope; None reads the global scope.
+
         Returns:
-            Latest context dictionary or empty dict if none found.
+            Latest context dictionary or empty dict if none found. The dict
+            may be shared with the cache; copy it before mutating.
         """
+        persona = scoped_persona(persona, session_id)
+        with self._cache_lock:
+            cached = self._cache.get(persona)
+            if cached is not None:
+                self._cache.move_to_end(persona)
+                metrics.increment("memory.cache.hit")
+                return cached
+            version = self._cache_version
+        metrics.increment("memory.cache.miss")
+
+        self.flush()
         try:
-            self.cursor.execute(
-                "SELECT context_value FROM contexts WHERE persona = ? ORDER BY timestamp DESC LIMIT 1",
-                (persona.lower(),)
+            cursor = self._reader().execute(
+                "SELECT context_value, encoding FROM contexts WHERE persona = ? ORDER BY seq DESC LIMIT 1",
+                (persona,)
             )
-            result = self.cursor.fetchone()
-            return json.loads(result[0]) if result else {}
-        except sqlite3.Error as e:
+            result = cursor.fetchone()
+            context = decode_context(*result) if result else {}
+        except (sqlite3.Error, ValueError) as e:
             print(f"Error retrieving context: {str(e)}")
             return {}
+        with self._cache_lock:
+            if self._cache_version == version:
+                self._cache_put_locked(persona, context)
+        return context
 
-    def _auto_summarize(self, persona: str):
+    def delete_context(self, persona: str, wait: bool = True, session_id: Optional[str] = None):
         """
-        Summarize context if it exceeds max_contexts for a persona.
-        
+        Delete every stored context for a persona.
+
         Args:
             persona: Persona name.
+            wait: Block until the delete is committed.
+            session_id: Session scope; None deletes the global scope.
+        """
+        persona = scoped_persona(persona, session_id)
+
+        def delete(conn: sqlite3.Connection):
+            conn.execute("DELETE FROM contexts WHERE persona = ?", (persona,))
+
+        self._invalidate_key(persona)
+        op = self._submit(delete)
+        if wait:
+            op.done.wait()
+        self._invalidate_key(persona)
+
+    def invalidate(self, persona: Optional[str] = None, session_id: Optional[str] = None):
+        """Drop a persona's cached context, or the whole cache when persona is None."""
+        self._invalidate_key(scoped_persona(persona, session_id) if persona else None)
+
+    def flush(self, timeout: Optional[float] = None):
+        """Block until every write queued so far is committed."""
+        if self._pending == 0 or threading.current_thread() is self._writer:
+            return
+        marker = self._submit(None)
+        marker.done.wait(timeout)
+
+    def set_retention(self, policy: RetentionPolicy, persona: Optional[str] = None):
+        """
+        Set the retention policy for one persona, or the default.
+
+        Args:
+            policy: Limits to enforce.
+            persona: Persona name; None sets the default for all personas.
+        """
+        if persona is None:
+            self.retention = policy
+        else:
+            self.persona_retention[persona.lower()] = policy
+
+    def retention_for(self, persona: str) -> RetentionPolicy:
+        """Effective retention policy for a persona (or a session-scoped storage key)."""
+        name = persona.rsplit(SESSION_SEPARATOR, 1)[-1].lower()
+        return self.persona_retention.get(name, self.retention)
+
+    def run_maintenance(self) -> Dict[str, int]:
         """
+        Run one retention and compaction pass.
+
+        Expired rows are appended to the archive before they are deleted, so
+        a crash in between can only duplicate archived rows, never lose them.
+
+        Returns:
+            {'archived': rows moved to the archive, 'freed_pages': pages released}.
+        """
+        archived = 0
         try:
-            self.cursor.execute("SELECT COUNT(*) FROM contexts WHERE persona = ?", (persona.lower(),))
-            count = self.cursor.fetchone()[0]
-            if count > self.max_contexts:
-                self.cursor.execute(
-                    "SELECT context_value FROM contexts WHERE persona = ? ORDER BY timestamp",
-                    (persona.lower(),)
+            self.flush()
+            conn = self._reader()
+            personas = [row[0] for row in conn.execute("SELECT persona FROM persona_counts WHERE row_count > 1")]
+            for persona in personas:
+                policy = self.retention_for(persona)
+                if policy.is_unbounded():
+                    continue
+                cutoff = self._retention_cutoff(conn, persona, policy)
+                if cutoff is not None:
+                    archived += self._archive_through(conn, persona, cutoff)
+        except (sqlite3.Error, OSError, ValueError) as e:
+            print(f"Error running memory maintenance: {str(e)}")
+        freed = self.compact()
+        metrics.increment("memory.archived_rows", archived)
+        return {"archived": archived, "freed_pages": freed}
+
+    def compact(self, max_pages: int = 0) -> int:
+        """
+        Return free pages to the filesystem and truncate the WAL.
+
+        Files created before incremental vacuum was enabled are rebuilt once
+        with a full VACUUM.
+
+        Args:
+            max_pages: Pages to release per call (0 releases all free pages).
+
+        Returns:
+            Number of pages freed.
+        """
+        try:
+            conn = self._reader()
+            before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+            else:
+                # execute() steps this pragma once (one page); executescript runs it to completion
+                conn.executescript(f"PRAGMA incremental_vacuum({int(max_pages)});")
+            after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+            return max(before - after, 0)
+        except sqlite3.Error as e:
+            print(f"Error compacting memory: {str(e)}")
+            return 0
+
+    def restore_archived(self, persona: Optional[str] = None, since: Optional[float] = None,
+                         until: Optional[float] = None, session_id: Optional[str] = None) -> int:
+        """
+        Re-import archived rows into the live database.
+
+        Rows keep their original sequence numbers, so they sort before newer
+        context and restoring the same rows twice is a no-op.
+
+        Args:
+            persona: Only this persona.
+            since: Only rows with timestamp >= since.
+            until: Only rows with timestamp < until.
+            session_id: Session scope of ``persona``.
+
+        Returns:
+            Number of archived rows submitted for restore.
+        """
+        rows = []
+        key = scoped_persona(persona, session_id) if persona else None
+        for record in self.archive.query(key, since, until):
+            value, encoding = encode_context(record["context"])
+            rows.append((record["seq"], record["persona"], record.get("context_key"), value, encoding,
+                         record.get("timestamp", 0)))
+
+        def restore(conn: sqlite3.Connection):
+            conn.executemany(
+                "INSERT OR IGNORE INTO contexts (seq, persona, context_key, context_value, encoding, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+        if rows:
+            self._submit(restore).done.wait()
+            for name in {row[1] for row in rows}:
+                self._invalidate_key(name)
+        return len(rows)
+
+    def start_maintenance(self, interval: float = MAINTENANCE_INTERVAL):
+        """Start the background retention/compaction thread (idempotent)."""
+        if self._maintenance_thread and self._maintenance_thread.is_alive():
+            return
+        self._maintenance_stop.clear()
+        self._maintenance_thread = threading.Thread(
+            target=self._maintenance_loop, args=(interval,), name="memory-maintenance", daemon=True
+        )
+        self._maintenance_thread.start()
+
+    def stop_maintenance(self):
+        """Stop the background maintenance thread."""
+        self._maintenance_stop.set()
+        if self._maintenance_thread:
+            self._maintenance_thread.join(timeout=BUSY_TIMEOUT * 2)
+
+    def close(self):
+        """Commit pending writes and close all connections."""
+        self.stop_maintenance()
+        self._summary_executor.shutdown(wait=True)
+        self._finalizer()
+
+    def count(self, persona: str, session_id: Optional[str] = None) -> int:
+        """Number of stored contexts for a persona (read from the maintained counter)."""
+        self.flush()
+        try:
+            row = self._reader().execute(
+                "SELECT row_count FROM persona_counts WHERE persona = ?", (scoped_persona(persona, session_id),)
+            ).fetchone()
+            return row[0] if row else 0
+        except sqlite3.Error as e:
+            print(f"Error retrieving context: {str(e)}")
+            return 0
+
+    def _invalidate_key(self, key: Optional[str]):
+        with self._cache_lock:
+            self._cache_version += 1
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+
+    def _cache_put_locked(self, persona: str, context: Dict[str, Any]):
+        if self.cache_size <= 0:
+            return
+        self._cache[persona] = context
+        self._cache.move_to_end(persona)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, persona: str, context_key: str, value, encoding: int, timestamp: float):
+        conn.execute(
+            "INSERT INTO contexts (persona, context_key, context_value, encoding, timestamp) VALUES (?, ?, ?, ?, ?)",
+            (persona, context_key, value, encoding, timestamp)
+        )
+
+    def _maintenance_loop(self, interval: float):
+        while not self._maintenance_stop.wait(interval):
+            self.run_maintenance()
+
+    @staticmethod
+    def _retention_cutoff(conn: sqlite3.Connection, persona: str, policy: RetentionPolicy) -> Optional[int]:
+        """Highest seq that falls outside the policy (the newest row never does)."""
+        latest = conn.execute("SELECT MAX(seq) FROM contexts WHERE persona = ?", (persona,)).fetchone()[0]
+        if latest is None:
+            return None
+        cutoffs = []
+        if policy.max_age is not None:
+            cutoffs.append(conn.execute(
+                "SELECT MAX(seq) FROM contexts WHERE persona = ? AND seq < ? AND timestamp < ?",
+                (persona, latest, time.time() - policy.max_age)
+            ).fetchone()[0])
+        if policy.max_rows is not None:
+            row = conn.execute(
+                "SELECT seq FROM contexts WHERE persona = ? ORDER BY seq DESC LIMIT 1 OFFSET ?",
+                (persona, max(policy.max_rows, 1))
+            ).fetchone()
+            cutoffs.append(row[0] if row else None)
+        if policy.max_bytes is not None:
+            cutoffs.append(conn.execute(
+                "SELECT MAX(seq) FROM ("
+                "  SELECT seq, SUM(length(context_value)) OVER (ORDER BY seq DESC) AS kept"
+                "  FROM contexts WHERE persona = ?"
+                ") WHERE kept > ? AND seq < ?",
+                (persona, policy.max_bytes, latest)
+            ).fetchone()[0])
+        cutoffs = [cutoff for cutoff in cutoffs if cutoff is not None]
+        return max(cutoffs) if cutoffs else None
+
+    def _archive_through(self, conn: sqlite3.Connection, persona: str, cutoff: int) -> int:
+        """Archive then delete a persona's rows with seq <= cutoff, in batches."""
+        archived = 0
+        last_seq = -1
+        while True:
+            rows = conn.execute(
+                "SELECT seq, context_key, context_value, encoding, timestamp FROM contexts "
+                "WHERE persona = ? AND seq > ? AND seq <= ? ORDER BY seq LIMIT ?",
+                (persona, last_seq, cutoff, ARCHIVE_BATCH_SIZE)
+            ).fetchall()
+            if not rows:
+                return archived
+            self.archive.append(
+                {"seq": seq, "persona": persona, "context_key": key,
+                 "context": decode_context(value, encoding), "timestamp": timestamp}
+                for seq, key, value, encoding, timestamp in rows
+            )
+            first_seq, last_seq = rows[0][0], rows[-1][0]
+
+            def delete(write_conn: sqlite3.Connection, first_seq=first_seq, last_seq=last_seq):
+                write_conn.execute(
+                    "DELETE FROM contexts WHERE persona = ? AND seq BETWEEN ? AND ?", (persona, first_seq, last_seq)
                 )
-                contexts = [json.loads(row[0]) for row in self.cursor.fetchall()]
-                context_text = "\n".join(str(c) for c in contexts)
-                summary = self.summarizer.execute(context_text, {"length": "short"})
-                self.cursor.execute("DELETE FROM contexts WHERE persona = ?", (persona.lower(),))
-                self.store_context(persona, {
-                    "context_key": "summary",
-                    "summary": summary,
-                    "timestamp": time.time()
-                })
-                self.conn.commit()
-        except (sqlite3.Error, Exception) as e:
+
+            self._submit(delete).done.wait()
+            archived += len(rows)
+
+    def _submit(self, fn: Optional[Callable[[sqlite3.Connection], None]], persona: Optional[str] = None) -> _WriteOp:
+        op = _WriteOp(fn, persona)
+        if fn is not None:
+            with self._pending_lock:
+                self._pending += 1
+        self._writes.put(op)
+        return op
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection configured for concurrent use (WAL, busy timeout)."""
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(BUSY_TIMEOUT * 1000)}")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        """This thread's read connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _writer_loop(self):
+        """Apply queued writes in batched transactions until stopped."""
+        conn = self._connect()
+        with self._connections_lock:
+            self._connections.append(conn)
+        stopping = False
+        while not stopping:
+            batch = [self._writes.get()]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = any(op is _STOP for op in batch)
+            writes = [op for op in batch if op.fn is not None]
+            if writes:
+                if not self._commit(conn, writes):
+                    for persona in {op.persona for op in writes if op.persona}:
+                        self._invalidate_key(persona)
+                with self._pending_lock:
+                    self._pending -= len(writes)
+            for op in batch:
+                op.done.set()
+            for persona in {op.persona for op in writes if op.persona}:
+                self._maybe_summarize(conn, persona)
+
+    def _commit(self, conn: sqlite3.Connection, writes: List[_WriteOp]) -> bool:
+        """Run a batch of writes in one transaction, retrying if the file is locked."""
+        for attempt in range(WRITE_RETRIES):
+            try:
+                with conn:
+                    for op in writes:
+                        op.fn(conn)
+                return True
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) or attempt == WRITE_RETRIES - 1:
+                    print(f"Error storing context: {str(e)}")
+                    return False
+                time.sleep(0.05 * (attempt + 1))
+            except sqlite3.Error as e:
+                print(f"Error storing context: {str(e)}")
+                return False
+        return False
+
+    def _maybe_summarize(self, conn: sqlite3.Connection, persona: str):
+        """Schedule background summarization if a persona exceeds max_contexts."""
+        if persona in self._summarizing:
+            return
+        try:
+            row = conn.execute("SELECT row_count FROM persona_counts WHERE persona = ?", (persona,)).fetchone()
+        except sqlite3.Error as e:
             print(f"Error summarizing context: {str(e)}")
+            return
+        if row and row[0] > self.max_contexts:
+            self._summarizing.add(persona)
+            try:
+                self._summary_executor.submit(self._auto_summarize, persona)
+            except RuntimeError:  # Executor shut down during close()
+                self._summarizing.discard(persona)
+
+    def _auto_summarize(self, persona: str):
+        """
+        Summarize a persona's contexts and replace them with the summary.
 
-    def __del__(self):
-        """Close database connection."""
+        Only rows read for the summary are deleted, so writes that land while
+        the model is summarizing are kept. If the summarizer fails (an
+        "Error: ..." result), nothing is deleted.
+
+        Args:
+            persona: Persona name.
+        """
         try:
-            self.conn.close()
-        except sqlite3.Error:
-            pass
+            rows = self._reader().execute(
+                "SELECT seq, context_value, encoding FROM contexts WHERE persona = ? ORDER BY seq",
+                (persona,)
+            ).fetchall()
+            if len(rows) <= self.max_contexts:
+                return
+            last_seq = rows[-1][0]
+            context_text = "\n".join(str(decode_context(row[1], row[2])) for row in rows)
+            summary = self.summarizer.execute(context_text, {"length": "short"})
+            if not summary.strip() or summary.startswith("Error"):
+                # Keep the rows; the next write over max_contexts tries again
+                print(f"Error summarizing context: {summary or 'empty summary'}")
+                metrics.increment("memory.summary_failures")
+                return
+            now = time.time()
+            value, encoding = encode_context({"context_key": "summary", "summary": summary, "timestamp": now})
+
+            def replace(conn: sqlite3.Connection):
+                conn.execute("DELETE FROM contexts WHERE persona = ? AND seq <= ?", (persona, last_seq))
+                self._insert(conn, persona, "summary", value, encoding, now)
+
+            self._submit(replace).done.wait()
+            self._invalidate_key(persona)
+        except (sqlite3.Error, Exception) as e:
+            print(f"Error summarizing context: {str(e)}")
+        finally:
+            self._summarizing.discard(persona)
 
 
 if __name__ == "__main__":
-    memory = Memory()
+    memory = Memory.shared()
     memory.store_context("generalist", {"input": "Test input", "timestamp": time.time()})
     print(memory.retrieve_context("generalist"))
@@ -0,0 +1,132 @@
+# main/memory_archive.py
+"""
+Retention policies and append-only archive segments for the memory store.
+
+Rows that fall out of a persona's retention window are written to gzip'd
+JSON-lines segment files before they are deleted from the live database, so
+old context stays queryable (ArchiveStore.query) and can be re-imported
+(Memory.restore_archived) while memory.db stays small.
+"""
+import gzip
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+SEGMENT_BYTES = 8 * 1024 * 1024  # Compressed size at which a new segment is started
+SEGMENT_PATTERN = re.compile(r"^segment-(\d{6})\.jsonl\.gz$")
+DEFAULT_RETENTION_DAYS = 90.0  # Retention the launchers enforce unless told otherwise
+DEFAULT_RETENTION_ROWS = 1000
+
+
+@dataclass
+class RetentionPolicy:
+    """
+    Limits on how much context a persona keeps in the live database.
+
+    The newest row is always kept so the persona never loses its latest
+    context. Unset limits are not enforced.
+    """
+    max_age: Optional[float] = None  # Seconds since the row was written
+    max_rows: Optional[int] = None
+    max_bytes: Optional[int] = None  # Stored (encoded) size of context values
+
+    def is_unbounded(self) -> bool:
+        """True if no limit is set."""
+        return self.max_age is None and self.max_rows is None and self.max_bytes is None
+
+    @classmethod
+    def bounded(cls, days: Optional[float] = DEFAULT_RETENTION_DAYS,
+                rows: Optional[int] = DEFAULT_RETENTION_ROWS) -> "RetentionPolicy":
+        """Policy keeping at most ``days`` of context and ``rows`` rows per persona (None or <= 0: no limit)."""
+        return cls(max_age=days * 86400 if days and days > 0 else None,
+                   max_rows=rows if rows and rows > 0 else None)
+
+
+class ArchiveStore:
+    """Append-only, gzip-compressed segment files of archived context rows."""
+
+    def __init__(self, directory: str, segment_bytes: int = SEGMENT_BYTES):
+        """
+        Initialize the archive.
+
+        Args:
+            directory: Directory holding segment files (created on first write).
+            segment_bytes: Segment size after which appends go to a new file.
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+
+    def segments(self) -> List[str]:
+        """Segment paths, oldest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted(name for name in os.listdir(self.directory) if SEGMENT_PATTERN.match(name))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def append(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Append records to the current segment and fsync it.
+
+        Each call adds one gzip member, so a crash can only lose the records
+        of the call in progress.
+
+        Args:
+            records: Row dicts (seq, persona, context_key, context, timestamp).
+
+        Returns:
+            Number of records written.
+        """
+        lines = [json.dumps(record, separators=(",", ":")) + "\n" for record in records]
+        if not lines:
+            return 0
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._current_segment()
+            with open(path, "ab") as raw:
+                with gzip.GzipFile(fileobj=raw, mode="ab") as gz:
+                    gz.write("".join(lines).encode("utf-8"))
+                raw.flush()
+                os.fsync(raw.fileno())
+        return len(lines)
+
+    def query(self, persona: Optional[str] = None, since: Optional[float] = None,
+              until: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream archived records, oldest segment first.
+
+        Args:
+            persona: Only this storage key (persona name, or 'session/persona';
+                see main.memory.scoped_persona).
+            since: Only records with timestamp >= since.
+            until: Only records with timestamp < until.
+
+        Yields:
+            Archived row dicts.
+        """
+        for path in self.segments():
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    for line in f:
+                        record = json.loads(line)
+                        if persona and record.get("persona") != persona:
+                            continue
+                        timestamp = record.get("timestamp", 0)
+                        if since is not None and timestamp < since:
+                            continue
+                        if until is not None and timestamp >= until:
+                            continue
+                        yield record
+            except (OSError, EOFError, ValueError) as e:
+                # A torn final member from a crash only loses that append
+                print(f"Error reading archive segment {path}: {str(e)}")
+
+    def _current_segment(self) -> str:
+        segments = self.segments()
+        if segments and os.path.getsize(segments[-1]) < self.segment_bytes:
+            return segments[-1]
+        index = int(SEGMENT_PATTERN.match(os.path.basename(segments[-1])).group(1)) + 1 if segments else 1
+        return os.path.join(self.directory, f"segment-{index:06d}.jsonl.gz")
@@ -0,0 +1,152 @@
+# main/memory_schema.py
+"""
+Versioned schema and value encoding for the SQLite memory store.
+
+Schema history (tracked in PRAGMA user_version):
+    1: contexts(persona, context_key, context_value TEXT, timestamp DATETIME)
+    2: monotonic ``seq`` primary key with a (persona, seq) index, unix-time
+       timestamps, compressed values and per-persona counters kept by triggers
+"""
+import json
+import sqlite3
+import zlib
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+SCHEMA_VERSION = 2
+
+ENCODING_JSON = 0  # context_value is JSON text
+ENCODING_ZLIB_JSON = 1  # context_value is zlib-compressed JSON bytes
+COMPRESS_THRESHOLD = 512  # Bytes of JSON before compression is attempted
+
+
+def encode_context(context: Dict[str, Any]) -> Tuple[Union[str, bytes], int]:
+    """
+    Serialize a context dict for storage.
+
+    Args:
+        context: Context dictionary.
+
+    Returns:
+        (value, encoding) where value is compact JSON text, or zlib bytes when
+        that is smaller for large values.
+
+    Raises:
+        TypeError, ValueError: If the context is not JSON-serializable.
+    """
+    text = json.dumps(context, separators=(",", ":"))
+    if len(text) >= COMPRESS_THRESHOLD:
+        packed = zlib.compress(text.encode("utf-8"), 6)
+        if len(packed) < len(text):
+            return packed, ENCODING_ZLIB_JSON
+    return text, ENCODING_JSON
+
+
+def decode_context(value: Union[str, bytes], encoding: int) -> Dict[str, Any]:
+    """Inverse of encode_context."""
+    if encoding == ENCODING_ZLIB_JSON:
+        return json.loads(zlib.decompress(value).decode("utf-8"))
+    return json.loads(value)
+
+
+def _create_v1(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS contexts (
+            persona TEXT,
+            context_key TEXT,
+            context_value TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _upgrade_v2(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE contexts_v2 (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            persona TEXT NOT NULL,
+            context_key TEXT,
+            context_value BLOB NOT NULL,
+            encoding INTEGER NOT NULL DEFAULT 0,
+            timestamp REAL NOT NULL
+        )
+    """)
+    conn.execute("""
+        INSERT INTO contexts_v2 (persona, context_key, context_value, encoding, timestamp)
+        SELECT lower(persona), context_key, context_value, 0,
+               COALESCE(CAST(strftime('%s', timestamp) AS REAL), 0)
+        FROM contexts
+        WHERE persona IS NOT NULL AND context_value IS NOT NULL
+        ORDER BY timestamp, rowid
+    """)
+    conn.execute("DROP TABLE contexts")
+    conn.execute("ALTER TABLE contexts_v2 RENAME TO contexts")
+    conn.execute("CREATE INDEX idx_contexts_persona_seq ON contexts (persona, seq)")
+    conn.execute("""
+        CREATE TABLE persona_counts (
+            persona TEXT PRIMARY KEY,
+            row_count INTEGER NOT NULL DEFAULT 0,
+            byte_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("""
+        INSERT INTO persona_counts (persona, row_count, byte_count)
+        SELECT persona, COUNT(*), SUM(length(context_value)) FROM contexts GROUP BY persona
+    """)
+    conn.execute("""
+        CREATE TRIGGER contexts_count_insert AFTER INSERT ON contexts BEGIN
+            INSERT INTO persona_counts (persona, row_count, byte_count)
+            VALUES (NEW.persona, 1, length(NEW.context_value))
+            ON CONFLICT(persona) DO UPDATE SET
+                row_count = row_count + 1,
+                byte_count = byte_count + length(NEW.context_value);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER contexts_count_delete AFTER DELETE ON contexts BEGIN
+            UPDATE persona_counts
+            SET row_count = row_count - 1, byte_count = byte_count - length(OLD.context_value)
+            WHERE persona = OLD.persona;
+        END
+    """)
+
+
+MIGRATIONS: List[Tuple[int, Callable[[sqlite3.Connection], None]]] = [
+    (1, _create_v1),
+    (2, _upgrade_v2),
+]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Bring the database up to SCHEMA_VERSION.
+
+    Each step runs in its own IMMEDIATE transaction and re-reads the version
+    inside it, so concurrent processes opening the same file migrate once.
+
+    Args:
+        conn: Open connection (autocommit state is restored afterwards).
+
+    Returns:
+        The schema version after migration.
+    """
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] == 0:
+            # Only takes effect on a file with no tables yet; older files switch in Memory.compact()
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        for target, step in MIGRATIONS:
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= target:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("PRAGMA user_version").fetchone()[0] < target:
+                    step(conn)
+                    conn.execute(f"PRAGMA user_version = {target}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.isolation_level = isolation_level
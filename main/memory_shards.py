@@ -0,0 +1,245 @@
+# main/memory_shards.py
+"""
+Session-sharded memory: contexts are spread over several SQLite files by a hash
+of the session id, so concurrent users write to different files (and writer
+threads) instead of contending on one. Shards are opened lazily and the least
+recently used idle shards are closed once more than ``max_open`` are open.
+An evicted shard is flushed and closed (after its pending summaries) on a
+background thread; a request that needs the shard again waits for that close
+before reopening the file, so it always sees every write the old instance made.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .memory import BUSY_TIMEOUT, MAINTENANCE_INTERVAL, Memory, PersonaMemory
+from .memory_archive import RetentionPolicy
+
+SHARD_COUNT = 16
+MAX_OPEN_SHARDS = 8
+
+
+class ShardedMemory:
+    """Memory-compatible store that routes each session to one of N shard files."""
+
+    _instances: Dict[str, "ShardedMemory"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, directory: str = "memory_shards", shard_count: int = SHARD_COUNT,
+                 max_open: int = MAX_OPEN_SHARDS, **memory_options: Any):
+        """
+        Initialize the sharded store.
+
+        Args:
+            directory: Directory for shard files (created if missing).
+            shard_count: Number of shard files; changing it remaps sessions.
+            max_open: Open shards kept before idle ones are closed.
+            **memory_options: Passed to each shard's Memory (cache_size, retention, ...).
+        """
+        self.directory = directory
+        self.shard_count = shard_count
+        self.max_open = max(1, max_open)
+        self.memory_options = memory_options
+        os.makedirs(directory, exist_ok=True)
+        self._open: "OrderedDict[int, Memory]" = OrderedDict()
+        self._in_use: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._persona_retention: Dict[str, RetentionPolicy] = {}
+        self._maintenance_stop = threading.Event()
+        self._maintenance_thread: Optional[threading.Thread] = None
+        self._closing: List[threading.Thread] = []
+        self._pending_close: Dict[int, threading.Event] = {}  # Evicted shard index -> set once closed
+
+    @classmethod
+    def shared(cls, directory: str = "memory_shards", **options: Any) -> "ShardedMemory":
+        """
+        Process-wide ShardedMemory for a directory.
+
+        Args:
+            directory: Directory for shard files.
+            **options: Constructor options, used only when the store is first created.
+
+        Returns:
+            The single ShardedMemory for that directory.
+        """
+        key = os.path.abspath(directory)
+        with cls._instances_lock:
+            memory = cls._instances.get(key)
+            if memory is None:
+                memory = cls._instances[key] = cls(directory, **options)
+            return memory
+
+    def shard_index(self, session_id: Optional[str]) -> int:
+        """Shard holding a session (sessionless contexts live in shard 0)."""
+        if not session_id:
+            return 0
+        digest = hashlib.blake2b(session_id.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big") % self.shard_count
+
+    def shard_path(self, index: int) -> str:
+        """Database file for a shard."""
+        return os.path.join(self.directory, f"shard-{index:03d}.db")
+
+    def for_persona(self, persona: str, session_id: Optional[str] = None) -> PersonaMemory:
+        """Namespaced view for one persona in one session."""
+        return PersonaMemory(self, persona, session_id)
+
+    def store_context(self, persona: str, context: Dict[str, Any], wait: bool = False,
+                      session_id: Optional[str] = None):
+        """Store context for a persona in a session's shard (see Memory.store_context)."""
+        with self._shard(session_id) as memory:
+            memory.store_context(persona, context, wait=wait, session_id=session_id)
+
+    def retrieve_context(self, persona: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Latest context for a persona in a session (see Memory.retrieve_context)."""
+        with self._shard(session_id) as memory:
+            return memory.retrieve_context(persona, session_id=session_id)
+
+    def delete_context(self, persona: str, wait: bool = True, session_id: Optional[str] = None):
+        """Delete a persona's contexts in a session."""
+        with self._shard(session_id) as memory:
+            memory.delete_context(persona, wait=wait, session_id=session_id)
+
+    def count(self, persona: str, session_id: Optional[str] = None) -> int:
+        """Number of stored contexts for a persona in a session."""
+        with self._shard(session_id) as memory:
+            return memory.count(persona, session_id=session_id)
+
+    def flush(self, timeout: Optional[float] = None):
+        """Block until writes queued on every open shard are committed."""
+        for memory in self._open_shards():
+            memory.flush(timeout)
+
+    def run_maintenance(self) -> Dict[str, int]:
+        """Run retention and compaction on every shard file that exists."""
+        totals = {"archived": 0, "freed_pages": 0}
+        for index in range(self.shard_count):
+            if not os.path.exists(self.shard_path(index)):
+                continue
+            with self._shard_at(index) as memory:
+                for key, value in memory.run_maintenance().items():
+                    totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def set_retention(self, policy: RetentionPolicy, persona: Optional[str] = None):
+        """Set the retention policy for one persona, or the default, on every shard."""
+        with self._lock:
+            if persona is None:
+                self.memory_options["retention"] = policy
+            else:
+                self._persona_retention[persona] = policy
+            shards = list(self._open.values())
+        for memory in shards:
+            memory.set_retention(policy, persona)
+
+    def start_maintenance(self, interval: float = MAINTENANCE_INTERVAL):
+        """Start one background thread running retention on all shards (idempotent)."""
+        if self._maintenance_thread and self._maintenance_thread.is_alive():
+            return
+        self._maintenance_stop.clear()
+        self._maintenance_thread = threading.Thread(
+            target=self._maintenance_loop, args=(interval,), name="shard-maintenance", daemon=True
+        )
+        self._maintenance_thread.start()
+
+    def stop_maintenance(self):
+        """Stop the background maintenance thread."""
+        self._maintenance_stop.set()
+        if self._maintenance_thread:
+            self._maintenance_thread.join(timeout=BUSY_TIMEOUT * 2)
+
+    def close(self):
+        """Stop maintenance and close every open shard."""
+        self.stop_maintenance()
+        with self._lock:
+            shards = list(self._open.values())
+            self._open.clear()
+            closing, self._closing = self._closing, []
+        for memory in shards:
+            memory.close()
+        for thread in closing:
+            thread.join()
+
+    def _open_shards(self) -> List[Memory]:
+        with self._lock:
+            return list(self._open.values())
+
+    @contextmanager
+    def _shard(self, session_id: Optional[str]) -> Iterator[Memory]:
+        with self._shard_at(self.shard_index(session_id)) as memory:
+            yield memory
+
+    @contextmanager
+    def _shard_at(self, index: int) -> Iterator[Memory]:
+        """Lease a shard, opening it if needed; idle shards past max_open are closed."""
+        while True:
+            with self._lock:
+                memory = self._open.get(index)
+                closing = self._pending_close.get(index) if memory is None else None
+                if closing is None:
+                    if memory is None:
+                        memory = self._open[index] = Memory(self.shard_path(index), **self.memory_options)
+                        for persona, policy in self._persona_retention.items():
+                            memory.set_retention(policy, persona)
+                    self._open.move_to_end(index)
+                    self._in_use[index] = self._in_use.get(index, 0) + 1
+                    evicted = self._evict_locked()
+                    break
+            closing.wait()  # The previous instance is still committing; reopen after it closes
+        self._close_all(evicted)
+        try:
+            yield memory
+        finally:
+            with self._lock:
+                self._in_use[index] -= 1
+                evicted = self._evict_locked()
+            self._close_all(evicted)
+
+    def _maintenance_loop(self, interval: float):
+        while not self._maintenance_stop.wait(interval):
+            try:
+                self.run_maintenance()
+            except Exception as e:
+                print(f"Error running memory maintenance: {str(e)}")
+
+    def _evict_locked(self) -> List[Tuple[int, Memory]]:
+        """Pop least recently used idle shards until at most max_open remain, marking them as closing."""
+        evicted = []
+        for index in list(self._open):
+            if len(self._open) <= self.max_open:
+                break
+            if self._in_use.get(index, 0) == 0:
+                evicted.append((index, self._open.pop(index)))
+                self._pending_close[index] = threading.Event()
+        return evicted
+
+    def _close_all(self, shards: List[Tuple[int, Memory]]):
+        """Close evicted shards on a background thread, releasing waiters as each one closes."""
+        if not shards:
+            return
+
+        def close():
+            for index, memory in shards:
+                try:
+                    memory.close()
+                except Exception as e:
+                    print(f"Error closing memory shard {index}: {str(e)}")
+                finally:
+                    with self._lock:
+                        self._pending_close.pop(index).set()
+
+        thread = threading.Thread(target=close, name="shard-close", daemon=True)
+        with self._lock:
+            self._closing = [t for t in self._closing if t.is_alive()]
+            self._closing.append(thread)
+        thread.start()
+
+
+if __name__ == "__main__":
+    import time
+    memory = ShardedMemory.shared()
+    memory.store_context("generalist", {"input": "Test input", "timestamp": time.time()}, session_id="demo")
+    print(memory.retrieve_context("generalist", session_id="demo"))
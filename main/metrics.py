@@ -0,0 +1,67 @@
+# main/metrics.py
+"""
+Process-wide counters and timings for the assistant backend.
+"""
+import threading
+from collections import defaultdict
+from typing import Any, Dict
+
+
+class Metrics:
+    """Thread-safe registry of named counters and observed values."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._observations: Dict[str, Dict[str, float]] = {}
+
+    def increment(self, name: str, value: int = 1):
+        """
+        Increment a counter.
+
+        Args:
+            name: Counter name (dotted, e.g. 'mcp.cancelled').
+            value: Amount to add.
+        """
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, value: float):
+        """
+        Record an observation (latency, size, ...) as count/sum/min/max.
+
+        Args:
+            name: Observation name (e.g. 'ollama.ttft_seconds').
+            value: Observed value.
+        """
+        with self._lock:
+            stats = self._observations.get(name)
+            if stats is None:
+                self._observations[name] = {"count": 1, "sum": value, "min": value, "max": value}
+            else:
+                stats["count"] += 1
+                stats["sum"] += value
+                stats["min"] = min(stats["min"], value)
+                stats["max"] = max(stats["max"], value)
+
+    def get(self, name: str) -> int:
+        """Return the current value of a counter (0 if never incremented)."""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a copy of all counters and observations."""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "observations": {name: dict(stats) for name, stats in self._observations.items()},
+            }
+
+    def reset(self):
+        """Clear all metrics."""
+        with self._lock:
+            self._counters.clear()
+            self._observations.clear()
+
+
+metrics = Metrics()
@@ -0,0 +1,355 @@
+# main/note_store.py
+"""
+Append-only note log shared by the NoteTaker and Search tools.
+
+Notes are JSON lines in notes.json: {"content", "priority", "tags",
+"timestamp"}. add() only buffers the record; a background thread writes
+buffered notes in group commits (one write and one fsync per batch), at most
+flush_interval seconds after a note was added or as soon as max_buffered notes
+are waiting. Readers see buffered notes immediately.
+
+A sidecar index (notes.json.idx, one little-endian uint64 byte offset per
+record) gives random access without rescanning the log. It is checked against
+the log on open and rebuilt when it does not match, so a missing or stale
+index (crash, file replaced by an import) only costs one scan. Several
+processes may append to the same log: commits are serialized with an advisory
+file lock, and each store indexes the other writers' records before appending
+its own.
+"""
+import array
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+NOTES_FILE = "notes.json"
+INDEX_SUFFIX = ".idx"
+FLUSH_INTERVAL = 1.0  # Max seconds between add() and the fsync that makes the note durable
+MAX_BUFFERED = 512  # Pending notes that trigger an early commit
+READ_CHUNK = 1 << 20  # Bytes per read when scanning the log
+OFFSET_SIZE = 8  # Bytes per index entry
+
+
+class NoteStore:
+    """Buffered, indexed JSON-lines note log."""
+
+    _instances: Dict[str, "NoteStore"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path: str = NOTES_FILE, flush_interval: float = FLUSH_INTERVAL,
+                 max_buffered: int = MAX_BUFFERED):
+        """
+        Open (or create) a note log.
+
+        Args:
+            path: JSON-lines log file; the index lives next to it.
+            flush_interval: Max seconds a note stays buffered before it is fsynced.
+            max_buffered: Number of buffered notes that triggers a commit right away.
+        """
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+
+        # _io_lock guards the files and offsets; add() only takes _pending_cond so
+        # writers never wait on disk I/O
+        self._io_lock = threading.RLock()
+        self._pending_cond = threading.Condition()
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_since: Optional[float] = None
+        self._offsets = array.array("Q")
+        self._end = 0  # Byte offset just past the last complete record
+        self._index_stale = False  # Offsets were rebuilt; the index file must be rewritten
+        self._fd: Optional[int] = None
+        self._index_fd: Optional[int] = None
+        self._closed = False
+
+        self._open()
+        self._flusher = threading.Thread(target=self._flush_loop, name="note-store-flush", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def shared(cls, path: str = NOTES_FILE) -> "NoteStore":
+        """
+        Process-wide store for a log file.
+
+        Args:
+            path: JSON-lines log file.
+
+        Returns:
+            The single NoteStore instance for that path.
+        """
+        key = os.path.abspath(path)
+        with cls._instances_lock:
+            store = cls._instances.get(key)
+            if store is None or store._closed:
+                store = cls._instances[key] = cls(path)
+            return store
+
+    def add(self, content: str, priority: str = "medium", tags: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Buffer a note; it is written by the next group commit.
+
+        Args:
+            content: Note text.
+            priority: low, medium or high.
+            tags: Optional tags.
+
+        Returns:
+            The stored record.
+        """
+        record = {
+            "content": content,
+            "priority": priority.lower(),
+            "tags": list(dict.fromkeys(tag.strip().lower() for tag in (tags or []) if tag.strip())),
+            "timestamp": time.time(),
+        }
+        with self._pending_cond:
+            if self._closed:
+                raise ValueError("NoteStore is closed")
+            self._pending.append(record)
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+                self._pending_cond.notify()
+            elif len(self._pending) >= self.max_buffered:
+                self._pending_cond.notify()
+        return record
+
+    def flush(self):
+        """Write and fsync every buffered note now."""
+        self._commit()
+
+    def version(self) -> str:
+        """Token that changes whenever a note is added here or committed by any process."""
+        with self._io_lock:
+            self._catch_up()
+            with self._pending_cond:
+                return f"{os.fstat(self._fd).st_ino}:{self._end}:{len(self._pending)}"
+
+    def __len__(self) -> int:
+        with self._io_lock:
+            self._catch_up()
+            with self._pending_cond:
+                return len(self._offsets) + len(self._pending)
+
+    def get(self, position: int) -> Dict[str, Any]:
+        """
+        Note at a position in the log (0 is the oldest), read with one seek.
+
+        Args:
+            position: Record number; negative values count from the end.
+
+        Returns:
+            The note record.
+
+        Raises:
+            IndexError: If there is no such note.
+        """
+        with self._io_lock:
+            self._catch_up()
+            with self._pending_cond:
+                pending = list(self._pending)
+            count = len(self._offsets)
+            if position < 0:
+                position += count + len(pending)
+            if position < 0 or position >= count + len(pending):
+                raise IndexError("note position out of range")
+            if position >= count:
+                return pending[position - count]
+            start = self._offsets[position]
+            end = self._offsets[position + 1] if position + 1 < count else self._end
+            return json.loads(os.pread(self._fd, end - start, start))
+
+    def recent(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """The newest notes, newest first."""
+        total = len(self)
+        return [self.get(position) for position in range(total - 1, max(total - limit, 0) - 1, -1)]
+
+    def records(self, start: int = 0) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate notes oldest first, including buffered ones.
+
+        The log is read in large chunks from a snapshot, so concurrent adds and
+        commits are not blocked while a caller consumes the iterator.
+
+        Args:
+            start: First record number to yield.
+        """
+        with self._io_lock:
+            self._catch_up()
+            with self._pending_cond:
+                pending = list(self._pending)
+            count = len(self._offsets)
+            begin = self._offsets[start] if start < count else self._end
+            end = self._end
+            fd = os.dup(self._fd)
+        try:
+            for line in self._read_lines(fd, begin, end):
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # Skip a damaged record rather than failing the whole scan
+        finally:
+            os.close(fd)
+        yield from pending[max(start - count, 0):]
+
+    def close(self):
+        """Commit buffered notes, stop the flusher and close the files."""
+        with self._pending_cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._pending_cond.notify()
+        self._flusher.join(timeout=self.flush_interval * 5 + 5)
+        self._commit()
+        with self._io_lock:
+            for fd in (self._fd, self._index_fd):
+                if fd is not None:
+                    os.close(fd)
+            self._fd = self._index_fd = None
+
+    def _flush_loop(self):
+        """Commit buffered notes once the oldest has waited flush_interval or the buffer is full."""
+        while True:
+            with self._pending_cond:
+                while not self._closed:
+                    if self._pending_since is not None:
+                        waited = time.monotonic() - self._pending_since
+                        if waited >= self.flush_interval or len(self._pending) >= self.max_buffered:
+                            break
+                        self._pending_cond.wait(self.flush_interval - waited)
+                    else:
+                        self._pending_cond.wait()
+                if self._closed:
+                    return
+            self._commit()
+
+    def _commit(self):
+        """Append every buffered note in one write and fsync."""
+        with self._io_lock:
+            with self._pending_cond:
+                batch, self._pending = self._pending, []
+                self._pending_since = None
+            if not batch or self._fd is None:
+                return
+            lines = [json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n" for record in batch]
+            try:
+                self._catch_up()  # Reopens first if the log was replaced, so the lock is taken on the live file
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+                try:
+                    self._catch_up(writer=True)
+                    data = b"".join(lines)
+                    written = 0
+                    while written < len(data):
+                        written += os.write(self._fd, data[written:])
+                    os.fsync(self._fd)
+                    first = len(self._offsets)
+                    position = self._end
+                    for line in lines:
+                        self._offsets.append(position)
+                        position += len(line)
+                    self._end = position
+                    os.pwrite(self._index_fd, self._offsets[first:].tobytes(), first * OFFSET_SIZE)
+                finally:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+            except OSError as e:
+                print(f"Error writing notes to {self.path}: {str(e)}")
+                with self._pending_cond:
+                    self._pending[:0] = batch  # Retried by the next commit
+                    if self._pending_since is None:
+                        self._pending_since = time.monotonic()
+
+    def _open(self):
+        """Open the log and index, reusing the index when it matches the log."""
+        self._open_files()
+        size = os.fstat(self._fd).st_size
+
+        offsets = array.array("Q")
+        index_bytes = os.fstat(self._index_fd).st_size
+        if index_bytes:
+            offsets.frombytes(os.pread(self._index_fd, index_bytes - index_bytes % OFFSET_SIZE, 0))
+        self._offsets, self._end = array.array("Q"), 0
+        if offsets:
+            last = offsets[-1]
+            tail = os.pread(self._fd, min(size - last, READ_CHUNK), last) if last < size else b""
+            boundary_ok = last == 0 or os.pread(self._fd, 1, last - 1) == b"\n"
+            if boundary_ok and tail.startswith(b"{") and b"\n" in tail:
+                self._offsets = offsets
+                self._end = last + tail.index(b"\n") + 1
+        self._index_stale = not self._offsets
+        self._catch_up()
+        if self._index_stale or os.fstat(self._index_fd).st_size != len(self._offsets) * OFFSET_SIZE:
+            self._write_index()
+
+    def _catch_up(self, writer: bool = False):
+        """
+        Index records appended since the last look (by other processes or
+        before a crash), reopening if the log was replaced or truncated.
+
+        Args:
+            writer: True under the file lock; a torn trailing record from a
+                crashed writer is then truncated and the index file synced.
+        """
+        if self._fd is None:
+            return
+        try:
+            replaced = os.stat(self.path).st_ino != os.fstat(self._fd).st_ino
+        except FileNotFoundError:
+            replaced = True
+        size = os.fstat(self._fd).st_size
+        if replaced or size < self._end:
+            self._offsets, self._end = array.array("Q"), 0
+            self._index_stale = True
+            if replaced:
+                self._open_files()
+            size = os.fstat(self._fd).st_size
+        if size > self._end:
+            position = self._end
+            for line in self._read_lines(self._fd, self._end, size):
+                self._offsets.append(position)
+                position += len(line)
+            self._end = position
+        if writer:
+            if size > self._end:
+                os.ftruncate(self._fd, self._end)
+            if self._index_stale or os.fstat(self._index_fd).st_size != len(self._offsets) * OFFSET_SIZE:
+                self._write_index()
+
+    def _open_files(self):
+        """(Re)open the log and index, e.g. after a bundle import replaced the log."""
+        for fd in (self._fd, self._index_fd):
+            if fd is not None:
+                os.close(fd)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._index_fd = os.open(self.index_path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    def _write_index(self):
+        os.ftruncate(self._index_fd, 0)
+        os.pwrite(self._index_fd, self._offsets.tobytes(), 0)
+        self._index_stale = False
+
+    @staticmethod
+    def _read_lines(fd: int, start: int, end: int) -> Iterator[bytes]:
+        """Complete lines (with their newline) between two byte offsets."""
+        position, carry = start, b""
+        while position < end:
+            chunk = os.pread(fd, min(READ_CHUNK, end - position), position)
+            if not chunk:
+                break
+            position += len(chunk)
+            lines = (carry + chunk).split(b"\n")
+            carry = lines.pop()
+            for line in lines:
+                yield line + b"\n"
+
+
+if __name__ == "__main__":
+    store = NoteStore("notes_demo.json")
+    store.add("Call Bob about the meeting", priority="high", tags=["work"])
+    store.flush()
+    print(len(store), store.recent(3))
+    store.close()
@@ -1,83 +1,466 @@
 # main/ollama_assistant.py
 """
 Manages interactions with the local Ollama server for text generation.
-Supports streaming and synchronous calls with robust error handling.
+Supports streaming and synchronous calls with robust error handling, routed
+through a BackendPool so several Ollama hosts can share the load.
+
+Streams are guarded for tail latency: if no token arrives within the TTFT
+deadline a hedged duplicate is sent to another backend and whichever starts
+first wins; an idle watchdog aborts streams that stall between chunks; failed
+attempts are retried with jittered exponential backoff. Failures surface as
+typed ErrorEvents / OllamaError exceptions rather than text chunks. Only
+connection errors, timeouts and 5xx responses count against a backend's
+circuit and are retried; a 4xx response or an Ollama error frame (e.g. a model
+that is not pulled) is an OllamaRequestError, returned to the caller as is. Stream
+bodies are parsed with main.frames (large reads, one JSON parse per read,
+orjson when installed).
+
+A GenerationProfile caps tokens/context and sets stop sequences and
+temperature; its wall-clock time_budget truncates replies that run long.
 """
 import requests
-import json
-from typing import Generator, Optional
-from urllib.parse import urljoin
+import queue
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Generator, List, Optional, Union
+
+from .backends import Backend, BackendPool, BackendUnavailableError, get_default_pool
+from .cancellation import CancellationToken
+from .frames import iter_frames
+from .generation import GenerationProfile
+from .metrics import metrics
+
+WARM_KEEP_ALIVE = "10m"  # How long Ollama keeps a warmed model loaded
+WARM_TIMEOUT = 120.0  # Seconds allowed for a cold model load
+
+
+
+class OllamaError(requests.RequestException):
+    """A generation request failed."""
+
+
+class OllamaRequestError(OllamaError):
+    """The backend rejected the request (4xx or an error frame); not retried or charged to the backend."""
+
+
+class OllamaTimeoutError(OllamaError):
+    """No token arrived before the first-token timeout."""
+
+
+class OllamaStallError(OllamaError):
+    """The stream went idle for longer than the inter-chunk watchdog allows."""
+
+
+@dataclass
+class TokenEvent:
+    """A chunk of generated text."""
+    text: str
+
+
+@dataclass
+class DoneEvent:
+    """Generation finished; carries Ollama's timing/count stats."""
+    stats: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class ErrorEvent:
+    """Generation failed with a typed error."""
+    error: Exception
+
+
+StreamEvent = Union[TokenEvent, DoneEvent, ErrorEvent]
+
+
+@dataclass
+class StreamPolicy:
+    """Tail-latency controls for streaming requests."""
+    ttft_deadline: Optional[float] = 2.0  # Seconds without a first token before hedging (None disables)
+    hedge: bool = True
+    idle_timeout: float = 15.0  # Max seconds between chunks once streaming
+    connect_timeout: float = 5.0
+    max_retries: int = 2
+    backoff_base: float = 0.25
+    backoff_max: float = 4.0
+
+
+def _shutdown_socket(response: requests.Response):
+    """
+    Best-effort shutdown of a streaming response's socket.
+
+    Unlike response.close(), this does not wait for a read blocked on another
+    thread; the read returns immediately and the reader closes the response.
+    """
+    connection = getattr(response.raw, "_connection", None)
+    sock = getattr(connection, "sock", None)
+    if sock is None:
+        response.close()
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+def _error_message(response: requests.Response) -> str:
+    """Ollama's {"error": ...} message for a rejected request, else the HTTP status."""
+    try:
+        message = response.json().get("error")
+    except ValueError:
+        message = None
+    return f"{response.status_code} {message or response.reason}"
+
+
+class _Attempt:
+    """One request to one backend, read on its own thread into a shared queue."""
+
+    def __init__(self, pool: BackendPool, backend: Backend, payload: Dict[str, Any],
+                 timeout: tuple, events: "queue.Queue"):
+        self.pool = pool
+        self.backend = backend
+        self.payload = payload
+        self.timeout = timeout
+        self.events = events
+        self.token = CancellationToken()
+        self.failed = False
+        self.thread = threading.Thread(target=self._run, name="ollama-stream", daemon=True)
+
+    def start(self) -> "_Attempt":
+        self.thread.start()
+        return self
+
+    def cancel(self, failed: bool = False):
+        """Close the upstream connection; ``failed`` charges the backend's circuit."""
+        self.failed = self.failed or failed
+        self.token.cancel()
+
+    def _run(self):
+        success = False
+        response = None
+        try:
+            response = requests.post(self.backend.api_generate, json=self.payload,
+                                     stream=True, timeout=self.timeout)
+            self.token.register(lambda: _shutdown_socket(response))
+            if 400 <= response.status_code < 500:
+                raise OllamaRequestError(_error_message(response))
+            response.raise_for_status()
+            stats: Dict[str, Any] = {}
+            for frame in iter_frames(response):
+                if self.token.cancelled:
+                    break
+                if frame.error:
+                    raise OllamaRequestError(frame.error)
+                if frame.response:
+                    self.events.put((self, "token", frame.response))
+                if frame.done:
+                    stats = frame.stats
+                    break
+            if not self.token.cancelled:
+                stats["backend"] = self.backend.url
+                self.events.put((self, "done", stats))
+            success = True
+        except OllamaRequestError as e:
+            success = True  # The request was bad, the backend is fine
+            if not self.token.cancelled:
+                self.events.put((self, "error", e))
+        except Exception as e:
+            if self.token.cancelled:
+                success = True  # Closed by us; not the backend's fault
+            else:
+                self.events.put((self, "error", e if isinstance(e, OllamaError) else OllamaError(str(e))))
+        finally:
+            if response is not None:
+                response.close()
+            self.pool.release(self.backend, success and not self.failed)
 
 
 class OllamaAssistant:
     """Interface for interacting with the Ollama server."""
 
-    def __init__(self, base_url: str = "http://localhost:11434", model: str = "llama3.1"):
+    def __init__(self, base_url: Union[str, List[str], None] = None, model: str = "llama3.1",
+                 pool: Optional[BackendPool] = None, policy: Optional[StreamPolicy] = None):
         """
         Initialize the Ollama assistant.
 
         Args:
-            base_url: Ollama server URL (default: http://localhost:11434).
+            base_url: Ollama server URL or list of URLs. When omitted the shared
+                default pool is used ($OLLAMA_HOSTS or http://localhost:11434).
             model: Model name (default: llama3.1).
+            pool: Explicit backend pool; overrides base_url.
+            policy: Hedging/watchdog/retry settings (default: StreamPolicy()).
         """
-        self.base_url = base_url
+        if pool is None:
+            if base_url is None:
+                pool = get_default_pool()
+            else:
+                urls = [base_url] if isinstance(base_url, str) else list(base_url)
+                pool = BackendPool(urls)
+                if len(urls) > 1:
+                    pool.start_health_checks()
+        self.pool = pool
         self.model = model
-        self.api_generate = urljoin(base_url, "/api/generate")
+        self.policy = policy or StreamPolicy()
+        self.base_url = pool.backends[0].url
+        self.api_generate = pool.backends[0].api_generate
+
+    def generate_events(self, prompt: str, timeout: float = 30,
+                        cancel_token: Optional[CancellationToken] = None,
+                        model: Optional[str] = None,
+                        profile: Optional[GenerationProfile] = None) -> Generator[StreamEvent, None, None]:
+        """
+        Stream generation as typed events with hedging, watchdog and retries.
+
+        Args:
+            prompt: Input prompt for the model.
+            timeout: Seconds to wait for the first token before giving up on an attempt.
+            cancel_token: Optional token that aborts the stream and closes upstream.
+            model: Model override for this request (default: self.model).
+            profile: Generation limits; a reply exceeding max_tokens or the
+                time budget ends with the profile's truncation marker and a
+                DoneEvent whose stats carry 'truncated'.
+
+        Yields:
+            TokenEvent for each chunk, then exactly one DoneEvent or ErrorEvent
+            (nothing further if cancelled).
+        """
+        policy = self.policy
+        payload = {"model": model or self.model, "prompt": prompt, "stream": True}
+        if profile is not None:
+            payload["options"] = profile.to_options()
+        budget_deadline = None
+        if profile is not None and profile.time_budget:
+            budget_deadline = time.monotonic() + profile.time_budget
+        events: "queue.Queue" = queue.Queue()
+        unregister = None
+        if cancel_token:
+            unregister = cancel_token.register(lambda: events.put((None, "cancelled", None)))
+        attempts: List[_Attempt] = []
+        tried: List[Backend] = []
+        retries = 0
+        streamed = False
+        try:
+            while True:
+                try:
+                    attempts = [self._start_attempt(payload, tried, events, timeout)]
+                except BackendUnavailableError as e:
+                    yield ErrorEvent(e)
+                    return
+                winner: Optional[_Attempt] = None
+                hedged = not (policy.hedge and policy.ttft_deadline is not None)
+                started_at = time.monotonic()
+                error: Optional[Exception] = None
+
+                while error is None:
+                    if budget_deadline is not None and time.monotonic() >= budget_deadline:
+                        if streamed:
+                            metrics.increment("ollama.truncated")
+                            if profile.truncation_marker:
+                                yield TokenEvent(profile.truncation_marker)
+                            yield DoneEvent({"truncated": "time_budget", "backend": winner.backend.url})
+                            return
+                        error = OllamaTimeoutError(f"No response within the {profile.time_budget:g}s time budget")
+                        break
+                    if winner is not None:
+                        wait = policy.idle_timeout
+                    elif not hedged:
+                        wait = started_at + policy.ttft_deadline - time.monotonic()
+                    else:
+                        wait = started_at + timeout - time.monotonic()
+                    if budget_deadline is not None:
+                        wait = min(wait, budget_deadline - time.monotonic())
+                    try:
+                        source, kind, data = events.get(timeout=max(0.0, wait))
+                    except queue.Empty:
+                        if budget_deadline is not None and time.monotonic() >= budget_deadline:
+                            continue  # Handled at the top of the loop
+                        if winner is None and not hedged:
+                            hedged = True
+                            try:
+                                attempts.append(self._start_attempt(payload, tried, events, timeout))
+                                metrics.increment("ollama.hedges")
+                            except BackendUnavailableError:
+                                pass
+                            continue
+                        if winner is None:
+                            metrics.increment("ollama.ttft_timeouts")
+                            error = OllamaTimeoutError(f"No response from Ollama within {timeout:g}s")
+                        else:
+                            metrics.increment("ollama.stalls")
+                            error = OllamaStallError(f"Ollama stream stalled for {policy.idle_timeout:g}s")
+                        continue
+
+                    if kind == "cancelled":
+                        return
+                    if source not in attempts:
+                        continue  # Leftovers from a hedge loser or an earlier attempt
+                    if kind == "token":
+                        if winner is None:
+                            winner = source
+                            if source is not attempts[0]:
+                                metrics.increment("ollama.hedge_wins")
+                            for other in attempts:
+                                if other is not winner:
+                                    other.cancel()
+                            attempts = [winner]
+                            metrics.observe("ollama.ttft_seconds", time.monotonic() - started_at)
+                        streamed = True
+                        yield TokenEvent(data)
+                    elif kind == "done":
+                        if data.get("done_reason") == "length" and profile is not None:
+                            metrics.increment("ollama.truncated")
+                            data["truncated"] = "max_tokens"
+                            if profile.truncation_marker:
+                                yield TokenEvent(profile.truncation_marker)
+                        yield DoneEvent(data)
+                        return
+                    else:
+                        attempts.remove(source)
+                        if isinstance(data, OllamaRequestError):
+                            for other in attempts:
+                                other.cancel()  # Would be rejected the same way
+                            attempts = []
+                            yield ErrorEvent(data)
+                            return
+                        if winner is None and attempts:
+                            continue  # A hedge is still racing
+                        error = data
 
-    def generate_stream(self, prompt: str, timeout: int = 30) -> Generator[str, None, None]:
+                for attempt in attempts:
+                    attempt.cancel(failed=True)
+                attempts = []
+                budget_spent = budget_deadline is not None and time.monotonic() >= budget_deadline
+                if streamed or budget_spent or retries >= policy.max_retries:
+                    yield ErrorEvent(error)
+                    return
+                retries += 1
+                metrics.increment("ollama.retries")
+                delay = random.uniform(0, min(policy.backoff_max, policy.backoff_base * 2 ** retries))
+                if cancel_token and cancel_token.wait(delay):
+                    return
+                elif not cancel_token:
+                    time.sleep(delay)
+                if len(tried) >= len(self.pool.backends):
+                    tried = []
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+            if unregister:
+                unregister()
+            if cancel_token and cancel_token.cancelled:
+                metrics.increment("ollama.streams_cancelled")
+
+    def generate_stream(self, prompt: str, timeout: int = 30,
+                        cancel_token: Optional[CancellationToken] = None,
+                        model: Optional[str] = None,
+                        profile: Optional[GenerationProfile] = None) -> Generator[str, None, None]:
         """
         Stream text generation from Ollama.
 
+        Cancelling ``cancel_token`` (or closing the generator) closes the
+        upstream connection so the server stops generating.
+
         Args:
             prompt: Input prompt for the model.
-            timeout: Request timeout in seconds.
+            timeout: Seconds to wait for the first token.
+            cancel_token: Optional token that aborts the stream.
+            model: Model override for this request.
+            profile: Generation limits (tokens, context, stop, time budget).
 
         Yields:
             Response chunks as strings.
 
         Raises:
-            requests.RequestException: If the request fails.
+            OllamaError: If generation fails (after retries) or stalls.
         """
-        try:
-            response = requests.post(
-                self.api_generate,
-                json={"model": self.model, "prompt": prompt, "stream": True},
-                stream=True,
-                timeout=timeout
-            )
-            response.raise_for_status()
-            for line in response.iter_lines():
-                if line:
-                    chunk = json.loads(line.decode('utf-8'))
-                    yield chunk['response']
-        except requests.RequestException as e:
-            yield f"Error communicating with Ollama: {str(e)}"
+        for event in self.generate_events(prompt, timeout=timeout, cancel_token=cancel_token,
+                                          model=model, profile=profile):
+            if isinstance(event, TokenEvent):
+                yield event.text
+            elif isinstance(event, ErrorEvent):
+                raise event.error
 
-    def generate_sync(self, prompt: str, timeout: int = 10) -> str:
+    def generate_sync(self, prompt: str, timeout: int = 10,
+                      cancel_token: Optional[CancellationToken] = None,
+                      model: Optional[str] = None,
+                      profile: Optional[GenerationProfile] = None) -> str:
         """
         Perform synchronous text generation.
 
         Args:
             prompt: Input prompt for the model.
-            timeout: Request timeout in seconds.
+            timeout: Seconds to wait for the first token.
+            cancel_token: Optional token that aborts the request.
+            model: Model override for this request.
+            profile: Generation limits (tokens, context, stop, time budget).
 
         Returns:
-            Complete response as a string.
-
-        Raises:
-            requests.RequestException: If the request fails.
+            Complete response as a string, or an "Error: ..." message.
         """
         try:
-            response = requests.post(
-                self.api_generate,
-                json={"model": self.model, "prompt": prompt, "stream": False},
-                timeout=timeout
-            )
-            response.raise_for_status()
-            return json.loads(response.text)['response']
+            return "".join(self.generate_stream(prompt, timeout=timeout, cancel_token=cancel_token,
+                                                model=model, profile=profile))
         except requests.RequestException as e:
             return f"Error: {str(e)}"
 
+    def warm(self, model: Optional[str] = None, keep_alive: str = WARM_KEEP_ALIVE) -> bool:
+        """
+        Load a model, or extend its keep-alive, without generating anything.
+
+        Ollama loads the model for a generate request with no prompt, so a
+        request sent while the user is still typing hides the load time.
+        Warm-ups are best effort: their outcome is not recorded against the
+        backend's circuit.
+
+        Args:
+            model: Model to warm (default: self.model).
+            keep_alive: Ollama keep_alive duration, e.g. "10m".
+
+        Returns:
+            True if a backend accepted the request.
+        """
+        model = model or self.model
+        payload = {"model": model, "keep_alive": keep_alive, "stream": False}
+        try:
+            backend = self.pool.acquire(model)
+            try:
+                response = requests.post(backend.api_generate, json=payload,
+                                         timeout=(self.policy.connect_timeout, WARM_TIMEOUT))
+                response.raise_for_status()
+            finally:
+                self.pool.release(backend, None)
+            metrics.increment("ollama.warmed")
+            return True
+        except requests.RequestException as e:
+            print(f"Error warming model '{model}': {str(e)}")
+            return False
+
+    def _start_attempt(self, payload: Dict[str, Any], tried: List[Backend],
+                       events: "queue.Queue", timeout: float) -> _Attempt:
+        """Acquire an untried backend and start streaming from it."""
+        backend = self.pool.acquire(payload["model"], exclude=tried)
+        tried.append(backend)
+        read_timeout = max(timeout, self.policy.idle_timeout)
+        return _Attempt(self.pool, backend, payload, (self.policy.connect_timeout, read_timeout), events).start()
+
+
+_default_assistant: Optional[OllamaAssistant] = None
+_default_assistant_lock = threading.Lock()
+
+
+def get_default_assistant() -> OllamaAssistant:
+    """
+    Process-wide assistant on the default pool. MCP and tools share it and
+    pass their model per request, so the process holds one backend client.
+    """
+    global _default_assistant
+    with _default_assistant_lock:
+        if _default_assistant is None:
+            _default_assistant = OllamaAssistant()
+        return _default_assistant
+
 
 if __name__ == "__main__":
     assistant = OllamaAssistant()
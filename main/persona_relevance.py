@@ -0,0 +1,130 @@
+# main/persona_relevance.py
+"""
+Cheap local relevance scoring of personas against a query.
+
+Each persona's name, tone and description are turned into a bag of words:
+every word (plural "s" stripped), plus its first four letters at half weight
+so that "physical" still meets "physics". The vocabulary is the features of
+all persona texts; vectors are IDF-weighted across personas, L2-normalized
+and stacked into one numpy matrix when the ranker is built. Query words no
+persona mentions are ignored. Scoring a query is then a single
+matrix-vector product, whatever the number of personas, and no model is
+called. MCP uses it to consult only the top-k relevant personas on complex
+queries instead of all of them.
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .personas import Persona
+
+PREFIX_LENGTH = 4
+PREFIX_WEIGHT = 0.5
+MIN_RELEVANCE = 0.05  # Cosine score below which a persona is not consulted
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a about an and are as at be but by can could do does for from how i if in into is it its me my of on or
+our should so that the their them then there these this to was we what when where which who why will
+with would you your
+""".split())
+
+
+def _features(text: str) -> Dict[str, float]:
+    """Weighted word and word-prefix counts of ``text``."""
+    counts: Dict[str, float] = {}
+    for word in WORD_PATTERN.findall(text.lower().replace("_", " ")):
+        if word in STOPWORDS or len(word) < 2:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        counts[word] = counts.get(word, 0.0) + 1.0
+        if len(word) > PREFIX_LENGTH:
+            prefix = "^" + word[:PREFIX_LENGTH]
+            counts[prefix] = counts.get(prefix, 0.0) + PREFIX_WEIGHT
+    return counts
+
+
+def persona_text(persona: Persona) -> str:
+    """Text a persona is matched on."""
+    return " ".join(filter(None, [persona.name, persona.tone, persona.description]))
+
+
+class PersonaRanker:
+    """Ranks personas by similarity of their descriptions to a query."""
+
+    def __init__(self, personas: Iterable[Persona]):
+        """
+        Precompute the persona matrix.
+
+        Args:
+            personas: Personas to rank; names are matched case-insensitively.
+        """
+        personas = list(personas)
+        self.names: List[str] = [persona.name.lower() for persona in personas]
+        documents = [_features(persona_text(persona)) for persona in personas]
+        self.vocabulary: Dict[str, int] = {}
+        for features in documents:
+            for feature in features:
+                self.vocabulary.setdefault(feature, len(self.vocabulary))
+
+        self.matrix = np.zeros((len(documents), len(self.vocabulary)), dtype=np.float32)
+        for row, features in enumerate(documents):
+            self.matrix[row, self._columns(features)] = list(features.values())
+        document_frequency = np.count_nonzero(self.matrix, axis=0)
+        self.idf = (np.log((1 + len(documents)) / (1 + document_frequency)) + 1).astype(np.float32)
+        self.matrix *= self.idf
+        norms = np.linalg.norm(self.matrix, axis=1, keepdims=True)
+        self.matrix /= np.where(norms > 0, norms, 1.0)
+
+    def scores(self, query: str) -> np.ndarray:
+        """Cosine similarity of ``query`` to every persona, in self.names order."""
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for feature, count in _features(query).items():
+            column = self.vocabulary.get(feature)
+            if column is not None:
+                vector[column] += count
+        vector *= self.idf
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return np.zeros(len(self.names), dtype=np.float32)
+        return self.matrix @ (vector / norm)
+
+    def top_k(self, query: str, k: int, exclude: Sequence[Optional[str]] = (),
+              min_score: float = MIN_RELEVANCE) -> List[Tuple[str, float]]:
+        """
+        Most relevant personas for a query.
+
+        Args:
+            query: User input.
+            k: Maximum personas to return.
+            exclude: Persona names to leave out (e.g. the one already answering).
+            min_score: Minimum similarity; less relevant personas are never returned.
+
+        Returns:
+            Up to k (name, score) pairs, best first.
+        """
+        if k <= 0 or not self.names:
+            return []
+        scores = self.scores(query)
+        excluded = {name.lower() for name in exclude if name}
+        for row, name in enumerate(self.names):
+            if name in excluded:
+                scores[row] = -1.0
+        candidates = np.flatnonzero(scores >= min_score)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        ranked = sorted(candidates, key=lambda row: -scores[row])
+        return [(self.names[row], float(scores[row])) for row in ranked]
+
+    def _columns(self, features: Dict[str, float]) -> List[int]:
+        return [self.vocabulary[feature] for feature in features]
+
+
+if __name__ == "__main__":
+    from .bootstrap import default_personas
+    ranker = PersonaRanker(default_personas(tools=[], memory=None))
+    for query in ["Explain quantum entanglement and the physics behind it",
+                  "Write a sonnet about the sea",
+                  "How can I stay calm and meditate when stressed?"]:
+        print(query, "->", ranker.top_k(query, 2))
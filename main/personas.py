@@ -3,19 +3,26 @@
 Defines Persona objects with attributes and dynamic behavior for the AI assistant.
 """
 from dataclasses import dataclass
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from .memory import Memory
+from .generation import GenerationProfile, profile_for_persona
 from .tools.base import Tool  # Corrected import
 
 
 @dataclass
 class Persona:
-    """Represents an AI persona with name, color, tone, tools, and memory."""
+    """Represents an AI persona with name, color, tone, tools, memory, generation limits and description."""
     name: str
     color: str
     tone: str
-    tools: List[Tool]
-    memory: Memory
+    tools: List[Tool]  # Or a ToolRegistry; tools are then built on first use
+    memory: Memory  # Or ShardedMemory; both take a session_id on reads and writes
+    generation: Optional[GenerationProfile] = None  # Defaults to profile_for_persona(name)
+    description: str = ""  # Topics the persona is good at; used to pick collaborators
+
+    def __post_init__(self):
+        if self.generation is None:
+            self.generation = profile_for_persona(self.name)
 
     def process_input(self, state: Dict[str, Any]) -> str:
         """
@@ -39,7 +46,7 @@ class Persona:
             dynamic_tone = "casual"
         
         # Retrieve relevant context
-        past_context = memory.retrieve_context(self.name)
+        past_context = memory.retrieve_context(self.name, session_id=state.get('context', {}).get('session_id'))
         prompt = (
             f"Persona: {self.name} (Tone: {dynamic_tone})\n"
             f"Context: {json.dumps(past_context) if past_context else 'No prior context'}\n"
@@ -58,7 +65,7 @@ if __name__ == "__main__":
         color="#28a745",
         tone="neutral",
         tools=[NoteTaker()],
-        memory=Memory()
+        memory=Memory.shared()
     )
     state = {
         "user_input": "formal request",
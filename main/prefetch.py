@@ -0,0 +1,120 @@
+# main/prefetch.py
+"""
+Typing-time prefetch: runs MCP.prefetch for the text a user is still typing.
+
+Keystrokes are debounced per session: prefetch starts only once the input has
+been unchanged for ``delay`` seconds, and every new keystroke cancels the
+previous timer and any prefetch already running for older text. When the
+message is sent, settle() drops work for any other text and lets work for the
+exact final text finish, so the request finds warm caches and a loaded model.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .cancellation import CancellationToken
+from .mcp import MCP
+from .metrics import metrics
+
+PREFETCH_DELAY = 0.4  # Seconds of typing pause before prefetching
+MIN_PREFETCH_CHARS = 3
+MAX_SESSIONS = 1000  # Sessions tracked; the least recently typing are forgotten
+
+Pending = Tuple[str, threading.Timer, CancellationToken]
+
+
+class Prefetcher:
+    """Debounced, per-session MCP.prefetch."""
+
+    def __init__(self, mcp: MCP, delay: float = PREFETCH_DELAY, min_chars: int = MIN_PREFETCH_CHARS):
+        """
+        Initialize the prefetcher.
+
+        Args:
+            mcp: MCP whose caches and model are warmed.
+            delay: Debounce interval in seconds.
+            min_chars: Shorter inputs are not prefetched.
+        """
+        self.mcp = mcp
+        self.delay = delay
+        self.min_chars = min_chars
+        self._pending: "OrderedDict[str, Pending]" = OrderedDict()  # Latest text per session
+        self._lock = threading.Lock()
+
+    def schedule(self, session_id: str, text: str, context: Dict[str, Any]):
+        """
+        Prefetch for ``text`` once the session stops typing, replacing earlier text.
+
+        Args:
+            session_id: Browser or client session.
+            text: Input typed so far.
+            context: Context for MCP.prefetch ('current_persona', 'session_id').
+        """
+        token = CancellationToken()
+        timer = threading.Timer(self.delay, self._run, args=(text, dict(context), token))
+        timer.daemon = True
+        evicted = None
+        with self._lock:
+            previous = self._pending.get(session_id)
+            if previous is not None and previous[0] == text:
+                return
+            if len(text.strip()) >= self.min_chars:
+                self._pending[session_id] = (text, timer, token)
+                self._pending.move_to_end(session_id)
+                if len(self._pending) > MAX_SESSIONS:
+                    evicted = self._pending.popitem(last=False)[1]
+            else:
+                self._pending.pop(session_id, None)
+                timer = None
+        for stale in (previous, evicted):
+            if stale is not None:
+                self._discard(stale)
+        if timer is not None:
+            timer.start()
+
+    def settle(self, session_id: str, final_text: Optional[str] = None):
+        """
+        The input was sent (or cleared): drop prefetch work for any other text.
+
+        Args:
+            session_id: Session whose input was sent.
+            final_text: Text actually sent; None discards everything.
+        """
+        with self._lock:
+            pending = self._pending.pop(session_id, None)
+        if pending is None:
+            return
+        text, timer, token = pending
+        timer.cancel()  # Not started yet: the request itself does the work
+        if text == final_text:
+            metrics.increment("prefetch.matched")
+        else:
+            self._discard(pending)
+
+    def _discard(self, pending: Pending):
+        _, timer, token = pending
+        timer.cancel()
+        token.cancel()
+        metrics.increment("prefetch.discarded")
+
+    def _run(self, text: str, context: Dict[str, Any], token: CancellationToken):
+        if token.cancelled:
+            return
+        metrics.increment("prefetch.runs")
+        try:
+            self.mcp.prefetch(text, context, cancel_token=token)
+        except Exception as e:
+            print(f"Error prefetching: {str(e)}")
+
+
+if __name__ == "__main__":
+    import time
+    from .bootstrap import build_mcp
+    prefetcher = Prefetcher(build_mcp())
+    context = {"current_persona": "generalist", "session_id": "demo"}
+    for partial in ["@se", "@search meet", "@search meeting"]:
+        prefetcher.schedule("demo", partial, context)
+        time.sleep(0.1)
+    time.sleep(1.0)
+    prefetcher.settle("demo", "@search meeting")
+    print(metrics.snapshot())
@@ -0,0 +1,207 @@
+# main/router.py
+"""
+Complexity-based model cascade: simple chatter goes to a small, fast model and
+complex or analytical queries go to a larger one. Decisions and their latency
+and backend cost are logged and recorded in metrics.
+
+The cascade is opt-in: unless $OLLAMA_SMALL_MODEL is set, both tiers use the
+large model. A routed model that the backend pool's health checks show is not
+installed on any host falls back to the large model.
+
+Routing happens once, before generation; there is no second pass on the small
+model's answer. Scores just below the threshold (``borderline_band``) also go
+to the large model but are logged and counted as 'borderline', so the metrics
+show how much traffic a higher threshold would move to the small model.
+"""
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .backends import BackendPool, get_default_pool
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+LARGE_MODEL = os.environ.get("OLLAMA_LARGE_MODEL", "llama3.1")
+SMALL_MODEL = os.environ.get("OLLAMA_SMALL_MODEL", LARGE_MODEL)
+SUMMARY_MODEL = os.environ.get("OLLAMA_SUMMARY_MODEL", SMALL_MODEL)
+
+ANALYTICAL_KEYWORDS = [
+    "analyze", "analyse", "complex", "plan", "compare", "evaluate", "design", "derive",
+    "prove", "explain why", "trade-off", "tradeoff", "step by step", "debug", "architecture",
+]
+
+
+def keyword_pattern(keyword: str) -> "re.Pattern":
+    """Case-insensitive whole-word pattern for a keyword or phrase ("plan" does not match "planet")."""
+    words = [re.escape(word) for word in keyword.split()]
+    return re.compile(r"\b" + r"\s+".join(words) + r"\b", re.IGNORECASE)
+
+
+ANALYTICAL_PATTERNS = [keyword_pattern(keyword) for keyword in ANALYTICAL_KEYWORDS]
+
+
+@dataclass
+class RoutingRule:
+    """Sends matching inputs to ``model``; rules are checked in order."""
+    name: str
+    model: str
+    keywords: List[str] = field(default_factory=list)  # Any keyword (whole words, case-insensitive) matches
+    min_words: Optional[int] = None  # Matches inputs with at least this many words
+    pattern: Optional[str] = None  # Regular expression searched in the input
+    _keyword_patterns: List["re.Pattern"] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._keyword_patterns = [keyword_pattern(keyword) for keyword in self.keywords]
+
+    def matches(self, user_input: str) -> bool:
+        """True if any configured condition matches the input."""
+        if any(pattern.search(user_input) for pattern in self._keyword_patterns):
+            return True
+        if self.min_words is not None and len(user_input.split()) >= self.min_words:
+            return True
+        if self.pattern and re.search(self.pattern, user_input):
+            return True
+        return False
+
+
+@dataclass
+class RoutingDecision:
+    """Outcome of routing one request."""
+    model: str
+    reason: str
+    score: float
+    borderline: bool = False  # Sent to the large model from just below the threshold
+
+
+class ModelRouter:
+    """Chooses a model per request from rules and a complexity score."""
+
+    def __init__(self, small_model: str = SMALL_MODEL, large_model: str = LARGE_MODEL,
+                 rules: Optional[List[RoutingRule]] = None, threshold: float = 0.5,
+                 borderline_band: Optional[Tuple[float, float]] = (0.35, 0.5),
+                 task_models: Optional[Dict[str, str]] = None, pool: Optional[BackendPool] = None):
+        """
+        Initialize the router.
+
+        Args:
+            small_model: Fast model for simple queries.
+            large_model: Capable model for complex queries.
+            rules: Explicit rules checked before scoring (default: analytical
+                keywords, code and long inputs go to the large model).
+            threshold: Complexity score at or above which the large model is used.
+            borderline_band: Scores in [low, high) also use the large model but
+                are tagged 'borderline' in logs and metrics; in effect ``low`` is
+                the large-model threshold. None sends them to the small model.
+            task_models: Fixed models for non-chat tasks (e.g. {'summarize': ...}).
+            pool: Backend pool whose health checks report installed models
+                (default: the shared pool, looked up when routing).
+        """
+        self.small_model = small_model
+        self.large_model = large_model
+        self.rules = rules if rules is not None else [
+            RoutingRule("analytical", large_model, keywords=ANALYTICAL_KEYWORDS),
+            RoutingRule("code", large_model, pattern=r"```|\bdef |\bclass |Traceback"),
+            RoutingRule("long", large_model, min_words=60),
+        ]
+        self.threshold = threshold
+        self.borderline_band = borderline_band
+        self.task_models = {"summarize": SUMMARY_MODEL, **(task_models or {})}
+        self.pool = pool
+
+    def complexity_score(self, user_input: str) -> float:
+        """
+        Cheap 0..1 estimate of how demanding a query is.
+
+        Args:
+            user_input: Raw user input.
+
+        Returns:
+            Score where 0 is trivial chatter and 1 is clearly complex.
+        """
+        text = user_input.lower()
+        words = len(user_input.split())
+        score = min(words / 80.0, 0.4)
+        score += 0.1 * min(text.count("?"), 2)
+        score += 0.3 * sum(1 for pattern in ANALYTICAL_PATTERNS if pattern.search(text))
+        if re.search(r"\d+\s*[-+*/^=]\s*\d+", text):
+            score += 0.1
+        return min(score, 1.0)
+
+    def route(self, user_input: str, task: str = "chat", record: bool = True) -> RoutingDecision:
+        """
+        Pick the model for a request.
+
+        Args:
+            user_input: Raw user input (or task input).
+            task: 'chat' or a key of ``task_models`` such as 'summarize'.
+            record: Count the decision in metrics; False for speculative
+                routing (e.g. prefetching while the user types).
+
+        Returns:
+            RoutingDecision with the chosen model and why.
+        """
+        if task in self.task_models:
+            decision = RoutingDecision(self.task_models[task], f"task:{task}", 0.0)
+        else:
+            score = self.complexity_score(user_input)
+            rule = next((r for r in self.rules if r.matches(user_input)), None)
+            if rule:
+                decision = RoutingDecision(rule.model, f"rule:{rule.name}", score)
+            elif score >= self.threshold:
+                decision = RoutingDecision(self.large_model, "score", score)
+            elif self.borderline_band and self.borderline_band[0] <= score < self.borderline_band[1]:
+                decision = RoutingDecision(self.large_model, "borderline", score, borderline=True)
+            else:
+                decision = RoutingDecision(self.small_model, "score", score)
+        if not self._available(decision.model):
+            decision = RoutingDecision(self.large_model, f"{decision.reason}+fallback", decision.score,
+                                       decision.borderline)
+
+        if not record:
+            return decision
+        metrics.increment(f"router.decisions.{decision.model}")
+        if decision.borderline:
+            metrics.increment("router.borderline")
+        logger.debug("Routed to %s (%s, score=%.2f)", decision.model, decision.reason, decision.score)
+        return decision
+
+    def model_for(self, task: str) -> str:
+        """Model for a non-chat task, falling back to the small model (and to the large one if missing)."""
+        model = self.task_models.get(task, self.small_model)
+        return model if self._available(model) else self.large_model
+
+    def _available(self, model: str) -> bool:
+        """False only if the pool's hosts have reported their models and none has this one."""
+        if model == self.large_model:
+            return True
+        return (self.pool or get_default_pool()).may_have_model(model)
+
+    def record(self, decision: RoutingDecision, latency: float, ttft: Optional[float] = None,
+               stats: Optional[Dict[str, Any]] = None):
+        """
+        Record the outcome of a routed request.
+
+        Args:
+            decision: Decision returned by route().
+            latency: Wall-clock seconds for the whole generation.
+            ttft: Seconds to first token, if known.
+            stats: Ollama done-frame stats (durations in nanoseconds).
+        """
+        stats = stats or {}
+        gpu_seconds = (stats.get("prompt_eval_duration", 0) + stats.get("eval_duration", 0)) / 1e9
+        metrics.observe(f"router.latency_seconds.{decision.model}", latency)
+        if ttft is not None:
+            metrics.observe(f"router.ttft_seconds.{decision.model}", ttft)
+        if gpu_seconds:
+            metrics.observe(f"router.backend_seconds.{decision.model}", gpu_seconds)
+        logger.info(
+            "model=%s reason=%s score=%.2f latency=%.2fs ttft=%s tokens=%s backend=%.2fs",
+            decision.model, decision.reason, decision.score, latency,
+            f"{ttft:.2f}s" if ttft is not None else "-", stats.get("eval_count", "-"), gpu_seconds,
+        )
+
+
+default_router = ModelRouter()
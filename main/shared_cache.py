@@ -0,0 +1,168 @@
+# main/shared_cache.py
+"""
+Cross-process cache tier: a small SQLite (WAL) key/value store that every
+worker process opens, so a response cached by one worker is served by all.
+Values are JSON; entries expire after a TTL and each namespace is trimmed to
+``max_entries`` (soonest-expiring first).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, MutableMapping, Optional, Union
+
+SHARED_CACHE_ENV = "QUIETEDGE_SHARED_CACHE"  # Path of the cache file workers share
+DEFAULT_TTL = 3600.0
+DEFAULT_MAX_ENTRIES = 10000
+TRIM_EVERY = 200  # Writes between expiry/size sweeps
+BUSY_TIMEOUT = 5.0
+
+_MISSING = object()
+
+
+class SharedCache:
+    """Dict-like cache backed by a SQLite file shared between processes."""
+
+    def __init__(self, path: str, namespace: str = "responses", ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Initialize the cache.
+
+        Args:
+            path: SQLite file (created if missing).
+            namespace: Key space, e.g. 'responses' or 'embeddings'.
+            ttl: Default seconds an entry lives.
+            max_entries: Entries kept per namespace.
+        """
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache (namespace, expires)")
+        conn.commit()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Cached value for a key.
+
+        Args:
+            key: Cache key.
+            default: Returned on a miss or expired entry.
+
+        Returns:
+            The decoded value or ``default``.
+        """
+        try:
+            row = self._conn().execute(
+                "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires > ?",
+                (self.namespace, self._hash(key), time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading shared cache: {str(e)}")
+            return default
+        return json.loads(row[0]) if row else default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """
+        Store a JSON-serializable value.
+
+        Args:
+            key: Cache key.
+            value: Value to store.
+            ttl: Seconds to keep it (default: the cache's ttl).
+        """
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, expires) VALUES (?, ?, ?, ?)",
+                    (self.namespace, self._hash(key), json.dumps(value), time.time() + (ttl or self.ttl))
+                )
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            print(f"Error writing shared cache: {str(e)}")
+            return
+        with self._writes_lock:
+            self._writes += 1
+            trim = self._writes % TRIM_EVERY == 0
+        if trim:
+            self.trim()
+
+    def delete(self, key: str):
+        """Remove a key."""
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, self._hash(key)))
+
+    def trim(self):
+        """Drop expired entries and the soonest-expiring ones beyond max_entries."""
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute("DELETE FROM cache WHERE namespace = ? AND expires <= ?", (self.namespace, time.time()))
+                count = conn.execute("SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+                if count > self.max_entries:
+                    conn.execute(
+                        "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                        "  SELECT key FROM cache WHERE namespace = ? ORDER BY expires LIMIT ?)",
+                        (self.namespace, self.namespace, count - self.max_entries)
+                    )
+        except sqlite3.Error as e:
+            print(f"Error trimming shared cache: {str(e)}")
+
+    def with_namespace(self, namespace: str, **options: Any) -> "SharedCache":
+        """Another namespace in the same file."""
+        return SharedCache(self.path, namespace, options.get("ttl", self.ttl), options.get("max_entries", self.max_entries))
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        self.set(key, value)
+
+    @staticmethod
+    def _hash(key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+
+def default_response_cache() -> Union[SharedCache, MutableMapping[str, Any]]:
+    """
+    Response cache for this process.
+
+    Returns:
+        A SharedCache on the file named by $QUIETEDGE_SHARED_CACHE (set by the
+        multi-worker launcher), else a plain per-process dict.
+    """
+    path = os.environ.get(SHARED_CACHE_ENV)
+    if path:
+        return SharedCache(path)
+    cache: Dict[str, Any] = {}
+    return cache
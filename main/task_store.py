@@ -0,0 +1,432 @@
+# main/task_store.py
+"""
+Indexed task store behind the TaskManager and Search tools.
+
+Tasks live in tasks.json as JSON lines, one full task state per line; adding
+or completing a task appends a line (the last line for an id wins), so each
+change costs one small append instead of rewriting the file. The log is
+compacted in place once superseded lines outnumber live tasks.
+
+Everything is answered from in-memory indexes built when the log is loaded:
+open tasks sit in heaps ordered by (due date, priority, age), one for all
+tasks plus one per priority and per tag, so "next N tasks" pops N entries
+instead of sorting the whole list. Description words go into an inverted
+index with a sorted vocabulary, so keyword and prefix lookups are a bisect
+plus the matches. Several processes may share the log: changes are appended
+under an advisory file lock and each store replays the other writers' lines
+before reading or writing.
+"""
+import bisect
+import fcntl
+import heapq
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+TASKS_FILE = "tasks.json"
+PRIORITY_RANK = {"high": 0, "medium": 1, "low": 2}
+COMPACT_MIN_LINES = 1000  # Never compact logs shorter than this
+WORD_PATTERN = re.compile(r"\w+")
+
+HeapEntry = Tuple[bool, str, int, int]  # (no due date, due, priority rank, task id)
+
+
+def parse_due(value: Optional[str]) -> Optional[str]:
+    """
+    Normalize a due date to YYYY-MM-DD.
+
+    Args:
+        value: ISO date, 'today', 'tomorrow', '+N' (days from today), or None.
+
+    Returns:
+        ISO date string, or None if no value was given.
+
+    Raises:
+        ValueError: If the value is not a recognizable date.
+    """
+    if not value:
+        return None
+    value = value.strip().lower()
+    if value == "today":
+        return date.today().isoformat()
+    if value == "tomorrow":
+        return (date.today() + timedelta(days=1)).isoformat()
+    if value.startswith("+") and value[1:].isdigit():
+        return (date.today() + timedelta(days=int(value[1:]))).isoformat()
+    try:
+        return date.fromisoformat(value[:10]).isoformat()
+    except ValueError:
+        raise ValueError(f"Unrecognized due date '{value}' (use YYYY-MM-DD, today, tomorrow or +N)")
+
+
+class TaskStore:
+    """JSON-lines task log with in-memory heap, tag and keyword indexes."""
+
+    _instances: Dict[str, "TaskStore"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path: str = TASKS_FILE):
+        """
+        Open (or create) a task log and build its indexes.
+
+        Args:
+            path: JSON-lines task file.
+        """
+        self.path = path
+        self._lock = threading.RLock()
+        self._file = None
+        self._inode = None
+        self._end = 0  # Bytes of the log already replayed
+        self._lines = 0  # Lines in the log, superseded ones included
+        self._reset()
+        self._load()
+
+    @classmethod
+    def shared(cls, path: str = TASKS_FILE) -> "TaskStore":
+        """
+        Process-wide store for a task file.
+
+        Args:
+            path: JSON-lines task file.
+
+        Returns:
+            The single TaskStore instance for that path.
+        """
+        key = os.path.abspath(path)
+        with cls._instances_lock:
+            store = cls._instances.get(key)
+            if store is None:
+                store = cls._instances[key] = cls(path)
+            return store
+
+    def add(self, description: str, priority: str = "medium", due: Optional[str] = None,
+            tags: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Add an open task.
+
+        Args:
+            description: What needs doing.
+            priority: high, medium or low.
+            due: Due date (see parse_due).
+            tags: Optional tags.
+
+        Returns:
+            The stored task.
+
+        Raises:
+            ValueError: For an unknown priority or unparseable due date.
+        """
+        priority = priority.lower()
+        if priority not in PRIORITY_RANK:
+            raise ValueError(f"Unknown priority '{priority}' (use high, medium or low)")
+        task = {
+            "description": description,
+            "priority": priority,
+            "due": parse_due(due),
+            "tags": list(dict.fromkeys(tag.strip().lower() for tag in (tags or []) if tag.strip())),
+            "done": False,
+            "created": time.time(),
+            "completed": None,
+        }
+        with self._lock:
+            with self._locked_log():
+                task["id"] = self._next_id  # Assigned under the file lock so processes never reuse ids
+                self._append(task)
+            return dict(task)
+
+    def complete(self, task_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Mark a task done.
+
+        Args:
+            task_id: Task id.
+
+        Returns:
+            The updated task, or None if there is no such task.
+        """
+        with self._lock:
+            with self._locked_log():
+                task = self._tasks.get(task_id)
+                if task is None:
+                    return None
+                if not task["done"]:
+                    self._append(dict(task, done=True, completed=time.time()))
+                    task = self._tasks[task_id]
+            self._maybe_compact()
+            return dict(task)
+
+    def get(self, task_id: int) -> Optional[Dict[str, Any]]:
+        """Task by id, or None."""
+        with self._lock:
+            self._refresh()
+            task = self._tasks.get(task_id)
+            return dict(task) if task else None
+
+    def next(self, limit: int = 10, priority: Optional[str] = None, tag: Optional[str] = None,
+             due_before: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Open tasks in order of due date (undated last), then priority, then age.
+
+        Pops at most ``limit`` valid entries (plus any stale ones, which are
+        dropped for good) from the most selective heap, so the cost is
+        O(limit log n) rather than a sort of every task.
+
+        Args:
+            limit: Maximum number of tasks.
+            priority: Only tasks with this priority.
+            tag: Only tasks with this tag.
+            due_before: Only tasks due on or before this date (see parse_due).
+
+        Returns:
+            Matching open tasks.
+        """
+        due_limit = parse_due(due_before)
+        with self._lock:
+            self._refresh()
+            if tag:
+                heap = self._heaps.get(("tag", tag.lower()), [])
+            elif priority:
+                heap = self._heaps.get(("priority", priority.lower()), [])
+            else:
+                heap = self._heaps[("all", "")]
+            taken: List[HeapEntry] = []
+            results = []
+            while heap and len(results) < limit:
+                entry = heapq.heappop(heap)
+                task = self._tasks.get(entry[3])
+                if task is None or task["done"] or self._heap_key(task) != entry:
+                    continue  # Stale entry: completed or superseded
+                taken.append(entry)
+                if due_limit and (task["due"] is None or task["due"] > due_limit):
+                    break  # Heap order is by due date, so nothing later qualifies
+                if priority and task["priority"] != priority.lower():
+                    continue
+                results.append(dict(task))
+            for entry in taken:
+                heapq.heappush(heap, entry)
+            return results
+
+    def completed(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Most recently completed tasks, newest first."""
+        with self._lock:
+            self._refresh()
+            results = []
+            for task_id in reversed(self._done_order):
+                task = self._tasks.get(task_id)
+                if task and task["done"]:
+                    results.append(dict(task))
+                    if len(results) >= limit:
+                        break
+            return results
+
+    def search(self, query: str, tag: Optional[str] = None, include_done: bool = True) -> List[Dict[str, Any]]:
+        """
+        Tasks whose description has words starting with every query word.
+
+        Args:
+            query: Keywords (empty matches every task with the tag).
+            tag: Only tasks with this tag.
+            include_done: Include completed tasks.
+
+        Returns:
+            Matching tasks, oldest first.
+        """
+        with self._lock:
+            self._refresh()
+            ids: Optional[Set[int]] = set(self._by_tag.get(tag.lower(), ())) if tag else None
+            for word in WORD_PATTERN.findall(query.lower()):
+                matches = self._prefix_matches(word)
+                ids = matches if ids is None else ids & matches
+                if not ids:
+                    return []
+            if ids is None:
+                return []
+            tasks = [self._tasks[task_id] for task_id in sorted(ids)]
+            return [dict(task) for task in tasks if include_done or not task["done"]]
+
+    def version(self) -> str:
+        """Token that changes whenever any process changes the log."""
+        with self._lock:
+            self._refresh()
+            return f"{self._inode}:{self._end}"
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._tasks)
+
+    def close(self):
+        """Close the log file."""
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def _reset(self):
+        """Empty indexes (before a full reload)."""
+        self._tasks: Dict[int, Dict[str, Any]] = {}
+        self._next_id = 1
+        self._heaps: Dict[Tuple[str, str], List[HeapEntry]] = defaultdict(list)
+        self._heaps[("all", "")] = []
+        self._by_tag: Dict[str, Set[int]] = defaultdict(set)
+        self._by_word: Dict[str, Set[int]] = defaultdict(set)
+        self._vocabulary: List[str] = []  # Keys of _by_word, sorted on demand for prefix lookups
+        self._vocabulary_sorted = True
+        self._done_order: List[int] = []
+
+    @staticmethod
+    def _heap_key(task: Dict[str, Any]) -> HeapEntry:
+        return (task["due"] is None, task["due"] or "", PRIORITY_RANK.get(task["priority"], 1), task["id"])
+
+    def _index(self, task: Dict[str, Any], bulk: bool = False):
+        """
+        Apply one task state from the log to the indexes.
+
+        Args:
+            task: Task state.
+            bulk: Append to the heaps without sifting (a full load heapifies once at the end).
+        """
+        task_id = task["id"]
+        previous = self._tasks.get(task_id)
+        if previous is not None:
+            for tag in previous["tags"]:
+                self._by_tag[tag].discard(task_id)
+            for word in set(WORD_PATTERN.findall(previous["description"].lower())):
+                self._by_word[word].discard(task_id)
+        self._tasks[task_id] = task
+        self._next_id = max(self._next_id, task_id + 1)
+        for tag in task["tags"]:
+            self._by_tag[tag].add(task_id)
+        for word in set(WORD_PATTERN.findall(task["description"].lower())):
+            if word not in self._by_word:
+                self._vocabulary.append(word)
+                self._vocabulary_sorted = False
+            self._by_word[word].add(task_id)
+        if task["done"]:
+            if previous is None or not previous["done"]:
+                self._done_order.append(task_id)
+        elif previous is None or previous["done"] or self._heap_key(previous) != self._heap_key(task):
+            # Superseded entries stay in the heaps and are skipped when popped
+            entry = self._heap_key(task)
+            push = list.append if bulk else heapq.heappush
+            push(self._heaps[("all", "")], entry)
+            push(self._heaps[("priority", task["priority"])], entry)
+            for tag in task["tags"]:
+                push(self._heaps[("tag", tag)], entry)
+
+    def _prefix_matches(self, prefix: str) -> Set[int]:
+        """Ids of tasks with a description word starting with ``prefix``."""
+        if not self._vocabulary_sorted:
+            self._vocabulary.sort()  # Once per batch of new words, not per insert
+            self._vocabulary_sorted = True
+        matches: Set[int] = set()
+        position = bisect.bisect_left(self._vocabulary, prefix)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(prefix):
+            matches |= self._by_word[self._vocabulary[position]]
+            position += 1
+        return matches
+
+    def _load(self):
+        """Open the log and replay it from the start."""
+        if self._file:
+            self._file.close()
+        self._file = open(self.path, "a+b")
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self._reset()
+        self._end = self._lines = 0
+        self._replay()
+
+    def _refresh(self):
+        """Pick up lines other processes appended, reloading if the log was replaced."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            st = None
+        if st is None or st.st_ino != self._inode or st.st_size < self._end:
+            self._load()
+        elif st.st_size > self._end:
+            self._replay()
+
+    def _replay(self):
+        """Index complete lines past the replayed end of the log."""
+        bulk = self._end == 0
+        self._file.seek(self._end)
+        for line in self._file:
+            if not line.endswith(b"\n"):
+                break  # Partial line still being written by another process
+            self._end += len(line)
+            self._lines += 1
+            try:
+                task = json.loads(line)
+                task["id"] = int(task["id"])
+            except (ValueError, KeyError, TypeError):
+                continue  # Skip damaged or foreign lines
+            task.setdefault("priority", "medium")
+            task.setdefault("due", None)
+            task.setdefault("tags", [])
+            task.setdefault("done", False)
+            task.setdefault("created", 0.0)
+            task.setdefault("completed", None)
+            self._index(task, bulk=bulk)
+        if bulk:
+            for heap in self._heaps.values():
+                heapq.heapify(heap)
+
+    def _append(self, task: Dict[str, Any]):
+        """Write one task state to the log and index it (caller holds the file lock)."""
+        line = json.dumps(task, ensure_ascii=False).encode("utf-8") + b"\n"
+        self._file.seek(0, os.SEEK_END)
+        if self._file.tell() > self._end:
+            self._file.truncate(self._end)  # Torn line from a crashed writer
+        self._file.write(line)
+        self._file.flush()
+        self._end += len(line)
+        self._lines += 1
+        self._index(task)
+
+    @contextmanager
+    def _locked_log(self):
+        """Hold the exclusive file lock with the log replayed to its end."""
+        while True:
+            self._refresh()
+            log = self._file
+            fcntl.flock(log.fileno(), fcntl.LOCK_EX)
+            self._refresh()
+            if self._file is log:
+                break
+            # Log was replaced (compaction, import) while we waited; closing the old file dropped the lock
+        try:
+            yield
+        finally:
+            fcntl.flock(log.fileno(), fcntl.LOCK_UN)
+
+    def _maybe_compact(self):
+        """Rewrite the log with one line per task once superseded lines dominate."""
+        if self._lines < COMPACT_MIN_LINES or self._lines < 2 * len(self._tasks):
+            return
+        tmp_path = f"{self.path}.compact"
+        try:
+            with self._locked_log():
+                with open(tmp_path, "wb") as tmp:
+                    for task_id in sorted(self._tasks):
+                        tmp.write(json.dumps(self._tasks[task_id], ensure_ascii=False).encode("utf-8") + b"\n")
+                    tmp.flush()
+                    os.fsync(tmp.fileno())
+                os.replace(tmp_path, self.path)
+            self._load()
+        except OSError as e:
+            print(f"Error compacting {self.path}: {str(e)}")
+
+
+if __name__ == "__main__":
+    store = TaskStore("tasks_demo.json")
+    store.add("Write the quarterly report", priority="high", due="+3", tags=["work"])
+    store.add("Buy groceries", priority="low", due="tomorrow")
+    print(store.next(5))
+    print(store.search("report"))
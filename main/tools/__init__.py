@@ -1,9 +1,27 @@
 # main/tools/__init__.py
 """
 Initialize the tools module, exposing tool classes.
+
+The tool classes are imported on first attribute access (PEP 562), so
+importing the package, or main.tools.registry, does not pull in the tools
+and their backend client until a tool is actually used.
 """
+import importlib
+
 from .base import Tool
-from .note_taker import NoteTaker
-from .search import Search
-from .summarize import Summarizer
-from .task_manager import TaskManager
+from .registry import BUILTIN_TOOLS, ToolRegistry, ToolResultCache
+
+# Public class name -> "module:Class" import spec
+_LAZY_CLASSES = {spec.rsplit(":", 1)[1]: spec for spec in BUILTIN_TOOLS.values()}
+
+__all__ = ["Tool", "ToolRegistry", "ToolResultCache", *_LAZY_CLASSES]
+
+
+def __getattr__(name: str):
+    spec = _LAZY_CLASSES.get(name)
+    if spec is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, class_name = spec.split(":")
+    value = getattr(importlib.import_module(module_name), class_name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
@@ -0,0 +1,75 @@
+# main/tools/base.py
+"""
+Base class shared by all MCP tools.
+"""
+import json
+from typing import Callable, Dict, Optional
+
+from main.cancellation import CancellationToken
+from main.generation import GenerationProfile
+
+
+class Tool:
+    """Base interface for tools invoked through @tags."""
+
+    name = "tool"
+    timeout = 10.0  # Seconds MCP waits for execute() before giving up on the call
+    generation: Optional[GenerationProfile] = None  # Limits for tools that call the model
+    cacheable = False  # True if output depends only on input, params and cache_version()
+    prefetchable = False  # True if cheap and side-effect free; MCP.prefetch may run it while the user types
+
+    def execute(self, input_text: str, params: Dict[str, str] = None) -> str:
+        """
+        Run the tool.
+
+        Args:
+            input_text: Text following the @tag.
+            params: Optional key=value parameters parsed from the tag.
+
+        Returns:
+            Tool output as a string.
+        """
+        raise NotImplementedError
+
+    def run(self, input_text: str, params: Dict[str, str] = None,
+            cancel_token: Optional[CancellationToken] = None,
+            on_progress: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Execute under a cancellation token.
+
+        Tools that call the model backend override this to forward the token
+        (and, if they are long-running, to report progress); the default only
+        refuses to start once the token is cancelled.
+
+        Args:
+            input_text: Text following the @tag.
+            params: Optional key=value parameters parsed from the tag.
+            cancel_token: Optional token cancelled when the request is abandoned.
+            on_progress: Optional callback for one-line progress messages.
+
+        Returns:
+            Tool output as a string.
+        """
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        return self.execute(input_text, params)
+
+    def cache_key(self, input_text: str, params: Dict[str, str] = None) -> Optional[str]:
+        """
+        Key under which ToolRegistry caches this call's output.
+
+        Args:
+            input_text: Text following the @tag.
+            params: Optional key=value parameters parsed from the tag.
+
+        Returns:
+            Key string, or None if the call must always run (the default for
+            tools that are not ``cacheable``).
+        """
+        if not self.cacheable:
+            return None
+        return json.dumps([self.name, self.cache_version(), input_text, sorted((params or {}).items())])
+
+    def cache_version(self) -> str:
+        """Token that changes whenever data the tool reads changes, invalidating cached results."""
+        return ""
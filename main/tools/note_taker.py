@@ -1,9 +1,57 @@
-# tools/note_taker.py
+# main/tools/note_taker.py
 """
-Simple note-taking tool: appends to a local file.
+Note-taking tool: records structured notes in the shared note log.
 """
+from typing import Dict, Optional
+from main.note_store import NoteStore
+from .base import Tool
 
-def note_taker_tool(note: str) -> str:
-    with open('notes.txt', 'a') as f:
-        f.write(note + '\n')
-    return "Note saved."
+
+class NoteTaker(Tool):
+    """Tool for saving notes with a priority and tags (searchable with @search)."""
+
+    name = "note"
+
+    def __init__(self, store: Optional[NoteStore] = None):
+        """
+        Initialize the tool.
+
+        Args:
+            store: Note log (default: NoteStore.shared(), the one Search reads).
+        """
+        self._store = store
+
+    @property
+    def store(self) -> NoteStore:
+        """Note log (opened on first use)."""
+        if self._store is None:
+            self._store = NoteStore.shared()
+        return self._store
+
+    def execute(self, note: str, params: Dict[str, str] = None) -> str:
+        """
+        Save a note.
+
+        Args:
+            note: Note text; #words are also recorded as tags.
+            params: Optional parameters (e.g., {'priority': 'high', 'tags': 'work,meeting'}).
+
+        Returns:
+            Confirmation or error message.
+        """
+        params = params or {}
+        note = note.strip()
+        if not note:
+            return "Error: Note is empty."
+        tags = params.get('tags', params.get('tag', '')).split(',')
+        tags += [word.lstrip('#') for word in note.split() if word.startswith('#') and len(word) > 1]
+        record = self.store.add(note, priority=params.get('priority', 'medium'), tags=tags)
+        details = f"priority: {record['priority']}"
+        if record['tags']:
+            details += f", tags: {', '.join(record['tags'])}"
+        return f"Note saved ({details})."
+
+
+if __name__ == "__main__":
+    note_taker = NoteTaker()
+    print(note_taker.execute("Call Bob about the #meeting", {"priority": "high", "tags": "work"}))
@@ -0,0 +1,231 @@
+# main/tools/registry.py
+"""
+Tool registry with lazy construction and a shared result cache.
+
+Tools are registered by name with an import spec ("module:Class"), a factory
+or an instance, and are only imported and constructed the first time they are
+called. Calls go through ToolRegistry.run, which serves repeated calls from a
+size-bounded LRU cache when the tool is ``cacheable``. The tool's cache_key()
+decides what counts as the same call, and cache_version() invalidates: Search
+keys on the note/task log positions, so any write produces new keys, and
+Summarizer keys on a hash of the text. Per-tool hits and misses are counted
+in main.metrics (tools.cache.hit.<name> / tools.cache.miss.<name>).
+"""
+import importlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+from main.cancellation import CancellationToken
+from main.metrics import metrics
+from .base import Tool
+
+# Built-in tools, imported on first use
+BUILTIN_TOOLS: Dict[str, str] = {
+    "note": "main.tools.note_taker:NoteTaker",
+    "search": "main.tools.search:Search",
+    "summarize": "main.tools.summarize:Summarizer",
+    "task": "main.tools.task_manager:TaskManager",
+}
+RESULT_CACHE_ENTRIES = 1024
+RESULT_CACHE_BYTES = 8 * 1024 * 1024  # Approximate: characters of keys plus values
+
+ToolSpec = Union[str, Callable[[], Tool], Tool]
+
+
+class ToolResultCache:
+    """Thread-safe LRU of tool outputs bounded by entry count and size."""
+
+    def __init__(self, max_entries: int = RESULT_CACHE_ENTRIES, max_bytes: int = RESULT_CACHE_BYTES):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum cached outputs.
+            max_bytes: Maximum total size of keys and outputs.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str):
+        size = len(key) + len(value)
+        if size > self.max_bytes:
+            return  # Would evict everything else
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(key) + len(old)
+            self._entries[key] = value
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                old_key, old_value = self._entries.popitem(last=False)
+                self._bytes -= len(old_key) + len(old_value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ToolRegistry:
+    """Name -> tool mapping that constructs tools on first use and caches their results."""
+
+    def __init__(self, tools: Optional[Iterable[Tool]] = None, specs: Optional[Dict[str, ToolSpec]] = None,
+                 cache: Optional[ToolResultCache] = None):
+        """
+        Initialize the registry.
+
+        Args:
+            tools: Already constructed tools, registered under their names.
+            specs: Lazily constructed tools: name -> "module:Class", factory or instance.
+            cache: Result cache (default: a new ToolResultCache).
+        """
+        self.cache = cache if cache is not None else ToolResultCache()
+        self._specs: Dict[str, ToolSpec] = {}
+        self._tools: Dict[str, Tool] = {}
+        self._lock = threading.Lock()
+        for name, spec in (specs or {}).items():
+            self.register(name, spec)
+        for tool in tools or []:
+            self.register(tool.name, tool)
+
+    @classmethod
+    def builtin(cls, **options) -> "ToolRegistry":
+        """Registry of the built-in tools (note, search, summarize, task)."""
+        return cls(specs=BUILTIN_TOOLS, **options)
+
+    def register(self, name: str, spec: ToolSpec):
+        """
+        Register (or replace) a tool.
+
+        Args:
+            name: Tag name, e.g. 'search' for @search.
+            spec: "module:Class" import path, zero-argument factory, or Tool instance.
+        """
+        name = name.lower()
+        with self._lock:
+            self._specs[name] = spec
+            self._tools.pop(name, None)
+            if isinstance(spec, Tool):
+                self._tools[name] = spec
+
+    def get(self, name: str) -> Optional[Tool]:
+        """
+        Tool by name, constructing it on first use.
+
+        Args:
+            name: Tool name (case-insensitive).
+
+        Returns:
+            The tool, or None if it is unknown or fails to load.
+        """
+        name = name.lower()
+        tool = self._tools.get(name)
+        if tool is not None:
+            return tool
+        with self._lock:
+            tool = self._tools.get(name)
+            if tool is None and name in self._specs:
+                try:
+                    tool = self._tools[name] = self._construct(self._specs[name])
+                except Exception as e:
+                    print(f"Error loading tool '{name}': {str(e)}")
+                    return None
+            return tool
+
+    def run(self, name: str, input_text: str, params: Dict[str, str] = None,
+            cancel_token: Optional[CancellationToken] = None,
+            on_progress: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Run a tool, serving repeated cacheable calls from the result cache.
+
+        Args:
+            name: Tool name.
+            input_text: Text following the @tag.
+            params: Optional key=value parameters.
+            cancel_token: Optional token forwarded to the tool.
+            on_progress: Optional progress callback forwarded to the tool
+                (not called on a cache hit).
+
+        Returns:
+            Tool output.
+
+        Raises:
+            KeyError: If the tool is unknown.
+        """
+        name = name.lower()
+        tool = self.get(name)
+        if tool is None:
+            raise KeyError(name)
+        key = tool.cache_key(input_text, params)
+        if key is None:
+            return tool.run(input_text, params, cancel_token, on_progress)
+        cached = self.cache.get(key)
+        if cached is not None:
+            metrics.increment(f"tools.cache.hit.{name}")
+            return cached
+        metrics.increment(f"tools.cache.miss.{name}")
+        output = tool.run(input_text, params, cancel_token, on_progress)
+        # Errors and output from abandoned calls are not reused
+        if not output.startswith("Error") and not (cancel_token is not None and cancel_token.cancelled):
+            self.cache.put(key, output)
+        return output
+
+    def cache_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-tool result cache hits, misses and hit rate (cacheable tools that have run)."""
+        stats = {}
+        for name in self.loaded():
+            hits = metrics.get(f"tools.cache.hit.{name}")
+            misses = metrics.get(f"tools.cache.miss.{name}")
+            if hits or misses:
+                stats[name] = {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses)}
+        return stats
+
+    def names(self) -> List[str]:
+        """Registered tool names (loaded or not)."""
+        return list(self._specs)
+
+    def loaded(self) -> List[str]:
+        """Names of tools constructed so far."""
+        return list(self._tools)
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self._specs
+
+    def __getitem__(self, name: str) -> Tool:
+        tool = self.get(name)
+        if tool is None:
+            raise KeyError(name)
+        return tool
+
+    @staticmethod
+    def _construct(spec: ToolSpec) -> Tool:
+        if isinstance(spec, str):
+            module_name, _, class_name = spec.partition(":")
+            return getattr(importlib.import_module(module_name), class_name)()
+        return spec()
+
+
+if __name__ == "__main__":
+    registry = ToolRegistry.builtin()
+    print(registry.names(), registry.loaded())
+    print(registry.run("search", "meeting"))
+    print(registry.run("search", "meeting"))
+    print(registry.loaded(), registry.cache_stats())
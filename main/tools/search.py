@@ -2,8 +2,9 @@
 """
 Search tool for finding notes and tasks by keywords or tags.
 """
-import json
 from typing import Dict, Optional
+from main.note_store import NoteStore
+from main.task_store import TaskStore
 from .base import Tool
 
 
@@ -11,6 +12,11 @@ class Search(Tool):
     """Tool for searching stored notes and tasks."""
 
     name = "search"
+    cacheable = True  # Keyed on the note and task log positions, so any write invalidates
+    prefetchable = True
+
+    def cache_version(self) -> str:
+        return f"{NoteStore.shared().version()}|{TaskStore.shared().version()}"
 
     def execute(self, query: str, params: Dict[str, str] = None) -> str:
         """
@@ -27,26 +33,20 @@ class Search(Tool):
         tag_filter = params.get('tag', '').lower()
         results = []
 
-        # Search notes
-        try:
-            with open('notes.json', 'r') as f:
-                for line in f:
-                    note = json.loads(line.strip())
-                    if (query.lower() in note['content'].lower() or
-                            (tag_filter and tag_filter in [t.lower() for t in note.get('tags', [])])):
-                        results.append(f"Note: {note['content']} (Priority: {note.get('priority', 'medium')}, Tags: {note.get('tags', [])})")
-        except FileNotFoundError:
-            pass
-
-        # Search tasks
-        try:
-            with open('tasks.json', 'r') as f:
-                for line in f:
-                    task = json.loads(line.strip())
-                    if query.lower() in task['description'].lower():
-                        results.append(f"Task: {task['description']} (Priority: {task.get('priority', 'medium')})")
-        except FileNotFoundError:
-            pass
+        # Search notes (the log NoteTaker writes, including notes not yet flushed)
+        for note in NoteStore.shared().records():
+            if (query.lower() in note['content'].lower() or
+                    (tag_filter and tag_filter in [t.lower() for t in note.get('tags', [])])):
+                results.append(f"Note: {note['content']} (Priority: {note.get('priority', 'medium')}, Tags: {note.get('tags', [])})")
+
+        # Search tasks (keyword/prefix and tag indexes, no file scan)
+        tasks = TaskStore.shared()
+        matches = {task['id']: task for task in tasks.search(query)}
+        if tag_filter:
+            matches.update((task['id'], task) for task in tasks.search("", tag=tag_filter))
+        for task in sorted(matches.values(), key=lambda task: task['id']):
+            status = ", done" if task['done'] else ""
+            results.append(f"Task: {task['description']} (Priority: {task['priority']}{status})")
 
         if results:
             return "\n".join(f"{i+1}. {result}" for i, result in enumerate(results))
@@ -1,26 +1,161 @@
 # main/tools/summarize.py
 """
 Summarization tool for condensing text content.
+
+Short inputs are summarized in a single prompt. Long inputs go through a
+map-reduce pass: the text is split on paragraph/sentence boundaries into
+chunks that fit a token budget, chunks are summarized in parallel, and the
+partial summaries are reduced hierarchically into one summary. Chunk
+summaries are cached by content hash so re-summarizing a mostly unchanged
+document only pays for the chunks that changed. If any chunk fails, the whole
+summary fails with that chunk's error instead of reducing a partial result.
+Chunk progress is reported through the tool's on_progress callback, which MCP
+streams into the reply while the summary runs.
 """
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
 from .base import Tool
-from main.ollama_assistant import OllamaAssistant
+from main.cancellation import CancellationToken, CancelledError
+from main.generation import GenerationProfile
+from main.ollama_assistant import OllamaAssistant, get_default_assistant
+from main.router import default_router
+
+CHUNK_TOKEN_BUDGET = 1500  # Approximate prompt tokens per chunk
+MAX_PARALLEL_CHUNKS = 4
+CHUNK_TIMEOUT = 60  # Seconds per chunk/reduce request
+SUMMARY_CACHE_SIZE = 1024
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return max(1, len(text) // 4)
+
+
+def split_into_chunks(text: str, token_budget: int = CHUNK_TOKEN_BUDGET) -> List[str]:
+    """
+    Split text into chunks of at most ``token_budget`` estimated tokens.
+
+    Paragraphs are kept together where possible, then sentences, and only
+    oversized sentences are split on word boundaries.
+
+    Args:
+        text: Text to split.
+        token_budget: Maximum estimated tokens per chunk.
+
+    Returns:
+        List of non-empty chunks in document order.
+    """
+    units = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= token_budget:
+            units.append(paragraph)
+            continue
+        for sentence in _SENTENCE_BOUNDARY.split(paragraph):
+            if estimate_tokens(sentence) <= token_budget:
+                units.append(sentence)
+                continue
+            words, current = sentence.split(), []
+            for word in words:
+                if current and estimate_tokens(" ".join(current + [word])) > token_budget:
+                    units.append(" ".join(current))
+                    current = []
+                current.append(word)
+            if current:
+                units.append(" ".join(current))
+
+    chunks, current, current_tokens = [], [], 0
+    for unit in units:
+        unit_tokens = estimate_tokens(unit)
+        if current and current_tokens + unit_tokens > token_budget:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+class ChunkSummaryError(Exception):
+    """A chunk could not be summarized; carries the backend's error message."""
+
+
+@dataclass
+class SummaryProgress:
+    """Progress of a chunked summarization pass."""
+    level: int  # 0 for the map pass, 1+ for reduce passes
+    completed: int
+    total: int
+    cached: int
+
+    def describe(self) -> str:
+        """One-line progress message, e.g. 'summarized 3/8 chunks (2 cached)'."""
+        unit = "chunks" if self.level == 0 else f"partial summaries (pass {self.level})"
+        verb = "summarized" if self.level == 0 else "combined"
+        cached = f" ({self.cached} cached)" if self.cached else ""
+        return f"{verb} {self.completed}/{self.total} {unit}{cached}"
 
 
 class Summarizer(Tool):
     """Tool for summarizing text content."""
 
     name = "summarize"
+    timeout = 120.0
+    cacheable = True
+    # max_tokens is set per call from the requested summary length
+    generation = GenerationProfile(max_tokens=None, temperature=0.2, time_budget=60.0, truncation_marker="")
+
+    # Chunk summaries shared across instances, keyed by content hash
+    _chunk_cache: "OrderedDict[str, str]" = OrderedDict()
+    _cache_lock = threading.Lock()
+
+    def __init__(self, chunk_tokens: int = CHUNK_TOKEN_BUDGET, max_workers: int = MAX_PARALLEL_CHUNKS,
+                 model: Optional[str] = None):
+        # Summaries run on the router's cheap summarization model unless overridden
+        self.model = model or default_router.model_for("summarize")
+        self.chunk_tokens = chunk_tokens
+        self.max_workers = max_workers
+
+    @property
+    def ollama(self) -> OllamaAssistant:
+        """Shared backend client (resolved on first use)."""
+        return get_default_assistant()
 
-    def __init__(self):
-        self.ollama = OllamaAssistant()
+    def run(self, input_text: str, params: Dict[str, str] = None,
+            cancel_token: Optional[CancellationToken] = None,
+            on_progress: Optional[Callable[[str], None]] = None) -> str:
+        """Execute with the cancellation token forwarded to every backend call."""
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        return self.execute(input_text, params, cancel_token=cancel_token, on_progress=on_progress)
 
-    def execute(self, input_text: str, params: Dict[str, str] = None) -> str:
+    def cache_key(self, input_text: str, params: Dict[str, str] = None) -> Optional[str]:
+        """Content hash of the text plus the model and parameters that shape the summary."""
+        digest = hashlib.sha256(input_text.encode("utf-8")).hexdigest()
+        return f"summarize:{self.model}:{sorted((params or {}).items())}:{digest}"
+
+    def execute(self, input_text: str, params: Dict[str, str] = None,
+                cancel_token: Optional[CancellationToken] = None,
+                on_progress: Optional[Callable[[str], None]] = None) -> str:
         """
         Summarize the input text with optional length control.
 
         Args:
             input_text: Text to summarize.
-            params: Optional parameters (e.g., {'length': 'short'}).
+            params: Optional parameters (e.g., {'length': 'short', 'mode': 'chunked'}).
+            cancel_token: Optional token that aborts outstanding requests.
+            on_progress: Optional callback given a progress line after each
+                chunk of a chunked summary.
 
         Returns:
             Summarized text or error message.
@@ -32,11 +167,150 @@ class Summarizer(Tool):
         if not input_text.strip():
             return "Error: Empty input text"
 
+        if params.get('mode') == 'chunked' or estimate_tokens(input_text) > self.chunk_tokens:
+            report = (lambda progress: on_progress(progress.describe())) if on_progress else None
+            return self.summarize_chunked(input_text, max_words, on_progress=report, cancel_token=cancel_token)
+
         prompt = (
             f"Summarize the following text in approximately {max_words} words, "
             f"preserving key points:\n\n{input_text}"
         )
-        return self.ollama.generate_sync(prompt)
+        return self._generate(prompt, max_words, 10, cancel_token)
+
+    def summarize_chunked(self, input_text: str, max_words: int = 100,
+                          on_progress: Optional[Callable[[SummaryProgress], None]] = None,
+                          cancel_token: Optional[CancellationToken] = None) -> str:
+        """
+        Map-reduce summarization for inputs larger than one prompt.
+
+        Args:
+            input_text: Text to summarize.
+            max_words: Target length of the final summary.
+            on_progress: Optional callback invoked after every chunk completes.
+            cancel_token: Optional token that aborts outstanding chunk requests.
+
+        Returns:
+            Final summary, or the first chunk's error message if any chunk failed.
+
+        Raises:
+            CancelledError: If the token is cancelled mid-summarization.
+        """
+        try:
+            partials = self._summarize_chunks(split_into_chunks(input_text, self.chunk_tokens),
+                                              max_words, 0, on_progress, cancel_token)
+            level = 1
+            while len(partials) > 1 and estimate_tokens("\n\n".join(partials)) > self.chunk_tokens:
+                groups = split_into_chunks("\n\n".join(partials), self.chunk_tokens)
+                if len(groups) >= len(partials):
+                    # Partials are individually too large to group; pair them to guarantee progress
+                    groups = ["\n\n".join(partials[i:i + 2]) for i in range(0, len(partials), 2)]
+                partials = self._summarize_chunks(groups, max_words, level, on_progress, cancel_token)
+                level += 1
+        except ChunkSummaryError as e:
+            return str(e)
+
+        if len(partials) == 1:
+            return partials[0]
+        prompt = (
+            f"Combine the following partial summaries into a single summary of approximately "
+            f"{max_words} words, preserving key points and their order:\n\n" + "\n\n".join(partials)
+        )
+        return self._generate(prompt, max_words, CHUNK_TIMEOUT, cancel_token)
+
+    def _summarize_chunks(self, chunks: List[str], max_words: int, level: int,
+                          on_progress: Optional[Callable[[SummaryProgress], None]],
+                          cancel_token: Optional[CancellationToken] = None) -> List[str]:
+        """
+        Summarize chunks in parallel, reusing cached chunk summaries.
+
+        Args:
+            chunks: Chunks to summarize.
+            max_words: Target words per chunk summary.
+            level: Reduce level, reported in progress updates.
+            on_progress: Optional progress callback.
+            cancel_token: Optional token that aborts outstanding chunk requests.
+
+        Returns:
+            Chunk summaries in chunk order.
+
+        Raises:
+            ChunkSummaryError: If a chunk fails; outstanding chunk requests are cancelled.
+        """
+        results: List[Optional[str]] = [None] * len(chunks)
+        keys = [self._cache_key(chunk, max_words) for chunk in chunks]
+        misses = []
+        with self._cache_lock:
+            for i, key in enumerate(keys):
+                if key in self._chunk_cache:
+                    self._chunk_cache.move_to_end(key)
+                    results[i] = self._chunk_cache[key]
+                else:
+                    misses.append(i)
+
+        cached = len(chunks) - len(misses)
+        completed = cached
+        if on_progress and cached:
+            on_progress(SummaryProgress(level, completed, len(chunks), cached))
+
+        chunk_token = CancellationToken()  # Cancelled by the caller's token or by a failed chunk
+        unregister = cancel_token.register(chunk_token.cancel) if cancel_token is not None else (lambda: None)
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {
+                    executor.submit(self._summarize_chunk, chunks[i], max_words, chunk_token): i
+                    for i in misses
+                }
+                for future in as_completed(futures):
+                    if cancel_token is not None and cancel_token.cancelled:
+                        for pending in futures:
+                            pending.cancel()
+                        raise CancelledError("Summarization cancelled")
+                    i = futures[future]
+                    summary = future.result()
+                    if summary.startswith("Error"):
+                        for pending in futures:
+                            pending.cancel()
+                        chunk_token.cancel()
+                        raise ChunkSummaryError(summary)
+                    results[i] = summary
+                    self._cache_put(keys[i], summary)
+                    completed += 1
+                    if on_progress:
+                        on_progress(SummaryProgress(level, completed, len(chunks), cached))
+        finally:
+            unregister()
+        return results
+
+    def _summarize_chunk(self, chunk: str, max_words: int,
+                         cancel_token: Optional[CancellationToken] = None) -> str:
+        """Summarize a single chunk."""
+        prompt = (
+            f"Summarize the following section of a longer document in approximately "
+            f"{max_words} words, preserving key points:\n\n{chunk}"
+        )
+        return self._generate(prompt, max_words, CHUNK_TIMEOUT, cancel_token)
+
+    def _generate(self, prompt: str, max_words: int, timeout: int,
+                  cancel_token: Optional[CancellationToken]) -> str:
+        """Run one summarization prompt under the tool's generation profile."""
+        # ~1.3 tokens per English word, with headroom so summaries are not cut mid-sentence
+        profile = self.generation.with_overrides(max_tokens=max_words * 2)
+        return self.ollama.generate_sync(prompt, timeout=timeout, cancel_token=cancel_token,
+                                         model=self.model, profile=profile)
+
+    def _cache_key(self, chunk: str, max_words: int) -> str:
+        """Content hash of a chunk plus the settings that affect its summary."""
+        digest = hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+        return f"{self.model}:{max_words}:{digest}"
+
+    @classmethod
+    def _cache_put(cls, key: str, summary: str):
+        """Store a chunk summary, evicting the least recently used entries."""
+        with cls._cache_lock:
+            cls._chunk_cache[key] = summary
+            cls._chunk_cache.move_to_end(key)
+            while len(cls._chunk_cache) > SUMMARY_CACHE_SIZE:
+                cls._chunk_cache.popitem(last=False)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+# main/tools/task_manager.py
+"""
+Task tool: add, complete and list tasks in the shared task store.
+"""
+from typing import Any, Dict, Optional
+from main.task_store import TaskStore
+from .base import Tool
+
+LIST_COMMANDS = {"list", "next", "todo"}
+DONE_COMMANDS = {"done", "completed"}
+
+
+class TaskManager(Tool):
+    """Tool for managing tasks with priorities, due dates and tags."""
+
+    name = "task"
+
+    def __init__(self, store: Optional[TaskStore] = None):
+        """
+        Initialize the tool.
+
+        Args:
+            store: Task store (default: TaskStore.shared(), the one Search reads).
+        """
+        self._store = store
+
+    @property
+    def store(self) -> TaskStore:
+        """Task store (loaded on first use)."""
+        if self._store is None:
+            self._store = TaskStore.shared()
+        return self._store
+
+    def execute(self, command: str, params: Dict[str, str] = None) -> str:
+        """
+        Add, complete or list tasks.
+
+        Examples:
+            @task Write report priority=high due=2026-10-30 tags=work
+            @task complete=3
+            @task list priority=high tag=work due=+7 limit=5
+            @task done
+
+        Args:
+            command: Task description, or list/next/done.
+            params: Optional parameters (priority, due, tags/tag, complete, limit).
+
+        Returns:
+            Confirmation, task list or error message.
+        """
+        params = params or {}
+        command = command.strip()
+        try:
+            if 'complete' in params:
+                task = self.store.complete(int(params['complete']))
+                if task is None:
+                    return f"Error: No task #{params['complete']}."
+                return f"Completed task #{task['id']}: {task['description']}"
+
+            limit = int(params.get('limit', 10))
+            if command.lower() in LIST_COMMANDS:
+                tasks = self.store.next(limit, priority=params.get('priority'), tag=params.get('tag'),
+                                        due_before=params.get('due'))
+                return "\n".join(self._format(task) for task in tasks) or "No open tasks."
+            if command.lower() in DONE_COMMANDS:
+                tasks = self.store.completed(limit)
+                return "\n".join(self._format(task) for task in tasks) or "No completed tasks."
+
+            if not command:
+                return "Error: Task description is empty."
+            tags = params.get('tags', params.get('tag', '')).split(',')
+            task = self.store.add(command, priority=params.get('priority', 'medium'), due=params.get('due'),
+                                  tags=tags)
+            return f"Task #{task['id']} added: {self._format(task)}"
+        except ValueError as e:
+            return f"Error: {str(e)}"
+
+    @staticmethod
+    def _format(task: Dict[str, Any]) -> str:
+        details = [f"Priority: {task['priority']}"]
+        if task['due']:
+            details.append(f"Due: {task['due']}")
+        if task['tags']:
+            details.append(f"Tags: {', '.join(task['tags'])}")
+        status = "✓" if task['done'] else "•"
+        return f"{status} #{task['id']} {task['description']} ({', '.join(details)})"
+
+
+if __name__ == "__main__":
+    task_manager = TaskManager()
+    print(task_manager.execute("Write the quarterly report", {"priority": "high", "due": "+3", "tags": "work"}))
+    print(task_manager.execute("list", {"tag": "work"}))
@@ -0,0 +1,423 @@
+# main/transfer.py
+"""
+Streaming export/import of memory databases and tool data files.
+
+A bundle is one gzip'd JSON-lines stream of sections: each SQLite database
+(memory.db and any shard files) and each JSON-lines data file (notes.json,
+tasks.json). Every section ends with a record count and a SHA-256 of its
+lines so imports are verified before they are committed. Both directions run
+in constant memory: rows are read with fetchmany and written with
+executemany in large batches.
+
+Section names are relative to the deployment root, whatever directory the
+files were exported from: databases and data files by file name, shard files
+as "<shard dir>/shard-NNN.db". Source databases are opened read-only and
+exported in whatever schema version they have; imports migrate.
+
+A merge import (replace=False) keeps what is already there. Memory rows from
+both sides are re-sequenced by their original timestamps, so old imported
+context never becomes a persona's latest. Imported tasks get fresh ids after
+the local ones, since the task log keeps the last line per id and a colliding
+id would silently overwrite a local task.
+"""
+import base64
+import gzip
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from urllib.request import pathname2url
+from typing import Any, Callable, Dict, IO, Iterable, List, Optional, Tuple
+
+from .memory_schema import migrate
+from .task_store import TASKS_FILE
+
+BUNDLE_FORMAT = "quietedge-bundle"
+BUNDLE_VERSION = 1
+BATCH_SIZE = 50000  # Rows per fetchmany/executemany
+DEFAULT_DATA_FILES = ["notes.json", "tasks.json"]
+SHARD_FILE_PATTERN = re.compile(r"shard-\d+\.db$")  # See ShardedMemory.shard_path
+
+_encode = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+_CONTEXT_COLUMNS = "persona, context_key, context_value, encoding, timestamp"
+
+
+class TransferError(Exception):
+    """Raised when a bundle is malformed or fails verification."""
+
+
+class _SectionWriter:
+    """Writes the lines of one section and tracks its count and digest."""
+
+    def __init__(self, out: IO[bytes]):
+        self.out = out
+        self.count = 0
+        self.digest = hashlib.sha256()
+
+    def write_many(self, records: List[Dict[str, Any]]):
+        """Write a batch of records with one compressor call."""
+        if not records:
+            return
+        data = ("\n".join(_encode(record) for record in records) + "\n").encode("utf-8")
+        self.out.write(data)
+        self.digest.update(data)
+        self.count += len(records)
+
+
+def _bundle_name(path: str) -> str:
+    """Bundle name for a local path: its file name, under its directory's name for shard files."""
+    path = os.path.abspath(path)
+    name = os.path.basename(path)
+    if SHARD_FILE_PATTERN.match(name):
+        return f"{os.path.basename(os.path.dirname(path))}/{name}"
+    return name
+
+
+# Rows as (persona, context_key, context_value, encoding, timestamp) in insertion order
+_EXPORT_QUERY_V2 = "SELECT persona, context_key, context_value, encoding, timestamp FROM contexts ORDER BY seq"
+# Schema v1 rows converted the way the v2 migration does (see memory_schema._upgrade_v2)
+_EXPORT_QUERY_V1 = """
+    SELECT lower(persona), context_key, context_value, 0, COALESCE(CAST(strftime('%s', timestamp) AS REAL), 0)
+    FROM contexts WHERE persona IS NOT NULL AND context_value IS NOT NULL ORDER BY timestamp, rowid
+"""
+
+
+def _export_query(conn: sqlite3.Connection) -> Optional[str]:
+    """Query for the source's schema, or None if it has no contexts table."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(contexts)")}
+    if not columns:
+        return None
+    return _EXPORT_QUERY_V2 if "seq" in columns else _EXPORT_QUERY_V1
+
+
+def _safe_target(dest: str, name: str) -> str:
+    """Path under ``dest`` for a bundle name, refusing names that escape it."""
+    if os.path.isabs(name) or ".." in name.split("/"):
+        raise TransferError(f"Refusing unsafe path in bundle: {name}")
+    return os.path.join(dest, *name.split("/"))
+
+
+def _write_header(out: IO[bytes], kind: str, name: str):
+    out.write((json.dumps({"t": kind, "name": name}) + "\n").encode("utf-8"))
+
+
+def _write_trailer(out: IO[bytes], section: _SectionWriter):
+    trailer = {"t": "end", "count": section.count, "sha256": section.digest.hexdigest()}
+    out.write((json.dumps(trailer) + "\n").encode("utf-8"))
+
+
+def export_database(out: IO[bytes], db_path: str, name: Optional[str] = None) -> int:
+    """
+    Write one memory database as a bundle section.
+
+    The file is opened read-only and never migrated. Rows are read inside a
+    single read transaction, so the export is a consistent snapshot even
+    while the app keeps writing (WAL mode).
+
+    Args:
+        out: Binary stream to write to.
+        db_path: SQLite file to export.
+        name: Name recorded in the bundle (default: see _bundle_name).
+
+    Returns:
+        Number of rows exported.
+    """
+    uri = f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, isolation_level=None)
+    try:
+        _write_header(out, "db", name or _bundle_name(db_path))
+        section = _SectionWriter(out)
+        conn.execute("BEGIN")
+        query = _export_query(conn)
+        cursor = conn.execute(query) if query else None
+        while cursor is not None:
+            rows = cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                break
+            records = []
+            for persona, key, value, encoding, timestamp in rows:
+                binary = isinstance(value, bytes)
+                if binary:
+                    value = base64.b64encode(value).decode("ascii")
+                records.append({"p": persona, "k": key, "v": value, "e": encoding, "b": binary, "ts": timestamp})
+            section.write_many(records)
+        conn.execute("COMMIT")
+        _write_trailer(out, section)
+        return section.count
+    finally:
+        conn.close()
+
+
+def export_data_file(out: IO[bytes], path: str, name: Optional[str] = None) -> int:
+    """
+    Write a JSON-lines data file (notes.json, tasks.json) as a bundle section.
+
+    Args:
+        out: Binary stream to write to.
+        path: File to export.
+        name: Name recorded in the bundle (default: see _bundle_name).
+
+    Returns:
+        Number of lines exported.
+    """
+    _write_header(out, "file", name or _bundle_name(path))
+    section = _SectionWriter(out)
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append({"l": line})
+            if len(records) >= BATCH_SIZE:
+                section.write_many(records)
+                records = []
+    section.write_many(records)
+    _write_trailer(out, section)
+    return section.count
+
+
+def export_bundle(bundle_path: str, databases: Iterable[str], data_files: Iterable[str] = (),
+                  on_section: Optional[Callable[[str, int], None]] = None) -> Dict[str, int]:
+    """
+    Export databases and data files into a compressed bundle.
+
+    Args:
+        bundle_path: Output file (gzip'd JSON lines).
+        databases: SQLite memory files to include.
+        data_files: JSON-lines files to include; missing files are skipped.
+        on_section: Called with (name, count) after each section.
+
+    Returns:
+        Mapping of section name to record count.
+
+    Raises:
+        TransferError: If two inputs would get the same section name.
+    """
+    databases = list(databases)
+    data_files = [path for path in data_files if os.path.exists(path)]
+    names = [_bundle_name(path) for path in databases + data_files]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise TransferError(f"Several inputs map to the same bundle name: {', '.join(duplicates)}")
+    counts: Dict[str, int] = {}
+    with gzip.open(bundle_path, "wb", compresslevel=6) as out:
+        header = {"t": "bundle", "format": BUNDLE_FORMAT, "version": BUNDLE_VERSION, "created": time.time()}
+        out.write((json.dumps(header) + "\n").encode("utf-8"))
+        for db_path in databases:
+            name = _bundle_name(db_path)
+            counts[name] = export_database(out, db_path, name)
+            if on_section:
+                on_section(name, counts[name])
+        for path in data_files:
+            name = _bundle_name(path)
+            counts[name] = export_data_file(out, path, name)
+            if on_section:
+                on_section(name, counts[name])
+    return counts
+
+
+def _verify(lines: int, digest: "hashlib._Hash", trailer: Dict[str, Any], name: str):
+    if trailer.get("t") != "end":
+        raise TransferError(f"Section {name} is truncated")
+    if trailer.get("count") != lines or trailer.get("sha256") != digest.hexdigest():
+        raise TransferError(f"Checksum mismatch in section {name}")
+
+
+def _import_database(lines: Iterable[bytes], target: str, replace: bool) -> Tuple[int, Dict[str, Any]]:
+    """Bulk-load one database section; nothing is committed unless the checksum matches."""
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    conn = sqlite3.connect(target, isolation_level=None, timeout=30.0)
+    try:
+        migrate(conn)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # WAL: fsync at checkpoint, not per commit
+        conn.execute("PRAGMA cache_size=-65536")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Defer index and counter maintenance until the rows are in
+            deferred = conn.execute(
+                "SELECT type, name, sql FROM sqlite_master "
+                "WHERE tbl_name = 'contexts' AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+            ).fetchall()
+            for kind, name, _ in deferred:
+                conn.execute(f'DROP {kind.upper()} "{name}"')
+            if replace:
+                conn.execute("DELETE FROM contexts")
+            merge = conn.execute("SELECT 1 FROM contexts LIMIT 1").fetchone() is not None
+            if merge:
+                # Staged first, then interleaved with the existing rows by timestamp
+                conn.execute(f"CREATE TEMP TABLE imported AS SELECT {_CONTEXT_COLUMNS} FROM contexts WHERE 0")
+            insert = (f"INSERT INTO {'imported' if merge else 'contexts'} ({_CONTEXT_COLUMNS}) "
+                      "VALUES (?, ?, ?, ?, ?)")
+
+            digest = hashlib.sha256()
+            count = 0
+            batch: List[Tuple[Any, ...]] = []
+            trailer: Dict[str, Any] = {}
+            for line in lines:
+                record = json.loads(line)
+                if record.get("t") == "end":
+                    trailer = record
+                    break
+                digest.update(line)
+                count += 1
+                value = base64.b64decode(record["v"]) if record.get("b") else record["v"]
+                batch.append((record["p"], record.get("k"), value, record.get("e", 0), record["ts"]))
+                if len(batch) >= BATCH_SIZE:
+                    conn.executemany(insert, batch)
+                    batch.clear()
+            if batch:
+                conn.executemany(insert, batch)
+            _verify(count, digest, trailer, target)
+            if merge:
+                _resequence(conn)
+
+            for _, _, sql in sorted(deferred, key=lambda item: item[0] != "index"):
+                conn.execute(sql)
+            conn.execute("DELETE FROM persona_counts")
+            conn.execute("""
+                INSERT INTO persona_counts (persona, row_count, byte_count)
+                SELECT persona, COUNT(*), SUM(length(context_value)) FROM contexts GROUP BY persona
+            """)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return count, trailer
+    finally:
+        conn.close()
+
+
+def _resequence(conn: sqlite3.Connection):
+    """
+    Merge the staged ``imported`` rows into contexts in timestamp order.
+
+    Rows are renumbered so seq follows the original timestamps across both
+    sides; ties keep existing rows first and each side's own order.
+    """
+    conn.execute(f"""
+        CREATE TEMP TABLE merged AS
+        SELECT {_CONTEXT_COLUMNS} FROM (
+            SELECT {_CONTEXT_COLUMNS}, 0 AS side, seq AS position FROM main.contexts
+            UNION ALL
+            SELECT {_CONTEXT_COLUMNS}, 1 AS side, rowid AS position FROM imported
+        ) ORDER BY timestamp, side, position
+    """)
+    conn.execute("DELETE FROM main.contexts")
+    conn.execute(f"INSERT INTO main.contexts ({_CONTEXT_COLUMNS}) SELECT {_CONTEXT_COLUMNS} FROM merged ORDER BY rowid")
+    conn.execute("DROP TABLE merged")
+    conn.execute("DROP TABLE imported")
+
+
+class _TaskIdRemapper:
+    """Gives imported tasks ids after the existing ones, consistently across each task's lines."""
+
+    def __init__(self):
+        self.next_id = 1
+        self.mapping: Dict[Any, int] = {}
+
+    def see_existing(self, line: str):
+        try:
+            task_id = json.loads(line).get("id")
+        except (ValueError, AttributeError):
+            return
+        if isinstance(task_id, int):
+            self.next_id = max(self.next_id, task_id + 1)
+
+    def remap(self, line: str) -> str:
+        try:
+            task = json.loads(line)
+        except ValueError:
+            return line
+        if not isinstance(task, dict) or "id" not in task:
+            return line
+        if task["id"] not in self.mapping:
+            self.mapping[task["id"]] = self.next_id
+            self.next_id += 1
+        task["id"] = self.mapping[task["id"]]
+        return _encode(task)
+
+
+def _import_data_file(lines: Iterable[bytes], target: str, replace: bool) -> int:
+    """Write one data-file section to a temp file and move it into place once verified."""
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    tmp_path = f"{target}.import-{os.getpid()}"
+    digest = hashlib.sha256()
+    count = 0
+    trailer: Dict[str, Any] = {}
+    merge = not replace and os.path.exists(target)
+    remapper = _TaskIdRemapper() if merge and os.path.basename(target) == TASKS_FILE else None
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as tmp:
+            if merge:
+                with open(target, "r", encoding="utf-8") as existing:
+                    for existing_line in existing:
+                        if remapper and existing_line.strip():
+                            remapper.see_existing(existing_line)
+                        tmp.write(existing_line if existing_line.endswith("\n") else existing_line + "\n")
+            for line in lines:
+                record = json.loads(line)
+                if record.get("t") == "end":
+                    trailer = record
+                    break
+                digest.update(line)
+                count += 1
+                tmp.write((remapper.remap(record["l"]) if remapper else record["l"]) + "\n")
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        _verify(count, digest, trailer, target)
+        os.replace(tmp_path, target)
+        return count
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def import_bundle(bundle_path: str, dest: str = ".", replace: bool = False,
+                  on_section: Optional[Callable[[str, int], None]] = None) -> Dict[str, int]:
+    """
+    Import a bundle written by export_bundle.
+
+    Each section is verified against its checksum before it is committed
+    (databases) or moved into place (data files); a bad section raises and
+    leaves that target untouched.
+
+    Args:
+        bundle_path: Bundle to read.
+        dest: Directory the bundle's relative paths are restored under.
+        replace: Replace existing rows/lines instead of merging with them
+            (merged memory rows are ordered by timestamp, imported task ids
+            are renumbered after the local ones).
+        on_section: Called with (name, count) after each section.
+
+    Returns:
+        Mapping of section name to records imported.
+
+    Raises:
+        TransferError: If the bundle is malformed or a checksum does not match.
+    """
+    counts: Dict[str, int] = {}
+    with gzip.open(bundle_path, "rb") as f:
+        lines = iter(f)
+        try:
+            header = json.loads(next(lines))
+        except StopIteration:
+            raise TransferError("Empty bundle")
+        if header.get("format") != BUNDLE_FORMAT or header.get("version", 0) > BUNDLE_VERSION:
+            raise TransferError(f"Unsupported bundle: {header.get('format')} v{header.get('version')}")
+        for line in lines:
+            section = json.loads(line)
+            name = section.get("name", "")
+            target = _safe_target(dest, name)
+            if section.get("t") == "db":
+                counts[name], _ = _import_database(lines, target, replace)
+            elif section.get("t") == "file":
+                counts[name] = _import_data_file(lines, target, replace)
+            else:
+                raise TransferError(f"Unknown section type: {section.get('t')}")
+            if on_section:
+                on_section(name, counts[name])
+    return counts
@@ -0,0 +1,71 @@
+# scripts/batch_infer.py
+"""
+Run a JSONL file of prompts through the assistant and write JSONL results.
+
+Each input line is {"id": ..., "persona": ..., "input": ..., "params": {...}}.
+Re-running with the same output resumes from the checkpoint; records of items
+that failed are dropped from the output first and the items run again.
+"""
+import os
+import time
+import typer
+from typing import Optional
+from main.batch import BatchRunner, Checkpoint, compact_output, read_items
+from main.bootstrap import build_mcp
+from main.memory_shards import ShardedMemory
+
+
+def batch_infer(
+    input_path: str,
+    output_path: str,
+    concurrency: int = typer.Option(4, help="Items in flight at once."),
+    ordered: bool = typer.Option(True, help="Write results in input order (--no-ordered writes as they finish)."),
+    checkpoint_path: Optional[str] = typer.Option(None, "--checkpoint", help="Checkpoint file (default: OUTPUT.ckpt)."),
+    memory_dir: str = typer.Option("batch_memory", help="Shard directory for batch memory, kept apart from chat history."),
+):
+    """
+    Run INPUT_PATH through the MCP pipeline and append results to OUTPUT_PATH.
+
+    Args:
+        input_path: JSONL prompts.
+        output_path: JSONL results (appended to when resuming, after earlier
+            failed records are removed).
+        concurrency: Items processed concurrently.
+        ordered: Preserve input order in the output.
+        checkpoint_path: File of completed ids.
+        memory_dir: Memory shard directory used by the batch.
+    """
+    memory = ShardedMemory.shared(memory_dir)
+    mcp = build_mcp(memory)
+    runner = BatchRunner(mcp, concurrency=concurrency, ordered=ordered)
+    checkpoint = Checkpoint(checkpoint_path or f"{output_path}.ckpt")
+    if checkpoint.resuming:
+        dropped = compact_output(output_path, checkpoint.done)
+        typer.secho(f"Resuming: {len(checkpoint.done)} items already done, {dropped} to retry",
+                    fg=typer.colors.YELLOW)
+
+    def report(result):
+        status = "error" if result["error"] else "ok"
+        typer.echo(f"[{status}] {result['id']} ({result['elapsed']:.2f}s)")
+
+    started = time.monotonic()
+    try:
+        with open(output_path, "a", encoding="utf-8") as out:
+            count = runner.run(read_items(input_path), out, checkpoint, on_result=report)
+    except KeyboardInterrupt:
+        typer.secho("\nInterrupted; re-run the same command to resume.", fg=typer.colors.RED)
+        raise typer.Exit(code=130)
+    except (OSError, ValueError) as e:
+        typer.secho(f"Batch failed: {str(e)}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+    finally:
+        checkpoint.close()
+        memory.close()
+
+    elapsed = time.monotonic() - started
+    typer.secho(f"Processed {count} items in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.2f}/s) -> "
+                f"{os.path.abspath(output_path)}", fg=typer.colors.GREEN)
+
+
+if __name__ == "__main__":
+    typer.run(batch_infer)
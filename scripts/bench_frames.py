@@ -0,0 +1,115 @@
+# scripts/bench_frames.py
+"""
+Per-token CPU benchmark for parsing Ollama's NDJSON stream.
+
+Builds a synthetic /api/generate body of TOKENS frames and times, in-process,
+the loop that turns it into token strings: the previous iter_lines() + decode
++ json.loads path against main.frames with the stdlib json parser and with
+the configured backend (orjson when installed). Each variant reads the body
+through a real urllib3 response, so chunking and buffering are included; the
+network is not. Exits non-zero if the configured decoder's speedup over the
+previous loop falls below --min-speedup.
+"""
+import io
+import json
+import time
+from typing import Callable, List
+import requests
+import typer
+import urllib3
+
+from main.frames import JSON_BACKEND, FrameDecoder, iter_chunks, iter_frames, stdlib_loads
+
+
+def make_body(tokens: int) -> bytes:
+    """NDJSON body shaped like Ollama's stream: one frame per token, then a stats frame."""
+    lines = [json.dumps({"model": "llama3.1", "created_at": "2026-10-19T12:00:00.000000Z",
+                         "response": f" word{i}", "done": False}) for i in range(tokens)]
+    lines.append(json.dumps({"model": "llama3.1", "created_at": "2026-10-19T12:00:01.000000Z",
+                             "response": "", "done": True, "done_reason": "stop", "context": list(range(256)),
+                             "total_duration": 1, "load_duration": 1, "prompt_eval_count": 1,
+                             "prompt_eval_duration": 1, "eval_count": tokens, "eval_duration": 1}))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def make_response(body: bytes) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = urllib3.HTTPResponse(body=io.BytesIO(body), preload_content=False)
+    return response
+
+
+def parse_lines(response: requests.Response) -> List[str]:
+    """The previous stream loop."""
+    tokens = []
+    for line in response.iter_lines():
+        if not line:
+            continue
+        frame = json.loads(line.decode('utf-8'))
+        if frame.get('response'):
+            tokens.append(frame['response'])
+        if frame.get('done'):
+            break
+    return tokens
+
+
+def parse_frames(response: requests.Response, loads: Callable = None) -> List[str]:
+    """The main.frames stream loop."""
+    frames = iter_frames(response) if loads is None else FrameDecoder(loads).iter_frames(iter_chunks(response))
+    tokens = []
+    for frame in frames:
+        if frame.response:
+            tokens.append(frame.response)
+        if frame.done:
+            break
+    return tokens
+
+
+def best_time(parse: Callable[[requests.Response], List[str]], body: bytes, runs: int) -> float:
+    timings = []
+    for _ in range(max(1, runs)):
+        response = make_response(body)
+        start = time.perf_counter()
+        parse(response)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_frames(
+    tokens: int = typer.Option(20000, help="Frames in the synthetic stream."),
+    runs: int = typer.Option(5, help="Timed runs per variant (the best is reported)."),
+    min_speedup: float = typer.Option(1.5, help="Minimum required decoder speedup over the previous loop."),
+):
+    """
+    Compare per-token parsing cost of the previous and current stream loops.
+
+    Args:
+        tokens: Frames in the synthetic stream.
+        runs: Timed runs per variant.
+        min_speedup: Minimum speedup of the configured decoder over iter_lines.
+    """
+    body = make_body(tokens)
+    expected = parse_lines(make_response(body))
+    variants = [("iter_lines + json.loads", parse_lines),
+                ("FrameDecoder (json)", lambda response: parse_frames(response, stdlib_loads))]
+    if JSON_BACKEND != "json":
+        variants.append((f"FrameDecoder ({JSON_BACKEND})", parse_frames))
+
+    results = []
+    for label, parse in variants:
+        if parse(make_response(body)) != expected:
+            typer.secho(f"{label}: decoded tokens differ from iter_lines", fg=typer.colors.RED)
+            raise typer.Exit(code=2)
+        results.append((label, best_time(parse, body, runs) / tokens * 1e6))
+
+    baseline = results[0][1]
+    for label, per_token in results:
+        typer.echo(f"{label:<26} {per_token:6.2f} µs/token  ({baseline / per_token:.1f}x)")
+    speedup = baseline / results[-1][1]
+    if speedup < min_speedup:
+        typer.secho(f"Speedup {speedup:.1f}x is below {min_speedup:.1f}x", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    typer.run(bench_frames)
@@ -0,0 +1,54 @@
+# scripts/bench_startup.py
+"""
+Cold-start benchmark for the terminal chat.
+
+Runs scripts/stream_terminal_chat.py in a fresh interpreter with "exit" on
+stdin and times the process from spawn to exit. That covers interpreter start,
+imports and building the MCP stack, but no model call. Exits non-zero when the
+median exceeds the budget, so it can gate regressions in CI.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+import typer
+
+
+def bench_startup(
+    runs: int = typer.Option(7, help="Number of cold starts to time."),
+    budget: float = typer.Option(0.5, help="Maximum allowed median, in seconds."),
+):
+    """
+    Time RUNS cold starts of the terminal chat.
+
+    Args:
+        runs: Number of cold starts to time.
+        budget: Maximum allowed median start-up time in seconds.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = os.path.join(root, "scripts", "stream_terminal_chat.py")
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+
+    timings = []
+    for _ in range(max(1, runs)):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, script], input="exit\n", capture_output=True, text=True,
+                                env=env, cwd=root)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            typer.secho(f"Terminal chat failed (exit {result.returncode}):\n{result.stderr}", fg=typer.colors.RED)
+            raise typer.Exit(code=2)
+        timings.append(elapsed)
+
+    median = statistics.median(timings)
+    color = typer.colors.GREEN if median <= budget else typer.colors.RED
+    typer.secho(f"Cold start over {len(timings)} runs: median {median * 1000:.0f} ms, "
+                f"max {max(timings) * 1000:.0f} ms (budget {budget * 1000:.0f} ms)", fg=color)
+    if median > budget:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    typer.run(bench_startup)
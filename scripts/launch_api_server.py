@@ -0,0 +1,49 @@
+# scripts/launch_api_server.py
+"""
+Launches the headless streaming HTTP API (see web/api.py).
+"""
+import typer
+from aiohttp import web
+from typing import List, Optional
+from main.bootstrap import build_mcp, start_memory_maintenance
+from main.memory_archive import DEFAULT_RETENTION_DAYS, DEFAULT_RETENTION_ROWS
+from web.api import APIServer, MAX_REQUESTS_PER_CLIENT
+
+
+def launch_api(
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    max_per_client: int = MAX_REQUESTS_PER_CLIENT,
+    shutdown_timeout: float = 10.0,
+    trusted_proxy: Optional[List[str]] = typer.Option(
+        None, help="Proxy address whose X-Forwarded-For identifies the client (repeatable)."),
+    maintenance: bool = typer.Option(True, help="Archive memory past the retention limits in the background."),
+    retention_days: float = typer.Option(DEFAULT_RETENTION_DAYS, help="Days of context kept per persona (0: no limit)."),
+    retention_rows: int = typer.Option(DEFAULT_RETENTION_ROWS, help="Contexts kept per persona (0: no limit)."),
+):
+    """
+    Serve the MCP over HTTP.
+
+    Args:
+        host: Host address to bind (default: 127.0.0.1).
+        port: Port number (default: 8080).
+        max_per_client: Concurrent requests allowed per client.
+        shutdown_timeout: Seconds in-flight requests get to finish on SIGINT/SIGTERM.
+        trusted_proxy: Proxy addresses trusted to report the client address.
+        maintenance: Run memory retention/compaction in the background.
+        retention_days: Age limit of the retention policy.
+        retention_rows: Row limit of the retention policy.
+    """
+    mcp = build_mcp()
+    if maintenance:
+        start_memory_maintenance(mcp.memory, retention_days, retention_rows)
+    app = APIServer(mcp, max_per_client=max_per_client, trusted_proxies=trusted_proxy or [],
+                    shutdown_timeout=shutdown_timeout).create_app()
+    try:
+        web.run_app(app, host=host, port=port, shutdown_timeout=shutdown_timeout)
+    finally:
+        mcp.memory.close()
+
+
+if __name__ == "__main__":
+    typer.run(launch_api)
@@ -2,16 +2,19 @@
 """
 Launches the Gradio UI for the AI assistant system with configurable options.
 """
-import gradio as gr
 import typer
 from typing import Optional
-from web.interface import create_interface
+from main.memory_archive import DEFAULT_RETENTION_DAYS, DEFAULT_RETENTION_ROWS
 
 
 def launch_ui(
     host: str = "127.0.0.1",
     port: Optional[int] = 7860,
-    debug: bool = False
+    debug: bool = False,
+    open_browser: bool = True,
+    maintenance: bool = typer.Option(True, help="Archive memory past the retention limits in the background."),
+    retention_days: float = typer.Option(DEFAULT_RETENTION_DAYS, help="Days of context kept per persona (0: no limit)."),
+    retention_rows: int = typer.Option(DEFAULT_RETENTION_ROWS, help="Contexts kept per persona (0: no limit)."),
 ):
     """
     Launch the Gradio interface for the AI assistant.
@@ -20,14 +23,22 @@ def launch_ui(
         host: Host address for the server (default: 127.0.0.1).
         port: Port number (default: 7860).
         debug: Enable debug mode for detailed logs.
+        open_browser: Open a browser tab (disabled for workers under launch_workers.py).
+        maintenance: Run memory retention/compaction in the background.
+        retention_days: Age limit of the retention policy.
+        retention_rows: Row limit of the retention policy.
     """
     try:
+        from web.interface import create_interface  # Gradio is slow to import; load it after argument parsing
+        from main.bootstrap import start_memory_maintenance
         app = create_interface()
+        if maintenance:
+            start_memory_maintenance(retention_days=retention_days, retention_rows=retention_rows)
         app.launch(
             server_name=host,
             server_port=port,
             share=False,
-            inbrowser=True,
+            inbrowser=open_browser,
             debug=debug,
             show_error=True,
             quiet=False
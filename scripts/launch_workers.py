@@ -0,0 +1,40 @@
+# scripts/launch_workers.py
+"""
+Runs several API or UI worker processes behind one port with sticky sessions.
+"""
+import os
+import typer
+from aiohttp import web
+from web.workers import StickyProxy, build_workers
+
+
+def launch_workers(
+    mode: str = typer.Option("api", help="'api' (HTTP API) or 'ui' (Gradio)."),
+    workers: int = typer.Option(os.cpu_count() or 2, help="Worker processes."),
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    base_port: int = typer.Option(9100, help="First private worker port."),
+    shared_cache: str = typer.Option("shared_cache.db", help="Response cache file shared by all workers."),
+):
+    """
+    Start WORKERS processes and a sticky proxy on HOST:PORT.
+
+    Args:
+        mode: Which server each worker runs.
+        workers: Number of worker processes.
+        host: Public host address.
+        port: Public port.
+        base_port: First private port used by workers.
+        shared_cache: Shared response cache file.
+    """
+    if mode not in ("api", "ui"):
+        typer.secho("--mode must be 'api' or 'ui'", fg=typer.colors.RED)
+        raise typer.Exit(code=2)
+    proxy = StickyProxy(build_workers(mode, max(1, workers), base_port, shared_cache))
+    typer.secho(f"Starting {workers} {mode} workers on ports {base_port}-{base_port + workers - 1} behind {host}:{port}",
+                fg=typer.colors.GREEN)
+    web.run_app(proxy.create_app(), host=host, port=port)
+
+
+if __name__ == "__main__":
+    typer.run(launch_workers)
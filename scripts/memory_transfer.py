@@ -0,0 +1,73 @@
+# scripts/memory_transfer.py
+"""
+Export and import memory databases and tool data as a verified, compressed bundle.
+
+    python scripts/memory_transfer.py export backup.jsonl.gz
+    python scripts/memory_transfer.py import backup.jsonl.gz --dest /srv/quietedge
+"""
+import glob
+import os
+import time
+import typer
+from typing import List, Optional
+from main.transfer import DEFAULT_DATA_FILES, TransferError, export_bundle, import_bundle
+
+app = typer.Typer(help="Move memory and notes/tasks between hosts.")
+
+
+def _report(name: str, count: int):
+    typer.secho(f"  {name}: {count} records", fg=typer.colors.GREEN)
+
+
+@app.command("export")
+def export_command(
+    bundle: str,
+    db: Optional[List[str]] = typer.Option(None, help="Memory database to include (repeatable; default: memory.db)."),
+    shards_dir: str = typer.Option("memory_shards", help="Include every shard file in this directory."),
+    data_file: Optional[List[str]] = typer.Option(None, help="JSON-lines data file (repeatable; default: notes.json, tasks.json)."),
+):
+    """
+    Stream memory and tool data into BUNDLE.
+
+    Args:
+        bundle: Output file (gzip'd JSON lines).
+        db: Memory databases to include.
+        shards_dir: Directory of session shards to include.
+        data_file: Data files to include.
+    """
+    databases = [path for path in (db or ["memory.db"]) if os.path.exists(path)]
+    databases += sorted(glob.glob(os.path.join(shards_dir, "shard-*.db")))
+    started = time.monotonic()
+    counts = export_bundle(bundle, databases, data_file or DEFAULT_DATA_FILES, on_section=_report)
+    typer.secho(f"Exported {sum(counts.values())} records in {time.monotonic() - started:.1f}s to {bundle}",
+                fg=typer.colors.GREEN)
+
+
+@app.command("import")
+def import_command(
+    bundle: str,
+    dest: str = typer.Option(".", help="Directory to restore into."),
+    replace: bool = typer.Option(False, help="Replace existing data instead of merging with it."),
+):
+    """
+    Verify and bulk-load BUNDLE.
+
+    Stop the app first, or at least avoid writing to the same files while
+    importing; each section is committed in a single transaction.
+
+    Args:
+        bundle: Bundle written by the export command.
+        dest: Directory the bundle's relative paths are restored under.
+        replace: Replace existing rows and lines.
+    """
+    started = time.monotonic()
+    try:
+        counts = import_bundle(bundle, dest, replace=replace, on_section=_report)
+    except (TransferError, OSError, ValueError) as e:
+        typer.secho(f"Import failed: {str(e)}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+    typer.secho(f"Imported {sum(counts.values())} records in {time.monotonic() - started:.1f}s", fg=typer.colors.GREEN)
+
+
+if __name__ == "__main__":
+    app()
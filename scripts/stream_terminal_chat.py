@@ -2,31 +2,26 @@
 """
 Terminal-based chat interface with streaming responses and tool support.
 """
+import getpass
 import typer
 from typing import Optional
-from main.mcp import MCP
-from main.personas import Persona
-from main.tools import NoteTaker, Search, Summarizer, TaskManager
-from main.memory import Memory
 
 
-def stream_chat(persona: Optional[str] = "generalist"):
+def stream_chat(persona: Optional[str] = "generalist", session: Optional[str] = None):
     """
     Run a terminal-based chat with streaming responses.
 
     Args:
         persona: Initial persona name (default: generalist).
+        session: Memory session id (default: one per OS user, so history persists across runs).
     """
-    # Initialize MCP
-    tools = [NoteTaker(), Search(), Summarizer(), TaskManager()]
-    personas = [
-        Persona(name="generalist", color="#28a745", tone="neutral", tools=tools, memory=Memory()),
-        Persona(name="zen_monk", color="#6f42c1", tone="calm", tools=tools, memory=Memory()),
-        Persona(name="shakespeare", color="#dc3545", tone="poetic", tools=tools, memory=Memory()),
-        Persona(name="quantum_mentor", color="#007bff", tone="technical", tools=tools, memory=Memory())
-    ]
-    mcp = MCP(personas=personas, tools=tools, memory=Memory())
-    context = {"current_persona": persona.lower()}
+    # Imported here so `--help` and argument errors return without loading the stack
+    from main.bootstrap import build_mcp
+    from main.cancellation import CancellationToken
+
+    # Shares the web UI's memory shards; nothing opens until the first message
+    mcp = build_mcp()
+    context = {"current_persona": persona.lower(), "session_id": session or f"terminal-{getpass.getuser()}"}
 
     typer.secho(f"Starting chat with {persona}. Type '@switch persona_name' to change personas, or use tool commands like '@note'.", fg=typer.colors.GREEN)
     typer.secho("Type 'exit' to quit.", fg=typer.colors.YELLOW)
@@ -34,16 +29,24 @@ def stream_chat(persona: Optional[str] = "generalist"):
     while True:
         try:
             user_input = typer.prompt("You")
-            if user_input.lower() == 'exit':
-                break
+        except (KeyboardInterrupt, typer.Abort):
+            typer.secho("\nExiting chat...", fg=typer.colors.RED)
+            break
+        if user_input.lower() == 'exit':
+            break
 
+        # Ctrl-C while streaming cancels the generation and returns to the prompt
+        cancel_token = CancellationToken()
+        stream = mcp.process_input(user_input, context, cancel_token=cancel_token)
+        try:
             print(f"{persona}> ", end="", flush=True)
-            for chunk in mcp.process_input(user_input, context):
+            for chunk in stream:
                 print(chunk, end="", flush=True)
             print()  # Newline after response
         except KeyboardInterrupt:
-            typer.secho("\nExiting chat...", fg=typer.colors.RED)
-            break
+            cancel_token.cancel()
+            stream.close()
+            typer.secho("\n[cancelled]", fg=typer.colors.YELLOW)
         except Exception as e:
             typer.secho(f"Error: {str(e)}", fg=typer.colors.RED)
 
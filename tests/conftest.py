@@ -0,0 +1,122 @@
+# tests/conftest.py
+"""
+Shared fixtures: stub Ollama servers on local ports.
+
+Each StubOllama serves /api/tags, /api/ps and a streaming /api/generate whose
+status, first-token delay, tokens and error frame are set per test, and it
+records the paths of the requests it received.
+"""
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+import pytest
+
+
+class StubOllama:
+    """Minimal Ollama server for one test."""
+
+    def __init__(self):
+        self.models: List[str] = ["llama3.1:latest"]
+        self.loaded: List[str] = []
+        self.status = 200
+        self.first_token_delay = 0.0
+        self.tokens: List[str] = ["Hello", " world"]
+        self.error_frame: Optional[str] = None  # Sent as a stream frame after the status line
+        self.requests: List[str] = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def generate_calls(self) -> int:
+        with self._lock:
+            return self.requests.count("/api/generate")
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub._record(self.path)
+                names = stub.models if self.path == "/api/tags" else stub.loaded
+                self._send_json(200, {"models": [{"name": name} for name in names]})
+
+            def do_POST(self):
+                stub._record(self.path)
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if stub.status != 200:
+                    self._send_json(stub.status, {"error": f"stub status {stub.status}"})
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    time.sleep(stub.first_token_delay)
+                    if stub.error_frame is not None:
+                        self._send_chunk({"error": stub.error_frame})
+                    else:
+                        for token in stub.tokens:
+                            self._send_chunk({"response": token, "done": False})
+                        self._send_chunk({"response": "", "done": True, "eval_count": len(stub.tokens)})
+                    self.wfile.write(b"0\r\n\r\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Client closed the stream (hedge loser)
+
+            def _send_json(self, status: int, data: dict):
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_chunk(self, frame: dict):
+                data = (json.dumps(frame) + "\n").encode("utf-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+        return Handler
+
+    def _record(self, path: str):
+        with self._lock:
+            self.requests.append(path)
+
+
+@pytest.fixture
+def stub_factory():
+    """Start any number of stub servers; all are shut down after the test."""
+    stubs: List[StubOllama] = []
+
+    def start() -> StubOllama:
+        stub = StubOllama()
+        stubs.append(stub)
+        return stub
+
+    yield start
+    for stub in stubs:
+        stub.close()
+
+
+@pytest.fixture
+def dead_url() -> str:
+    """URL of a local port nothing listens on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
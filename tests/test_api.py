@@ -0,0 +1,103 @@
+# tests/test_api.py
+"""HTTP API error reporting and graceful shutdown, with a stand-in MCP."""
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from web.api import APIServer
+
+
+class FakeMCP:
+    """Yields fixed chunks; fails like MCP.process_input when ``error`` is set."""
+
+    def __init__(self, chunks=("Hello", " world"), error=None, delay=0.0):
+        self.chunks = chunks
+        self.error = error
+        self.delay = delay
+        self.personas = {"generalist": SimpleNamespace(name="generalist", tone="neutral", color="#000")}
+        self.cancelled = []
+
+    def process_input(self, user_input, context, cancel_token=None):
+        for chunk in self.chunks:
+            if cancel_token.wait(self.delay):
+                self.cancelled.append(user_input)
+                return
+            yield chunk
+        if self.error:
+            context["last_error"] = self.error
+            yield f"Error generating response: {self.error}"
+            yield "collaborator text after the failure"
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def post_chat(server: APIServer, body: dict, headers: dict = None):
+    async with TestClient(TestServer(server.create_app())) as client:
+        response = await client.post("/v1/chat", json=body, headers=headers or {})
+        return response.status, await response.text()
+
+
+def test_json_reply():
+    status, text = run(post_chat(APIServer(FakeMCP()), {"input": "hi", "stream": False}))
+    assert status == 200 and json.loads(text)["output"] == "Hello world"
+
+
+def test_generation_failure_is_a_502_not_reply_text():
+    server = APIServer(FakeMCP(error="503 backend down"))
+    status, text = run(post_chat(server, {"input": "hi", "stream": False}))
+    assert status == 502 and json.loads(text) == {"error": "503 backend down"}
+
+
+def test_generation_failure_is_an_error_event_on_streams():
+    server = APIServer(FakeMCP(error="model not found"))
+    status, text = run(post_chat(server, {"input": "hi"}))
+    frames = [json.loads(line) for line in text.splitlines() if line.strip()]
+    assert status == 200
+    assert [frame["type"] for frame in frames] == ["token", "token", "error", "done"]
+    assert frames[2]["error"] == "model not found"
+    assert not any("Error generating" in frame.get("text", "") for frame in frames)
+
+
+def test_shutdown_lets_requests_finish_within_timeout():
+    mcp = FakeMCP(delay=0.2)
+    server = APIServer(mcp, shutdown_timeout=5)
+
+    async def scenario():
+        client = TestClient(TestServer(server.create_app()))
+        await client.start_server()
+        request = asyncio.ensure_future(client.post("/v1/chat", json={"input": "slow", "stream": False}))
+        await asyncio.sleep(0.1)
+        started = time.monotonic()
+        await client.app.shutdown()  # What the runner does before its own drain
+        response = await request
+        body = await response.json()
+        await client.close()
+        return body, time.monotonic() - started
+
+    body, waited = run(scenario())
+    assert body["output"] == "Hello world"
+    assert mcp.cancelled == [] and waited < 2
+
+
+def test_shutdown_cancels_requests_still_running_at_timeout():
+    mcp = FakeMCP(delay=5)
+    server = APIServer(mcp, shutdown_timeout=0.3)
+
+    async def scenario():
+        client = TestClient(TestServer(server.create_app()))
+        await client.start_server()
+        request = asyncio.ensure_future(client.post("/v1/chat", json={"input": "stuck", "stream": False}))
+        await asyncio.sleep(0.1)
+        await client.app.shutdown()
+        rejected = await client.post("/v1/chat", json={"input": "late", "stream": False})
+        await request
+        await client.close()
+        return rejected.status
+
+    assert run(scenario()) == 503
+    assert mcp.cancelled == ["stuck"]
@@ -0,0 +1,89 @@
+# tests/test_backends.py
+"""BackendPool routing, health checks and circuit breaker against stub servers."""
+import time
+
+import pytest
+
+from main.backends import BackendPool, BackendUnavailableError, CircuitOpenError
+
+
+def test_routes_to_least_outstanding(stub_factory):
+    first, second = stub_factory(), stub_factory()
+    pool = BackendPool([first.url, second.url])
+    a = pool.acquire("llama3.1")
+    b = pool.acquire("llama3.1")
+    assert {a.url, b.url} == {first.url, second.url}
+    pool.release(a, True)
+    assert pool.acquire("llama3.1") is a
+
+
+def test_prefers_host_with_model_loaded(stub_factory):
+    cold, warm = stub_factory(), stub_factory()
+    warm.loaded = ["llama3.1:latest"]
+    pool = BackendPool([cold.url, warm.url])
+    pool.check_health()
+    assert pool.acquire("llama3.1").url == warm.url
+
+
+def test_may_have_model_uses_reported_models(stub_factory):
+    stub = stub_factory()
+    pool = BackendPool([stub.url])
+    assert pool.may_have_model("mistral")  # Nothing reported yet
+    pool.check_health()
+    assert pool.may_have_model("llama3.1")
+    assert not pool.may_have_model("mistral")
+
+
+def test_exclude_skips_tried_backends(stub_factory):
+    stub = stub_factory()
+    pool = BackendPool([stub.url])
+    backend = pool.acquire("llama3.1")
+    with pytest.raises(BackendUnavailableError):
+        pool.acquire("llama3.1", exclude=[backend])
+
+
+def test_health_check_ejects_dead_host(stub_factory, dead_url):
+    live = stub_factory()
+    pool = BackendPool([dead_url, live.url], failure_threshold=2)
+    pool.check_health()
+    pool.check_health()
+    status = {entry["url"]: entry for entry in pool.status()}
+    assert status[dead_url]["circuit"] == "open"
+    assert status[live.url]["circuit"] == "closed"
+    for _ in range(3):
+        assert pool.acquire("llama3.1").url == live.url
+
+
+def test_circuit_opens_then_admits_one_trial(stub_factory):
+    stub = stub_factory()
+    pool = BackendPool([stub.url], failure_threshold=2, circuit_cooldown=0.2)
+    for _ in range(2):
+        pool.release(pool.acquire("llama3.1"), False)
+    with pytest.raises(CircuitOpenError):
+        pool.acquire("llama3.1")
+
+    time.sleep(0.25)
+    trial = pool.acquire("llama3.1")
+    assert pool.status()[0]["circuit"] == "half-open"
+    with pytest.raises(CircuitOpenError):
+        pool.acquire("llama3.1")  # Only one trial at a time
+    pool.release(trial, True)
+    assert pool.status()[0]["circuit"] == "closed"
+
+
+def test_health_probe_readmits_host(stub_factory):
+    stub = stub_factory()
+    pool = BackendPool([stub.url], failure_threshold=1, circuit_cooldown=60)
+    pool.release(pool.acquire("llama3.1"), False)
+    assert not pool.backends[0].healthy
+    pool.check_health()
+    assert pool.backends[0].healthy
+
+
+def test_release_without_outcome_leaves_health_alone(stub_factory):
+    stub = stub_factory()
+    pool = BackendPool([stub.url], failure_threshold=1)
+    for _ in range(3):
+        pool.release(pool.acquire("llama3.1"), None)
+    backend = pool.backends[0]
+    assert backend.healthy and backend.consecutive_failures == 0 and backend.outstanding == 0
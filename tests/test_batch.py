@@ -0,0 +1,55 @@
+# tests/test_batch.py
+"""Batch checkpointing and resume, with a stand-in MCP."""
+import json
+
+from main.batch import BatchRunner, Checkpoint, compact_output, read_items
+
+
+class FakeMCP:
+    """Echoes the input; fails like MCP.process_input for inputs in ``failing``."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.personas = {}
+        self.calls = []
+
+    def process_input(self, user_input, context, cancel_token=None):
+        self.calls.append(user_input)
+        if user_input in self.failing:
+            context["last_error"] = "backend down"
+            yield "Error generating response: backend down"
+            return
+        yield user_input.upper()
+
+
+def run_batch(tmp_path, mcp: FakeMCP):
+    output = str(tmp_path / "results.jsonl")
+    checkpoint = Checkpoint(output + ".ckpt")
+    try:
+        if checkpoint.resuming:
+            compact_output(output, checkpoint.done)
+        with open(output, "a", encoding="utf-8") as out:
+            BatchRunner(mcp, concurrency=2).run(read_items(str(tmp_path / "prompts.jsonl")), out, checkpoint)
+    finally:
+        checkpoint.close()
+    with open(output, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_resume_retries_failures_without_duplicate_records(tmp_path):
+    (tmp_path / "prompts.jsonl").write_text("\n".join(json.dumps({"id": i, "input": f"item {i}"}) for i in range(4)))
+    first = run_batch(tmp_path, FakeMCP(failing={"item 1", "item 3"}))
+    assert [record["error"] for record in first] == [None, "backend down", None, "backend down"]
+
+    mcp = FakeMCP()
+    second = run_batch(tmp_path, mcp)
+    assert sorted(mcp.calls) == ["item 1", "item 3"]
+    assert sorted(record["id"] for record in second) == ["0", "1", "2", "3"]
+    assert all(record["error"] is None for record in second)
+
+
+def test_compact_output_drops_torn_and_uncheckpointed_lines(tmp_path):
+    output = tmp_path / "results.jsonl"
+    output.write_text('{"id": "a"}\n{"id": "b"}\n{"id": "a"}\n{"id": "c", "out')
+    assert compact_output(str(output), {"a", "c"}) == 3
+    assert output.read_text() == '{"id": "a"}\n'
@@ -0,0 +1,46 @@
+# tests/test_memory.py
+"""Memory store behaviour that does not need a model."""
+import pytest
+
+from main.memory import Memory
+
+
+class FakeSummarizer:
+    def __init__(self, result: str):
+        self.result = result
+        self.calls = 0
+
+    def execute(self, text, params=None):
+        self.calls += 1
+        return self.result
+
+
+@pytest.fixture
+def memory(tmp_path):
+    store = Memory(str(tmp_path / "memory.db"))
+    yield store
+    store.close()
+
+
+def fill(memory: Memory, summarizer: FakeSummarizer, rows: int = 7):
+    memory._summarizer = summarizer
+    for i in range(rows):
+        memory.store_context("generalist", {"input": f"message {i}"}, wait=True)
+    memory._summary_executor.submit(lambda: None).result()  # Let the scheduled summary finish
+
+
+def test_auto_summary_replaces_old_rows(memory):
+    summarizer = FakeSummarizer("They talked about messages.")
+    fill(memory, summarizer)
+    assert summarizer.calls >= 1
+    keys = [row[0] for row in memory._reader().execute(
+        "SELECT context_key FROM contexts WHERE persona = 'generalist' ORDER BY seq")]
+    assert "summary" in keys and len(keys) < 7
+
+
+def test_failed_summary_keeps_history(memory):
+    summarizer = FakeSummarizer("Error: All Ollama backends are failing; circuit open")
+    fill(memory, summarizer)
+    assert summarizer.calls >= 1
+    assert memory.count("generalist") == 7
+    assert memory.retrieve_context("generalist")["input"] == "message 6"
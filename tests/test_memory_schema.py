@@ -0,0 +1,66 @@
+# tests/test_memory_schema.py
+"""Schema migration, persona counters and value encoding."""
+import sqlite3
+
+from main.memory_schema import (
+    ENCODING_JSON, ENCODING_ZLIB_JSON, SCHEMA_VERSION, decode_context, encode_context, migrate,
+)
+
+
+def legacy_db(path: str) -> sqlite3.Connection:
+    """Version 1 file as written before the schema was versioned."""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE contexts (persona TEXT, context_key TEXT, context_value TEXT, "
+                 "timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)")
+    conn.executemany("INSERT INTO contexts VALUES (?, ?, ?, ?)", [
+        ("Generalist", "input", '{"input": "second"}', "2024-01-02 00:00:00"),
+        ("generalist", "input", '{"input": "first"}', "2024-01-01 00:00:00"),
+        ("zen_monk", "input", '{"input": "calm"}', "2024-01-03 00:00:00"),
+        (None, "input", '{"input": "orphan"}', "2024-01-04 00:00:00"),
+    ])
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    return conn
+
+
+def counts(conn: sqlite3.Connection):
+    return {persona: (rows, size) for persona, rows, size in
+            conn.execute("SELECT persona, row_count, byte_count FROM persona_counts")}
+
+
+def test_upgrade_from_v1_keeps_order_and_counts(tmp_path):
+    conn = legacy_db(str(tmp_path / "memory.db"))
+    assert migrate(conn) == SCHEMA_VERSION
+    rows = conn.execute("SELECT persona, context_value, timestamp FROM contexts ORDER BY seq").fetchall()
+    assert [(persona, value) for persona, value, _ in rows] == [
+        ("generalist", '{"input": "first"}'),
+        ("generalist", '{"input": "second"}'),
+        ("zen_monk", '{"input": "calm"}'),
+    ]
+    assert rows[0][2] == 1704067200.0  # Unix time of 2024-01-01
+    assert counts(conn) == {"generalist": (2, 37), "zen_monk": (1, 17)}
+    assert migrate(conn) == SCHEMA_VERSION  # Already current: no-op
+    conn.close()
+
+
+def test_triggers_maintain_persona_counts(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "memory.db"))
+    migrate(conn)
+    for text in ("a", "bb", "ccc"):
+        value, encoding = encode_context({"input": text})
+        conn.execute("INSERT INTO contexts (persona, context_key, context_value, encoding, timestamp) "
+                     "VALUES ('generalist', 'input', ?, ?, 0)", (value, encoding))
+    assert counts(conn) == {"generalist": (3, 42)}
+    conn.execute("DELETE FROM contexts WHERE seq = 1")
+    assert counts(conn) == {"generalist": (2, 29)}
+    conn.close()
+
+
+def test_large_values_are_compressed():
+    small = {"input": "hi"}
+    large = {"input": "repeat " * 200}
+    assert encode_context(small)[1] == ENCODING_JSON
+    value, encoding = encode_context(large)
+    assert encoding == ENCODING_ZLIB_JSON and len(value) < 512
+    assert decode_context(value, encoding) == large
+    assert decode_context(*encode_context(small)) == small
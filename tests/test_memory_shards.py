@@ -0,0 +1,38 @@
+# tests/test_memory_shards.py
+"""Shard eviction and reopening."""
+import time
+
+from main.memory import Memory
+from main.memory_shards import ShardedMemory
+
+
+def sessions_on_different_shards(store: ShardedMemory):
+    first = "session-0"
+    second = next(f"session-{i}" for i in range(1, 100)
+                  if store.shard_index(f"session-{i}") != store.shard_index(first))
+    return first, second
+
+
+def test_reopen_waits_for_evicted_shard_to_close(tmp_path, monkeypatch):
+    closed = []
+    close = Memory.close
+
+    def slow_close(memory):
+        time.sleep(0.2)
+        close(memory)
+        closed.append(memory)
+
+    monkeypatch.setattr(Memory, "close", slow_close)
+    store = ShardedMemory(str(tmp_path / "shards"), shard_count=4, max_open=1)
+    try:
+        first, second = sessions_on_different_shards(store)
+        store.store_context("generalist", {"input": "hello"}, session_id=first)
+        with store._shard(first) as old:
+            pass
+        store.store_context("generalist", {"input": "other"}, session_id=second)  # Evicts the first shard
+
+        with store._shard(first) as reopened:
+            assert reopened is not old and old in closed
+        assert store.count("generalist", session_id=first) == 1
+    finally:
+        store.close()
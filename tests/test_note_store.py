@@ -0,0 +1,101 @@
+# tests/test_note_store.py
+"""NoteStore group commits and the sidecar offset index."""
+import array
+import json
+import os
+
+import pytest
+
+from main.note_store import NoteStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "notes.json")
+
+
+def offsets(index_path: str):
+    values = array.array("Q")
+    with open(index_path, "rb") as f:
+        values.frombytes(f.read())
+    return list(values)
+
+
+def line_starts(path: str):
+    starts, position = [], 0
+    with open(path, "rb") as f:
+        for line in f:
+            starts.append(position)
+            position += len(line)
+    return starts
+
+
+def test_buffered_notes_are_readable_before_commit(path):
+    store = NoteStore(path, flush_interval=60)
+    try:
+        store.add("first", tags=["Work", "work "])
+        assert len(store) == 1 and store.get(0)["tags"] == ["work"]
+        assert os.path.getsize(path) == 0
+        store.flush()
+        assert offsets(path + ".idx") == [0]
+        assert store.get(-1)["content"] == "first"
+    finally:
+        store.close()
+
+
+def test_index_matches_log_after_reopen(path):
+    store = NoteStore(path, flush_interval=60)
+    for i in range(5):
+        store.add(f"note {i}")
+    store.close()
+
+    assert offsets(path + ".idx") == line_starts(path)
+    reopened = NoteStore(path)
+    try:
+        assert [reopened.get(i)["content"] for i in (0, 4, -2)] == ["note 0", "note 4", "note 3"]
+        assert [note["content"] for note in reopened.recent(2)] == ["note 4", "note 3"]
+    finally:
+        reopened.close()
+
+
+def test_stale_index_is_rebuilt(path):
+    store = NoteStore(path, flush_interval=60)
+    for i in range(3):
+        store.add(f"note {i}")
+    store.close()
+    with open(path + ".idx", "wb") as f:
+        f.write(array.array("Q", [0, 5]).tobytes())  # Second offset is mid-record
+
+    reopened = NoteStore(path)
+    try:
+        assert reopened.get(2)["content"] == "note 2"
+        assert offsets(path + ".idx") == line_starts(path)
+    finally:
+        reopened.close()
+
+
+def test_records_from_another_writer_are_indexed(path):
+    store = NoteStore(path, flush_interval=60)
+    try:
+        store.add("mine")
+        store.flush()
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"content": "theirs"}) + "\n")
+        assert len(store) == 2 and store.get(1)["content"] == "theirs"
+        assert [note["content"] for note in store.records(1)] == ["theirs"]
+    finally:
+        store.close()
+
+
+def test_torn_trailing_record_is_truncated_on_commit(path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"content": "whole"}) + "\n" + '{"content": "to')
+    store = NoteStore(path, flush_interval=60)
+    try:
+        assert len(store) == 1
+        store.add("after crash")
+        store.flush()
+    finally:
+        store.close()
+    with open(path, encoding="utf-8") as f:
+        assert [json.loads(line)["content"] for line in f] == ["whole", "after crash"]
@@ -0,0 +1,101 @@
+# tests/test_ollama_assistant.py
+"""Streaming, hedging and retry behaviour of OllamaAssistant against stub servers."""
+from main.backends import BackendPool
+from main.ollama_assistant import (
+    DoneEvent, ErrorEvent, OllamaAssistant, OllamaRequestError, StreamPolicy, TokenEvent,
+)
+
+
+def make_assistant(*urls: str, **policy) -> OllamaAssistant:
+    options = {"ttft_deadline": None, "backoff_base": 0.01, "backoff_max": 0.02}
+    options.update(policy)
+    return OllamaAssistant(pool=BackendPool(list(urls)), policy=StreamPolicy(**options))
+
+
+def collect(assistant: OllamaAssistant, timeout: float = 5):
+    events = list(assistant.generate_events("hi", timeout=timeout))
+    text = "".join(event.text for event in events if isinstance(event, TokenEvent))
+    return text, events[-1]
+
+
+def test_streams_tokens_then_done(stub_factory):
+    stub = stub_factory()
+    text, last = collect(make_assistant(stub.url))
+    assert text == "Hello world"
+    assert isinstance(last, DoneEvent)
+    assert last.stats["backend"] == stub.url and last.stats["eval_count"] == 2
+
+
+def test_hedge_wins_when_first_backend_is_slow(stub_factory):
+    slow, fast = stub_factory(), stub_factory()
+    slow.first_token_delay = 2.0
+    fast.tokens = ["fast"]
+    assistant = make_assistant(slow.url, fast.url, ttft_deadline=0.2)
+    text, last = collect(assistant)
+    assert text == "fast"
+    assert last.stats["backend"] == fast.url
+    assert slow.generate_calls() == 1 and fast.generate_calls() == 1
+    # The cancelled loser is not charged to its circuit
+    assert all(backend.consecutive_failures == 0 for backend in assistant.pool.backends)
+
+
+def test_server_error_is_retried_on_another_backend(stub_factory):
+    broken, healthy = stub_factory(), stub_factory()
+    broken.status = 500
+    assistant = make_assistant(broken.url, healthy.url)
+    text, last = collect(assistant)
+    assert text == "Hello world" and isinstance(last, DoneEvent)
+    assert broken.generate_calls() == 1
+    assert assistant.pool.backends[0].consecutive_failures == 1
+
+
+def test_gives_up_after_max_retries(stub_factory):
+    broken = stub_factory()
+    broken.status = 503
+    assistant = make_assistant(broken.url, max_retries=2)
+    assistant.pool.failure_threshold = 10
+    text, last = collect(assistant)
+    assert text == "" and isinstance(last, ErrorEvent)
+    assert broken.generate_calls() == 3
+
+
+def test_open_circuit_stops_retries(stub_factory):
+    broken = stub_factory()
+    broken.status = 503
+    _, last = collect(make_assistant(broken.url, max_retries=5))
+    assert isinstance(last, ErrorEvent) and "circuit open" in str(last.error)
+    assert broken.generate_calls() == 2  # The pool's failure_threshold
+
+
+def test_client_error_is_not_retried_or_charged(stub_factory):
+    first, second = stub_factory(), stub_factory()
+    first.status = second.status = 404
+    assistant = make_assistant(first.url, second.url)
+    _, last = collect(assistant)
+    assert isinstance(last, ErrorEvent) and isinstance(last.error, OllamaRequestError)
+    assert first.generate_calls() + second.generate_calls() == 1
+    assert all(b.healthy and b.consecutive_failures == 0 for b in assistant.pool.backends)
+
+
+def test_error_frame_is_not_retried_or_charged(stub_factory):
+    stub = stub_factory()
+    stub.error_frame = "model 'llama3.1' not found"
+    assistant = make_assistant(stub.url)
+    _, last = collect(assistant)
+    assert isinstance(last, ErrorEvent) and isinstance(last.error, OllamaRequestError)
+    assert "not found" in str(last.error)
+    assert stub.generate_calls() == 1
+    assert assistant.pool.backends[0].consecutive_failures == 0
+
+
+def test_generate_sync_returns_error_text(stub_factory):
+    stub = stub_factory()
+    stub.status = 400
+    assert make_assistant(stub.url).generate_sync("hi").startswith("Error: 400")
+
+
+def test_failed_warm_up_is_not_charged(dead_url):
+    assistant = make_assistant(dead_url)
+    assistant.pool.failure_threshold = 1
+    assert not assistant.warm()
+    assert assistant.pool.backends[0].healthy
@@ -0,0 +1,44 @@
+# tests/test_persona_relevance.py
+"""PersonaRanker scoring and top-k selection."""
+from types import SimpleNamespace
+
+from main.persona_relevance import PersonaRanker
+
+
+def persona(name: str, description: str, tone: str = "neutral"):
+    return SimpleNamespace(name=name, tone=tone, description=description)
+
+
+PERSONAS = [
+    persona("Physicist", "Explains physics, quantum mechanics and energy"),
+    persona("Poet", "Writes poems, sonnets and verse about nature and the sea"),
+    persona("zen_monk", "Guides meditation, calm breathing and mindfulness", tone="serene"),
+    persona("Generalist", "Answers everyday questions"),
+]
+
+
+def test_best_match_ranks_first():
+    ranker = PersonaRanker(PERSONAS)
+    assert ranker.top_k("Write a sonnet about the sea", 1)[0][0] == "poet"
+    assert ranker.top_k("How do I stay calm when stressed? Meditation?", 1)[0][0] == "zen_monk"
+
+
+def test_prefix_features_match_related_words():
+    ranker = PersonaRanker(PERSONAS)
+    assert ranker.top_k("physical forces", 1)[0][0] == "physicist"
+
+
+def test_top_k_respects_k_exclude_and_threshold():
+    ranker = PersonaRanker(PERSONAS)
+    ranked = ranker.top_k("quantum physics poems", 3, exclude=["Physicist"])
+    assert [name for name, _ in ranked] == ["poet"]  # Others score below the threshold
+    assert ranker.top_k("quantum physics poems", 0) == []
+    assert ranker.top_k("unrelated gibberish words", 2) == []
+
+
+def test_scores_are_in_name_order_and_bounded():
+    ranker = PersonaRanker(PERSONAS)
+    scores = ranker.scores("calm sea poems")
+    assert len(scores) == len(ranker.names) == 4
+    assert all(0.0 <= score <= 1.0 + 1e-6 for score in scores)
+    assert PersonaRanker([]).top_k("anything", 3) == []
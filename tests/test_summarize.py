@@ -0,0 +1,55 @@
+# tests/test_summarize.py
+"""Chunked summarization progress, with a stand-in backend."""
+import time
+
+from main.mcp import MCP
+from main.memory import Memory
+from main.personas import Persona
+from main.tools.summarize import Summarizer
+
+
+class FakeBackend:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    def generate_sync(self, prompt, **kwargs):
+        time.sleep(self.delay)
+        return f"summary of {len(prompt)} chars"
+
+
+class StubSummarizer(Summarizer):
+    def __init__(self, backend: FakeBackend):
+        super().__init__(chunk_tokens=20, max_workers=1, model="stub")
+        self.backend = backend
+
+    @property
+    def ollama(self):
+        return self.backend
+
+
+def document(paragraphs: int = 4) -> str:
+    return "\n\n".join(f"Paragraph {i} talks about topic {i} in a few more words than fit." for i in range(paragraphs))
+
+
+def test_chunked_summary_reports_each_chunk():
+    Summarizer._chunk_cache.clear()
+    messages = []
+    StubSummarizer(FakeBackend()).execute(document(), {"mode": "chunked"}, on_progress=messages.append)
+    assert messages[:4] == [f"summarized {i}/4 chunks" for i in range(1, 5)]
+
+
+def test_mcp_streams_tool_progress(tmp_path):
+    Summarizer._chunk_cache.clear()
+    memory = Memory(str(tmp_path / "memory.db"))
+    try:
+        mcp = MCP([Persona("generalist", "#000", "neutral", [], memory)], [StubSummarizer(FakeBackend(0.15))],
+                  memory, response_cache={}, ollama=FakeBackend())
+        tool_lines = []
+        for chunk in mcp.process_input(f"@summarize {document()}", {"collaborate": False}):
+            if chunk.startswith("[summarize]"):
+                tool_lines.append(chunk)
+                if len(tool_lines) == 2:
+                    break
+        assert tool_lines[0].startswith("[summarize] summarized 1/4 chunks")
+    finally:
+        memory.close()
@@ -0,0 +1,94 @@
+# tests/test_task_store.py
+"""TaskStore log replay (last line wins), heap ordering, search and compaction."""
+import json
+
+import pytest
+
+from main import task_store
+from main.task_store import TaskStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "tasks.json")
+
+
+def write_lines(path: str, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def test_last_line_for_an_id_wins(path):
+    write_lines(path, [
+        {"id": 1, "description": "draft report", "priority": "low"},
+        {"id": 2, "description": "call Bob"},
+        {"id": 1, "description": "draft report", "priority": "high"},
+        {"id": 2, "description": "call Bob", "done": True, "completed": 5.0},
+    ])
+    store = TaskStore(path)
+    try:
+        assert store.get(1)["priority"] == "high" and not store.get(1)["done"]
+        assert store.get(2)["done"]
+        assert [task["id"] for task in store.next()] == [1]
+        assert [task["id"] for task in store.next(priority="low")] == []  # Superseded heap entry
+        assert [task["id"] for task in store.completed()] == [2]
+        assert store.add("new task")["id"] == 3
+    finally:
+        store.close()
+
+
+def test_next_orders_by_due_then_priority_then_age(path):
+    store = TaskStore(path)
+    try:
+        store.add("undated high", priority="high")
+        store.add("later", due="2030-01-02")
+        store.add("sooner low", priority="low", due="2030-01-01")
+        store.add("sooner high", priority="high", due="2030-01-01", tags=["work"])
+        assert [task["description"] for task in store.next()] == [
+            "sooner high", "sooner low", "later", "undated high"]
+        assert [task["description"] for task in store.next(due_before="2030-01-01")] == [
+            "sooner high", "sooner low"]
+        assert [task["description"] for task in store.next(tag="WORK")] == ["sooner high"]
+    finally:
+        store.close()
+
+
+def test_search_matches_word_prefixes(path):
+    store = TaskStore(path)
+    try:
+        store.add("Prepare quarterly report", tags=["work"])
+        store.add("Report the bug")
+        store.complete(2)
+        assert [task["id"] for task in store.search("rep")] == [1, 2]
+        assert [task["id"] for task in store.search("rep", include_done=False)] == [1]
+        assert [task["id"] for task in store.search("quart rep", tag="work")] == [1]
+        assert store.search("missing") == []
+    finally:
+        store.close()
+
+
+def test_changes_from_another_store_are_replayed(path):
+    first, second = TaskStore(path), TaskStore(path)
+    try:
+        task = first.add("shared")
+        second.complete(task["id"])
+        assert first.get(task["id"])["done"]
+        assert first.add("after")["id"] == 2
+    finally:
+        first.close()
+        second.close()
+
+
+def test_compaction_keeps_one_line_per_task(path, monkeypatch):
+    monkeypatch.setattr(task_store, "COMPACT_MIN_LINES", 4)
+    store = TaskStore(path)
+    try:
+        for i in range(2):
+            store.complete(store.add(f"task {i}")["id"])  # Fourth line: superseded lines now dominate
+        with open(path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        assert [line["id"] for line in lines] == [1, 2] and all(line["done"] for line in lines)
+        assert len(store) == 2 and store.add("after compaction")["id"] == 3
+    finally:
+        store.close()
@@ -0,0 +1,145 @@
+# tests/test_transfer.py
+"""Bundle export/import: checksum verification and merge imports."""
+import gzip
+import json
+import os
+import sqlite3
+
+import pytest
+
+from main.memory_schema import encode_context, migrate
+from main.task_store import TaskStore
+from main.transfer import TransferError, export_bundle, import_bundle
+
+
+def make_db(path: str, rows):
+    """Memory database with (persona, context, timestamp) rows in the given order."""
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    for persona, context, timestamp in rows:
+        value, encoding = encode_context(context)
+        conn.execute("INSERT INTO contexts (persona, context_key, context_value, encoding, timestamp) "
+                     "VALUES (?, ?, ?, ?, ?)", (persona, "input", value, encoding, timestamp))
+    conn.commit()
+    conn.close()
+
+
+def contexts(path: str):
+    """(persona, timestamp) of every row in seq order, plus persona_counts."""
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute("SELECT persona, timestamp FROM contexts ORDER BY seq").fetchall()
+        counts = dict(conn.execute("SELECT persona, row_count FROM persona_counts").fetchall())
+        return rows, counts
+    finally:
+        conn.close()
+
+
+def write_lines(path: str, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def test_round_trip(tmp_path):
+    source, dest = tmp_path / "src", tmp_path / "dest"
+    source.mkdir()
+    make_db(str(source / "memory.db"), [("generalist", {"input": "a"}, 1.0), ("zen_monk", {"input": "b"}, 2.0)])
+    write_lines(str(source / "notes.json"), [{"content": "note"}])
+    bundle = str(tmp_path / "bundle.jsonl.gz")
+
+    counts = export_bundle(bundle, [str(source / "memory.db")], [str(source / "notes.json")])
+    assert counts == {"memory.db": 2, "notes.json": 1}
+    assert import_bundle(bundle, str(dest)) == counts
+    assert contexts(str(dest / "memory.db")) == contexts(str(source / "memory.db"))
+    assert (dest / "notes.json").read_text() == (source / "notes.json").read_text()
+
+
+def test_tampered_section_is_rejected_and_target_untouched(tmp_path):
+    source, dest = tmp_path / "src", tmp_path / "dest"
+    source.mkdir()
+    dest.mkdir()
+    make_db(str(source / "memory.db"), [("generalist", {"input": "original"}, 1.0)])
+    make_db(str(dest / "memory.db"), [("generalist", {"input": "local"}, 5.0)])
+    bundle = str(tmp_path / "bundle.jsonl.gz")
+    export_bundle(bundle, [str(source / "memory.db")])
+
+    with gzip.open(bundle, "rb") as f:
+        data = f.read().replace(b"original", b"tampered")
+    with gzip.open(bundle, "wb") as f:
+        f.write(data)
+
+    before = contexts(str(dest / "memory.db"))
+    with pytest.raises(TransferError, match="Checksum mismatch"):
+        import_bundle(bundle, str(dest))
+    assert contexts(str(dest / "memory.db")) == before
+
+
+def test_truncated_bundle_is_rejected(tmp_path):
+    source = tmp_path / "src"
+    source.mkdir()
+    write_lines(str(source / "notes.json"), [{"content": "note"}])
+    bundle = str(tmp_path / "bundle.jsonl.gz")
+    export_bundle(bundle, [], [str(source / "notes.json")])
+    with gzip.open(bundle, "rb") as f:
+        lines = f.read().splitlines(keepends=True)
+    with gzip.open(bundle, "wb") as f:
+        f.write(b"".join(lines[:-1]))  # Drop the trailer
+
+    with pytest.raises(TransferError, match="truncated"):
+        import_bundle(bundle, str(tmp_path / "dest"))
+    assert not (tmp_path / "dest" / "notes.json").exists()
+
+
+def test_merge_orders_memory_rows_by_timestamp(tmp_path):
+    source, dest = tmp_path / "src", tmp_path / "dest"
+    source.mkdir()
+    dest.mkdir()
+    make_db(str(source / "memory.db"), [("generalist", {"input": "old import"}, 10.0),
+                                        ("zen_monk", {"input": "imported"}, 30.0)])
+    make_db(str(dest / "memory.db"), [("generalist", {"input": "local"}, 20.0)])
+    bundle = str(tmp_path / "bundle.jsonl.gz")
+    export_bundle(bundle, [str(source / "memory.db")])
+
+    import_bundle(bundle, str(dest))
+    rows, counts = contexts(str(dest / "memory.db"))
+    assert rows == [("generalist", 10.0), ("generalist", 20.0), ("zen_monk", 30.0)]
+    assert counts == {"generalist": 2, "zen_monk": 1}
+
+
+def test_merge_renumbers_imported_task_ids(tmp_path):
+    source, dest = tmp_path / "src", tmp_path / "dest"
+    source.mkdir()
+    dest.mkdir()
+    local = TaskStore(str(dest / "tasks.json"))
+    local.add("local task")
+    local.close()
+    remote = TaskStore(str(source / "tasks.json"))
+    remote.add("remote task")
+    remote.complete(1)  # Two lines for the same id
+    remote.add("second remote task")
+    remote.close()
+    bundle = str(tmp_path / "bundle.jsonl.gz")
+    export_bundle(bundle, [], [str(source / "tasks.json")])
+
+    import_bundle(bundle, str(dest))
+    store = TaskStore(str(dest / "tasks.json"))
+    try:
+        assert store.get(1)["description"] == "local task" and not store.get(1)["done"]
+        assert store.get(2)["description"] == "remote task" and store.get(2)["done"]
+        assert store.get(3)["description"] == "second remote task"
+    finally:
+        store.close()
+
+
+def test_replace_keeps_task_ids(tmp_path):
+    source, dest = tmp_path / "src", tmp_path / "dest"
+    source.mkdir()
+    dest.mkdir()
+    write_lines(str(dest / "tasks.json"), [{"id": 1, "description": "local"}])
+    write_lines(str(source / "tasks.json"), [{"id": 7, "description": "remote"}])
+    bundle = str(tmp_path / "bundle.jsonl.gz")
+    export_bundle(bundle, [], [str(source / "tasks.json")])
+
+    import_bundle(bundle, str(dest), replace=True)
+    assert [json.loads(line)["id"] for line in open(os.path.join(dest, "tasks.json"))] == [7]
@@ -0,0 +1,305 @@
+# web/api.py
+"""
+Headless HTTP API for MCP (aiohttp): chat, tool and persona endpoints for
+programmatic clients, without Gradio's queue or per-yield history payloads.
+
+Chat replies stream as server-sent events (Accept: text/event-stream) or as
+chunked NDJSON. Each client address may have a limited number of requests in
+flight; extra requests get 429 instead of queueing. The address is the peer's,
+or the X-Forwarded-For address set by a configured trusted proxy (such as the
+multi-worker StickyProxy); client-supplied ids are never used for the limit.
+A failed generation is reported as an error (an `error` event on streams,
+HTTP 502 otherwise), never as reply text. On shutdown, new requests get 503,
+in-flight requests get up to shutdown_timeout seconds to finish, and only the
+ones still running after that are cancelled.
+
+    POST /v1/chat            {"input", "persona"?, "session_id"?, "stream"?}
+    POST /v1/tools/{name}    {"input", "params"?}
+    GET  /v1/personas
+    GET  /v1/health
+"""
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set, Tuple
+
+from aiohttp import web
+
+from main.cancellation import CancellationToken
+from main.mcp import MCP
+from main.metrics import metrics
+
+MAX_REQUESTS_PER_CLIENT = 4
+HEARTBEAT_INTERVAL = 15.0  # Seconds of silence before an SSE/NDJSON keep-alive is sent
+WORKER_THREADS = 32  # Threads running the synchronous MCP pipeline
+SHUTDOWN_TIMEOUT = 10.0  # Seconds in-flight requests get to finish on shutdown
+DRAIN_POLL_INTERVAL = 0.1
+
+
+class APIServer:
+    """aiohttp handlers bound to one MCP instance."""
+
+    def __init__(self, mcp: MCP, max_per_client: int = MAX_REQUESTS_PER_CLIENT,
+                 heartbeat: float = HEARTBEAT_INTERVAL, worker_threads: int = WORKER_THREADS,
+                 trusted_proxies: Iterable[str] = (), shutdown_timeout: float = SHUTDOWN_TIMEOUT):
+        """
+        Initialize the server.
+
+        Args:
+            mcp: Pipeline that serves every request.
+            max_per_client: Concurrent requests allowed per client.
+            heartbeat: Seconds between keep-alive messages on idle streams.
+            worker_threads: Threads for MCP generations and tool calls.
+            trusted_proxies: Peer addresses whose X-Forwarded-For is taken as
+                the client address (e.g. 127.0.0.1 behind launch_workers).
+            shutdown_timeout: Seconds in-flight requests get to finish before
+                they are cancelled on shutdown.
+        """
+        self.mcp = mcp
+        self.max_per_client = max_per_client
+        self.heartbeat = heartbeat
+        self.trusted_proxies = set(trusted_proxies)
+        self.shutdown_timeout = shutdown_timeout
+        self._closing = False
+        self.executor = ThreadPoolExecutor(max_workers=worker_threads, thread_name_prefix="api")
+        self._in_flight: Dict[str, int] = {}
+        self._tokens: Set[CancellationToken] = set()
+
+    def create_app(self) -> web.Application:
+        """Build the aiohttp application."""
+        app = web.Application()
+        app.add_routes([
+            web.get("/v1/health", self.health),
+            web.get("/v1/personas", self.personas),
+            web.post("/v1/chat", self.chat),
+            web.post("/v1/tools/{name}", self.tool),
+        ])
+        app.on_shutdown.append(self._on_shutdown)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok", "in_flight": sum(self._in_flight.values()),
+                                  "tool_cache": self.mcp.tools.cache_stats()})
+
+    async def personas(self, request: web.Request) -> web.Response:
+        return web.json_response([
+            {"name": persona.name, "tone": persona.tone, "color": persona.color}
+            for persona in self.mcp.personas.values()
+        ])
+
+    async def chat(self, request: web.Request) -> web.StreamResponse:
+        """Run one chat turn; streams unless the body sets "stream": false."""
+        body = await self._json_body(request)
+        user_input = body.get("input")
+        if not isinstance(user_input, str) or not user_input.strip():
+            raise web.HTTPBadRequest(text=json.dumps({"error": "'input' is required"}), content_type="application/json")
+        persona = str(body.get("persona", "generalist")).lower()
+        if persona not in self.mcp.personas:
+            raise web.HTTPNotFound(text=json.dumps({"error": f"Persona '{persona}' not found"}),
+                                   content_type="application/json")
+        context: Dict[str, Any] = {"current_persona": persona, "session_id": body.get("session_id")}
+
+        with self._client_slot(request):
+            token = self._start_request()
+            try:
+                if not body.get("stream", True):
+                    return await self._chat_json(user_input, context, token)
+                sse = "text/event-stream" in request.headers.get("Accept", "")
+                return await self._chat_stream(request, user_input, context, token, sse)
+            finally:
+                token.cancel()  # No-op once the turn has finished; stops it if the client left
+                self._tokens.discard(token)
+
+    async def tool(self, request: web.Request) -> web.Response:
+        """Run one tool call and return its output."""
+        name = request.match_info["name"].lower()
+        tool = self.mcp.tools.get(name)
+        if tool is None:
+            raise web.HTTPNotFound(text=json.dumps({"error": f"Tool '{name}' not found"}), content_type="application/json")
+        body = await self._json_body(request)
+        params = {str(key).lower(): str(value) for key, value in (body.get("params") or {}).items()}
+
+        with self._client_slot(request):
+            token = self._start_request()
+            loop = asyncio.get_running_loop()
+            started = time.monotonic()
+            try:
+                output = await asyncio.wait_for(
+                    loop.run_in_executor(self.executor, self.mcp.tools.run, name, str(body.get("input", "")),
+                                         params, token),
+                    timeout=getattr(tool, "timeout", None),
+                )
+            except asyncio.TimeoutError:
+                token.cancel()
+                return web.json_response({"error": f"Tool '{name}' timed out"}, status=504)
+            except Exception as e:
+                return web.json_response({"error": str(e)}, status=500)
+            finally:
+                self._tokens.discard(token)
+            return web.json_response({"tool": name, "output": output, "elapsed": time.monotonic() - started})
+
+    async def _chat_json(self, user_input: str, context: Dict[str, Any], token: CancellationToken) -> web.Response:
+        chunks = []
+        async for kind, value in self._run_chat(user_input, context, token):
+            if kind == "token":
+                chunks.append(value)
+            elif kind == "error":
+                return web.json_response({"error": value}, status=502)
+        return web.json_response({"output": "".join(chunks), "generation": context.get("last_generation")})
+
+    async def _chat_stream(self, request: web.Request, user_input: str, context: Dict[str, Any],
+                           token: CancellationToken, sse: bool) -> web.StreamResponse:
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream" if sse else "application/x-ndjson",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Keep reverse proxies from buffering the stream
+        })
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        try:
+            async for kind, value in self._run_chat(user_input, context, token):
+                if kind == "heartbeat":
+                    await response.write(b": keep-alive\n\n" if sse else b"\n")
+                    continue
+                if kind == "token":
+                    payload = {"text": value}
+                elif kind == "error":
+                    payload = {"error": value}
+                else:
+                    payload = {"generation": context.get("last_generation")}
+                await response.write(self._frame(kind, payload, sse))
+            await response.write_eof()
+        except (ConnectionResetError, asyncio.CancelledError):
+            metrics.increment("api.disconnects")
+            token.cancel()
+            raise
+        return response
+
+    @staticmethod
+    def _frame(kind: str, payload: Dict[str, Any], sse: bool) -> bytes:
+        data = json.dumps(payload, ensure_ascii=False)
+        if sse:
+            return f"event: {kind}\ndata: {data}\n\n".encode("utf-8")
+        return (json.dumps({"type": kind, **payload}, ensure_ascii=False) + "\n").encode("utf-8")
+
+    async def _run_chat(self, user_input: str, context: Dict[str, Any],
+                        token: CancellationToken) -> AsyncIterator[Tuple[str, Optional[str]]]:
+        """
+        Run MCP.process_input on a worker thread and relay its chunks.
+
+        A generation failure is relayed as ('error', message) instead of
+        MCP's "Error generating response" text, and ends the reply.
+
+        Yields:
+            ('token', text), ('error', message), ('heartbeat', None) while idle,
+            then ('done', None).
+        """
+        loop = asyncio.get_running_loop()
+        queue: "asyncio.Queue[Tuple[Optional[str], Optional[str]]]" = asyncio.Queue()
+
+        def put(item: Tuple[Optional[str], Optional[str]]):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:  # Event loop already closed during shutdown
+                token.cancel()
+
+        def produce():
+            stream = self.mcp.process_input(user_input, context, cancel_token=token)
+            try:
+                for chunk in stream:
+                    if context.get("last_error") is not None:  # This chunk is MCP's error text
+                        put(("error", context["last_error"]))
+                        break
+                    put(("token", chunk))
+            except Exception as e:
+                put(("error", str(e)))
+            finally:
+                stream.close()
+                put((None, None))
+
+        loop.run_in_executor(self.executor, produce)
+        while True:
+            try:
+                kind, value = await asyncio.wait_for(queue.get(), timeout=self.heartbeat)
+            except asyncio.TimeoutError:
+                yield "heartbeat", None
+                continue
+            if kind is None:
+                break
+            yield kind, value
+        yield "done", None
+
+    async def _json_body(self, request: web.Request) -> Dict[str, Any]:
+        try:
+            body = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise web.HTTPBadRequest(text=json.dumps({"error": "Body must be JSON"}), content_type="application/json")
+        if not isinstance(body, dict):
+            raise web.HTTPBadRequest(text=json.dumps({"error": "Body must be a JSON object"}),
+                                     content_type="application/json")
+        return body
+
+    def _client_slot(self, request: web.Request) -> "_ClientSlot":
+        return _ClientSlot(self, self._client_address(request))
+
+    def _client_address(self, request: web.Request) -> str:
+        """Peer address, or the last X-Forwarded-For hop when the peer is a trusted proxy."""
+        remote = request.remote or "unknown"
+        if remote in self.trusted_proxies:
+            forwarded = request.headers.get("X-Forwarded-For", "").split(",")[-1].strip()
+            if forwarded:
+                return forwarded
+        return remote
+
+    def _start_request(self) -> CancellationToken:
+        """Token for a new request, tracked for shutdown; 503 once shutting down."""
+        if self._closing:
+            raise web.HTTPServiceUnavailable(text=json.dumps({"error": "Server is shutting down"}),
+                                             content_type="application/json")
+        token = CancellationToken()
+        self._tokens.add(token)
+        return token
+
+    async def _on_shutdown(self, app: web.Application):
+        """Let in-flight requests finish for up to shutdown_timeout, then cancel the rest."""
+        self._closing = True
+        deadline = time.monotonic() + self.shutdown_timeout
+        while self._tokens and time.monotonic() < deadline:
+            await asyncio.sleep(DRAIN_POLL_INTERVAL)
+        if self._tokens:
+            metrics.increment("api.shutdown_cancelled", len(self._tokens))
+        for token in list(self._tokens):
+            token.cancel()
+
+    async def _on_cleanup(self, app: web.Application):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _ClientSlot:
+    """Counts a request against its client's limit; raises 429 when over it."""
+
+    def __init__(self, server: APIServer, client: str):
+        self.server = server
+        self.client = client
+
+    def __enter__(self):
+        in_flight = self.server._in_flight.get(self.client, 0)
+        if in_flight >= self.server.max_per_client:
+            metrics.increment("api.rejected")
+            raise web.HTTPTooManyRequests(
+                text=json.dumps({"error": f"At most {self.server.max_per_client} concurrent requests per client"}),
+                content_type="application/json",
+                headers={"Retry-After": "1"},
+            )
+        self.server._in_flight[self.client] = in_flight + 1
+        return self
+
+    def __exit__(self, *exc):
+        remaining = self.server._in_flight.get(self.client, 1) - 1
+        if remaining:
+            self.server._in_flight[self.client] = remaining
+        else:
+            self.server._in_flight.pop(self.client, None)
+        return False
@@ -0,0 +1,108 @@
+# web/history.py
+"""
+Server-side chat history for the Gradio UI.
+
+Each browser session's turns are kept here as rendered (user_html,
+assistant_html) pairs instead of round-tripping through the Chatbot value, so
+a send uploads only the new message and the Chatbot only ever holds a window
+of recent turns. Older turns are fetched a page at a time. Sessions are
+evicted least-recently-used once max_sessions is reached.
+"""
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+HISTORY_WINDOW = 20  # Turns sent to the browser by default
+HISTORY_PAGE = 20  # Older turns added per "load older" click
+MAX_SESSIONS = 1000
+MAX_TURNS = 2000  # Per session; the oldest are dropped beyond this
+
+Turn = Tuple[Optional[str], Optional[str]]
+
+
+class HistoryStore:
+    """Per-session rendered chat turns with windowed reads."""
+
+    def __init__(self, window: int = HISTORY_WINDOW, page_size: int = HISTORY_PAGE,
+                 max_sessions: int = MAX_SESSIONS, max_turns: int = MAX_TURNS):
+        """
+        Initialize the store.
+
+        Args:
+            window: Turns shown before any pagination.
+            page_size: Turns added per page of older history.
+            max_sessions: Sessions kept (least recently used are evicted).
+            max_turns: Turns kept per session.
+        """
+        self.window = window
+        self.page_size = page_size
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self._sessions: "OrderedDict[str, List[List[Optional[str]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def has(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._sessions
+
+    def reset(self, session_id: str, turns: Optional[List[Turn]] = None):
+        """Replace a session's history (e.g. with a persona's welcome message)."""
+        with self._lock:
+            self._sessions[session_id] = [list(turn) for turn in turns or []]
+            self._touch(session_id)
+
+    def append(self, session_id: str, user_html: Optional[str],
+               assistant_html: Optional[str] = None) -> List[Optional[str]]:
+        """
+        Add a turn at the end of a session.
+
+        Returns:
+            Handle for set_reply; a reply set after the session was reset is dropped.
+        """
+        turn = [user_html, assistant_html]
+        with self._lock:
+            turns = self._sessions.setdefault(session_id, [])
+            turns.append(turn)
+            if len(turns) > self.max_turns:
+                del turns[:len(turns) - self.max_turns]
+            self._touch(session_id)
+        return turn
+
+    def set_reply(self, turn: List[Optional[str]], assistant_html: str):
+        """Set the assistant side of a turn returned by append()."""
+        with self._lock:
+            turn[1] = assistant_html
+
+    def recent(self, session_id: str, shown: Optional[int] = None) -> List[Turn]:
+        """
+        The newest turns of a session.
+
+        Args:
+            session_id: Browser session.
+            shown: Number of turns to return (default: the window).
+
+        Returns:
+            Up to ``shown`` turns, oldest first.
+        """
+        shown = self.window if shown is None else shown
+        with self._lock:
+            turns = self._sessions.get(session_id, [])
+            return [tuple(turn) for turn in turns[-shown:]] if shown > 0 else []
+
+    def older_count(self, session_id: str, shown: int) -> int:
+        """Turns not included in a window of ``shown`` turns."""
+        with self._lock:
+            return max(len(self._sessions.get(session_id, [])) - shown, 0)
+
+    def _touch(self, session_id: str):
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+
+if __name__ == "__main__":
+    store = HistoryStore(window=2)
+    for i in range(5):
+        turn = store.append("demo", f"question {i}")
+        store.set_reply(turn, f"answer {i}")
+    print(store.recent("demo"), store.older_count("demo", 2))
@@ -3,11 +3,15 @@
 Enhanced Gradio UI for Multi-Persona AI Assistant
 Provides streaming responses, voice I/O, markdown rendering, and persona switching
 """
+import os
+import uuid
 import gradio as gr
-from typing import Generator, List, Tuple, Optional
-from main.mcp import MCP
-from main.personas import Persona
-from main.tools import NoteTaker, Search, Summarizer, TaskManager
+import html
+from typing import Dict
+from main.bootstrap import build_mcp
+from main.cancellation import CancellationToken
+from main.prefetch import Prefetcher
+from web.history import HistoryStore
 from web.ui import UIHelper
 
 # Custom CSS (unchanged from Claude’s version)
@@ -66,6 +70,9 @@ body {
     text-align: right;
     border-bottom-right-radius: 5px;
 }
+.message.assistant.streaming {
+    white-space: pre-wrap;  /* Raw text until the finished reply is rendered as markdown */
+}
 .message.assistant {
     background: #ffffff;
     color: #333;
@@ -169,100 +176,23 @@ body {
 }
 """
 
-# JavaScript (unchanged from Claude’s version)
-VOICE_JS = """
-<script>
-let recognition = null;
-let synthesis = window.speechSynthesis;
-
-function initVoiceRecognition() {
-    if ('webkitSpeechRecognition' in window || 'SpeechRecognition' in window) {
-        const SpeechRecognition = window.SpeechRecognition || window.webkitSpeechRecognition;
-        recognition = new SpeechRecognition();
-        recognition.continuous = false;
-        recognition.interimResults = false;
-        recognition.lang = 'en-US';
-        
-        recognition.onstart = function() {
-            console.log('Voice recognition started');
-            const voiceBtn = document.querySelector('.voice-input-btn');
-            if (voiceBtn) {
-                voiceBtn.style.background = 'linear-gradient(135deg, #dc3545, #c82333)';
-                voiceBtn.innerHTML = '🔴 Listening...';
-            }
-        };
-        
-        recognition.onresult = function(event) {
-            const transcript = event.results[0][0].transcript;
-            const messageInput = document.querySelector('#message-input textarea');
-            if (messageInput) {
-                messageInput.value = transcript;
-                messageInput.dispatchEvent(new Event('input', { bubbles: true }));
-            }
-        };
-        
-        recognition.onend = function() {
-            const voiceBtn = document.querySelector('.voice-input-btn');
-            if (voiceBtn) {
-                voiceBtn.style.background = 'linear-gradient(135deg, #17a2b8, #138496)';
-                voiceBtn.innerHTML = '🎤 Voice';
-            }
-        };
-        
-        recognition.onerror = function(event) {
-            console.error('Voice recognition error:', event.error);
-            const voiceBtn = document.querySelector('.voice-input-btn');
-            if (voiceBtn) {
-                voiceBtn.style.background = 'linear-gradient(135deg, #17a2b8, #138496)';
-                voiceBtn.innerHTML = '🎤 Voice';
-            }
-        };
-    }
-}
+# Voice input, 🔊 playback and streaming speech (web/static/voice.js), inlined into the page head
+VOICE_JS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "voice.js")
 
-function startVoiceInput() {
-    if (recognition) {
-        recognition.start();
-    } else {
-        alert('Voice recognition not supported in this browser');
-    }
-}
-
-function speakText(text) {
-    if (synthesis) {
-        synthesis.cancel();
-        const utterance = new SpeechSynthesisUtterance(text);
-        utterance.rate = 0.9;
-        utterance.pitch = 1;
-        utterance.volume = 0.8;
-        synthesis.speak(utterance);
-    }
-}
 
-document.addEventListener('DOMContentLoaded', function() {
-    initVoiceRecognition();
-});
+def load_voice_js() -> str:
+    """Page-head script tag with web/static/voice.js."""
+    with open(VOICE_JS_PATH, encoding="utf-8") as f:
+        return f"<script>\n{f.read()}\n</script>"
 
-setInterval(function() {
-    if (!recognition) {
-        initVoiceRecognition();
-    }
-}, 1000);
-</script>
-"""
 
 def create_interface():
     """Create the Gradio interface for the AI assistant."""
     # Initialize MCP and UI helper
-    tools = [NoteTaker(), Search(), Summarizer(), TaskManager()]
-    personas = [
-        Persona(name="generalist", color="#28a745", tone="neutral", tools=tools, memory=None),
-        Persona(name="zen_monk", color="#6f42c1", tone="calm", tools=tools, memory=None),
-        Persona(name="shakespeare", color="#dc3545", tone="poetic", tools=tools, memory=None),
-        Persona(name="quantum_mentor", color="#007bff", tone="technical", tools=tools, memory=None)
-    ]
-    mcp = MCP(personas=personas, tools=tools, memory=None)
-    ui_helper = UIHelper(personas, mcp)
+    mcp = build_mcp()  # Each browser session's history lives in one memory shard file
+    ui_helper = UIHelper(list(mcp.personas.values()), mcp)
+    history_store = HistoryStore()  # Chat turns per browser session, kept off the wire
+    prefetcher = Prefetcher(mcp)  # Warms memory, @search and the model while the user types
 
     # Custom theme
     theme = gr.themes.Soft(
@@ -272,7 +202,7 @@ def create_interface():
         font=("Segoe UI", "system-ui", "sans-serif")
     )
 
-    with gr.Blocks(css=CUSTOM_CSS, theme=theme, title="Multi-Persona AI Assistant", head=VOICE_JS) as app:
+    with gr.Blocks(css=CUSTOM_CSS, theme=theme, title="Multi-Persona AI Assistant", head=load_voice_js()) as app:
         gr.HTML('<div class="header-title">🧠 Multi-Persona AI Assistant</div>')
         gr.Markdown("""
         Welcome to your intelligent assistant! Choose a persona, type your message, or use voice input.
@@ -281,6 +211,7 @@ def create_interface():
 
         # State management
         current_persona = gr.State("generalist")
+        shown_turns = gr.State(history_store.window)  # Turns of server-side history shown in the Chatbot
 
         # Main interface
         with gr.Row():
@@ -297,6 +228,8 @@ def create_interface():
                 )
 
             with gr.Column(scale=3):
+                load_older_btn = gr.Button("⬆️ Load older messages", visible=False, size="sm",
+                                           elem_classes=["load-older-btn"])
                 chatbot = gr.Chatbot(
                     value=ui_helper.get_welcome_message("generalist"),
                     elem_id="chatbot",
@@ -305,6 +238,7 @@ def create_interface():
                     container=True,
                     render_markdown=False
                 )
+                live_message = gr.HTML("", elem_id="live-message")  # Reply being streamed
 
         # Input controls
         with gr.Row(elem_classes=["input-row"]):
@@ -322,75 +256,151 @@ def create_interface():
 
         with gr.Row():
             clear_btn = gr.Button("🗑️ Clear Chat", elem_classes=["clear-btn"], size="sm")
+            streaming_voice = gr.Checkbox(label="🔊 Speak replies as they stream", value=False,
+                                          elem_id="streaming-voice")
+            prefetch_enabled = gr.Checkbox(label="⚡ Prefetch while typing", value=False,
+                                           elem_id="prefetch-toggle")
             gr.Markdown("**Tips**: Use Enter to send • Click 🔊 to hear responses • Try voice input with 🎤")
 
-        # Event handlers
-        def send_message_wrapper(message: str, history: List[Tuple[str, str]], persona_display: str):
-            if not message.strip():
-                yield history, ""
-                return
+        # In-flight request per browser session, cancelled by a new message or Clear
+        active_requests: Dict[str, CancellationToken] = {}
+
+        def cancel_active_request(request: gr.Request):
+            token = active_requests.pop(request.session_hash, None)
+            if token:
+                token.cancel()
 
-            # Get persona key
-            persona_key = "generalist"
+        def history_window(session_id: str, shown: int):
+            """Chatbot value (recent turns only) and the load-older button state."""
+            return (history_store.recent(session_id, shown),
+                    gr.update(visible=history_store.older_count(session_id, shown) > 0))
+
+        def persona_key_for(persona_display: str) -> str:
             for display, key in ui_helper.get_persona_choices():
                 if display == persona_display:
-                    persona_key = key
-                    break
+                    return key
+            return "generalist"
+
+        # Event handlers
+        def prefetch_wrapper(message: str, persona_display: str, enabled: bool, request: gr.Request):
+            """Debounced warm-up for the message being typed (opt-in)."""
+            if not enabled:
+                return
+            session_id = request.session_hash
+            prefetcher.schedule(session_id, message,
+                                {"current_persona": persona_key_for(persona_display), "session_id": session_id})
+
+        def send_message_wrapper(message: str, persona_display: str, shown: int, request: gr.Request):
+            session_id = request.session_hash
+            prefetcher.settle(session_id, message)  # Prefetch for text that was edited away is dropped
+            if not message.strip():
+                yield gr.skip(), gr.skip(), gr.skip(), ""
+                return
 
-            # Add user message
-            user_msg = ui_helper.format_message(message, is_user=True)
-            history.append((user_msg, None))
-            yield history, ""
+            cancel_active_request(request)
+            cancel_token = CancellationToken()
+            active_requests[session_id] = cancel_token
+            persona_key = persona_key_for(persona_display)
 
-            # Show thinking indicator
+            # Add user message; the reply streams into the live panel until it is complete
+            if not history_store.has(session_id):
+                history_store.reset(session_id, ui_helper.get_welcome_message(persona_key))
+            turn = history_store.append(session_id, ui_helper.format_message(message, is_user=True))
             thinking_msg = ui_helper.format_message("🤔 Assistant is thinking...", is_user=False, persona_name=persona_key)
-            history[-1] = (history[-1][0], thinking_msg)
-            yield history, ""
+            yield *history_window(session_id, shown), thinking_msg, ""
 
+            full_response = ""
+            stream_id = uuid.uuid4().hex  # Lets voice.js follow this reply across re-renders
+            live_html = ui_helper.format_stream_start(persona_key, stream_id)
+            reply = None
             try:
-                # Stream response
-                full_response = ""
-                for chunk in mcp.process_input(message, {"current_persona": persona_key}):
+                # Stream response; closing this generator (disconnect, Clear) closes the upstream stream
+                context = {"current_persona": persona_key, "session_id": session_id}
+                for chunk in mcp.process_input(message, context, cancel_token=cancel_token):
                     full_response += chunk
-                    history[-1] = (history[-1][0], ui_helper.format_message(full_response, is_user=False, persona_name=persona_key))
-                    yield history, ""
+                    # Append-only live message: Gradio sends just the new chunk, and the Chatbot is skipped
+                    live_html += html.escape(chunk)
+                    yield gr.skip(), gr.skip(), live_html, gr.skip()
+                reply = ui_helper.format_message(full_response, is_user=False, persona_name=persona_key,
+                                                 stream_id=stream_id)
             except Exception as e:
-                error_msg = ui_helper.format_message(f"❌ Error: {str(e)}", is_user=False, persona_name=persona_key)
-                history[-1] = (history[-1][0], error_msg)
-                yield history, ""
+                reply = ui_helper.format_message(f"❌ Error: {str(e)}", is_user=False, persona_name=persona_key)
+            finally:
+                cancel_token.cancel()
+                if active_requests.get(session_id) is cancel_token:
+                    del active_requests[session_id]
+                if reply is None:  # Closed mid-stream: keep what arrived
+                    reply = ui_helper.format_message(full_response, is_user=False, persona_name=persona_key,
+                                                     stream_id=stream_id)
+                history_store.set_reply(turn, reply)
+            yield *history_window(session_id, shown), "", gr.skip()
+
+        def load_older(shown: int, request: gr.Request):
+            shown += history_store.page_size
+            return *history_window(request.session_hash, shown), shown
+
+        def reset_history(persona_key: str, request: gr.Request):
+            """Start the session over with the persona's welcome message."""
+            welcome = ui_helper.get_welcome_message(persona_key)
+            history_store.reset(request.session_hash, welcome)
+            return welcome, gr.update(visible=False), history_store.window
+
+        def clear_chat_wrapper(request: gr.Request):
+            cancel_active_request(request)
+            prefetcher.settle(request.session_hash)
+            return "", ""
 
         persona_selector.change(
             fn=ui_helper.update_persona_info,
             inputs=persona_selector,
             outputs=[persona_info, current_persona]
         ).then(
-            fn=ui_helper.get_welcome_message,
+            fn=reset_history,
             inputs=current_persona,
-            outputs=chatbot
+            outputs=[chatbot, load_older_btn, shown_turns]
         )
 
-        send_btn.click(
+        # The history lives server-side, so the Chatbot value is never uploaded
+        send_event = send_btn.click(
             fn=send_message_wrapper,
-            inputs=[message_input, chatbot, persona_selector],
-            outputs=[chatbot, message_input]
+            inputs=[message_input, persona_selector, shown_turns],
+            outputs=[chatbot, load_older_btn, live_message, message_input]
         )
 
-        message_input.submit(
+        submit_event = message_input.submit(
             fn=send_message_wrapper,
-            inputs=[message_input, chatbot, persona_selector],
-            outputs=[chatbot, message_input]
+            inputs=[message_input, persona_selector, shown_turns],
+            outputs=[chatbot, load_older_btn, live_message, message_input]
+        )
+
+        # Fires on user edits only (not when the box is cleared after sending); never queued behind chats
+        message_input.input(
+            fn=prefetch_wrapper,
+            inputs=[message_input, persona_selector, prefetch_enabled],
+            outputs=None,
+            trigger_mode="always_last",
+            concurrency_limit=None,
+            show_progress="hidden"
+        )
+
+        load_older_btn.click(
+            fn=load_older,
+            inputs=shown_turns,
+            outputs=[chatbot, load_older_btn, shown_turns]
         )
 
         clear_btn.click(
-            fn=ui_helper.clear_chat,
-            outputs=[chatbot, message_input]
+            fn=clear_chat_wrapper,
+            outputs=[live_message, message_input],
+            cancels=[send_event, submit_event]
         ).then(
-            fn=ui_helper.get_welcome_message,
+            fn=reset_history,
             inputs=current_persona,
-            outputs=chatbot
+            outputs=[chatbot, load_older_btn, shown_turns]
         )
 
         voice_btn.click(fn=None, js="startVoiceInput")
+        streaming_voice.change(fn=None, inputs=streaming_voice, js="setStreamingSpeech")
 
     return app
 
@@ -3,6 +3,19 @@
 let recognition = null;
 let synthesis = window.speechSynthesis;
 
+// Streaming speech: completed sentences are spoken while the reply is still generating
+const MAX_QUEUED_UTTERANCES = 4;  // Further sentences are merged into the last queued utterance
+const SPEECH_CHECK_DELAY = 50;    // ms; coalesces the per-token DOM updates
+let streamingSpeech = false;
+let speechQueue = [];
+let currentUtterance = null;      // Held so the browser cannot garbage-collect it mid-sentence
+let activeStreamId = null;
+let spokenLength = 0;             // Characters of the active message already queued
+let streamStartedAt = 0;          // First render of the active reply, for time-to-first-audio
+let chatObserver = null;
+let speechCheckPending = false;
+let missingChecks = 0;
+
 function initVoiceRecognition() {
     if ('SpeechRecognition' in window || 'webkitSpeechRecognition' in window) {
         const SpeechRecognition = window.SpeechRecognition || window.webkitSpeechRecognition;
@@ -48,8 +61,8 @@ function initVoiceRecognition() {
             }
         };
     } else {
+        // Retried every second below; startVoiceInput() tells the user
         console.warn('SpeechRecognition not supported');
-        alert('Voice recognition is not supported in this browser');
     }
 }
 
@@ -61,22 +74,186 @@ function startVoiceInput() {
     }
 }
 
+function makeUtterance(text) {
+    const utterance = new SpeechSynthesisUtterance(text);
+    utterance.rate = 0.9;
+    utterance.pitch = 1;
+    utterance.volume = 0.8;
+    return utterance;
+}
+
+function stopSpeech() {
+    speechQueue = [];
+    currentUtterance = null;
+    if (synthesis) {
+        synthesis.cancel();
+    }
+}
+
 function speakText(text) {
     if (synthesis) {
-        synthesis.cancel(); // Cancel ongoing speech
-        const utterance = new SpeechSynthesisUtterance(text);
-        utterance.rate = 0.9;
-        utterance.pitch = 1;
-        utterance.volume = 0.8;
-        synthesis.speak(utterance);
+        stopSpeech(); // Cancel ongoing speech, including a streaming queue
+        currentUtterance = makeUtterance(text);
+        synthesis.speak(currentUtterance);
     } else {
         alert('Text-to-speech not supported in this browser');
     }
 }
 
+// Readable text of a rendered message, without code blocks or the 🔊 button
+function messageText(element) {
+    const copy = element.cloneNode(true);
+    copy.querySelectorAll('button, pre').forEach((node) => node.remove());
+    return copy.textContent;
+}
+
+// 🔊 button: reads the rendered message instead of a copy inlined into the markup
+function speakMessage(button) {
+    const message = button.closest('.message');
+    if (message) {
+        speakText(messageText(message).trim());
+    }
+}
+
+function enqueueSpeech(text) {
+    text = text.trim();
+    if (!text || !synthesis) {
+        return;
+    }
+    if (speechQueue.length >= MAX_QUEUED_UTTERANCES) {
+        speechQueue[speechQueue.length - 1] += ' ' + text;
+    } else {
+        speechQueue.push(text);
+    }
+    if (!currentUtterance) {
+        speakNext();
+    }
+}
+
+function speakNext() {
+    const text = speechQueue.shift();
+    if (text === undefined) {
+        currentUtterance = null;
+        return;
+    }
+    if (streamStartedAt) {
+        console.debug(`Time to first audio: ${Math.round(performance.now() - streamStartedAt)} ms`);
+        streamStartedAt = 0;
+    }
+    const utterance = makeUtterance(text);
+    utterance.onend = utterance.onerror = () => {
+        if (currentUtterance === utterance) {
+            speakNext();
+        }
+    };
+    currentUtterance = utterance;
+    synthesis.speak(utterance);
+}
+
+// Length of the prefix ending at the last complete sentence (or line), 0 if none
+function completedLength(text) {
+    const boundary = /[.!?…]+["'”’)\]]*\s+|\n+/g;
+    let end = 0;
+    let match;
+    while ((match = boundary.exec(text)) !== null) {
+        end = match.index + match[0].length;
+    }
+    return end;
+}
+
+// Reply being streamed (live panel), else the active reply once it has moved into the history
+function findStreamingMessage() {
+    const live = document.querySelector('#live-message .message.assistant');
+    if (live || !activeStreamId) {
+        return live;
+    }
+    return document.querySelector(`#chatbot .message.assistant[data-stream-id="${activeStreamId}"]`);
+}
+
+function checkStreamingSpeech() {
+    speechCheckPending = false;
+    if (!streamingSpeech) {
+        return;
+    }
+    const latest = findStreamingMessage();
+    if (!latest) {
+        // The reply left the page (Clear, persona switch). Check once more first, in case
+        // the history and live panel were caught between updates
+        if (activeStreamId && ++missingChecks < 2) {
+            scheduleSpeechCheck();
+        } else if (activeStreamId) {
+            stopSpeech();
+            activeStreamId = null;
+        }
+        return;
+    }
+    missingChecks = 0;
+    const streamId = latest.dataset.streamId;
+    const complete = latest.dataset.complete === 'true';
+
+    if (streamId !== activeStreamId) {
+        // New message or thinking indicator: drop whatever was playing
+        stopSpeech();
+        activeStreamId = streamId;
+        spokenLength = 0;
+        streamStartedAt = streamId && !complete ? performance.now() : 0;
+        if (streamId && complete) {
+            spokenLength = messageText(latest).length; // Already finished before we saw it
+        }
+    }
+    if (!streamId) {
+        return;
+    }
+
+    const text = messageText(latest);
+    const end = complete ? text.length : completedLength(text);
+    if (end > spokenLength) {
+        enqueueSpeech(text.slice(spokenLength, end));
+        spokenLength = end;
+    }
+}
+
+function scheduleSpeechCheck() {
+    if (!speechCheckPending) {
+        speechCheckPending = true;
+        setTimeout(checkStreamingSpeech, SPEECH_CHECK_DELAY);
+    }
+}
+
+// The reply streams in #live-message and then moves into #chatbot, so both are watched
+const OBSERVED_SELECTORS = ['#chatbot', '#live-message'];
+
+function observeChat() {
+    if (!chatObserver) {
+        chatObserver = new MutationObserver(scheduleSpeechCheck);
+        chatObserver.targets = new WeakSet();
+    }
+    OBSERVED_SELECTORS.forEach((selector) => {
+        const element = document.querySelector(selector);
+        if (element && !chatObserver.targets.has(element)) {  // Gradio may replace the element
+            chatObserver.observe(element, { childList: true, subtree: true, characterData: true, attributes: true });
+            chatObserver.targets.add(element);
+        }
+    });
+}
+
+function setStreamingSpeech(enabled) {
+    streamingSpeech = Boolean(enabled);
+    stopSpeech();
+    activeStreamId = null;
+    if (streamingSpeech) {
+        if (!synthesis) {
+            alert('Text-to-speech not supported in this browser');
+        }
+        checkStreamingSpeech(); // Adopts the latest message without re-reading it if finished
+    }
+    return enabled;
+}
+
 // Initialize on page load
 document.addEventListener('DOMContentLoaded', () => {
     initVoiceRecognition();
+    observeChat();
 });
 
 // Re-initialize after Gradio updates
@@ -84,5 +261,5 @@ setInterval(() => {
     if (!recognition) {
         initVoiceRecognition();
     }
+    observeChat();
 }, 1000);
-
@@ -3,6 +3,7 @@
 Helper functions for Gradio UI rendering and state management in the AI assistant system.
 Supports markdown rendering, persona styling, and voice integration.
 """
+import html
 import markdown
 from typing import List, Tuple, Dict, Optional
 from main.personas import Persona
@@ -24,7 +25,8 @@ class UIHelper:
         self.mcp = mcp
         self.markdown_extensions = ['codehilite', 'fenced_code']
 
-    def format_message(self, content: str, is_user: bool, persona_name: str = None) -> str:
+    def format_message(self, content: str, is_user: bool, persona_name: str = None,
+                       stream_id: Optional[str] = None, complete: bool = True) -> str:
         """
         Format message with HTML styling and persona-specific colors.
 
@@ -32,6 +34,9 @@ class UIHelper:
             content: Message content.
             is_user: True if user message, False for assistant.
             persona_name: Name of the current persona (optional).
+            stream_id: Id of a streamed reply; voice.js speaks its completed
+                sentences while it grows (optional).
+            complete: False while the reply is still streaming.
 
         Returns:
             HTML-formatted message string.
@@ -41,12 +46,32 @@ class UIHelper:
         else:
             html_content = markdown.markdown(content, extensions=self.markdown_extensions)
             persona_class = f"persona-{persona_name.lower()}" if persona_name else ""
-            voice_btn = (
-                f'<button class="voice-btn" '
-                f'onclick="speakText(`{content.replace("`", "").replace("'", "")}`)" '
-                f'title="Speak this message">🔊</button>'
+            stream_attrs = (
+                f' data-stream-id="{html.escape(stream_id)}" data-complete="{str(complete).lower()}"'
+                if stream_id else ""
             )
-            return f'<div class="message assistant {persona_class}">{html_content}{voice_btn}</div>'
+            # The button reads the rendered message, so the text is not repeated in the markup
+            voice_btn = '<button class="voice-btn" onclick="speakMessage(this)" title="Speak this message">🔊</button>'
+            return f'<div class="message assistant {persona_class}"{stream_attrs}>{html_content}{voice_btn}</div>'
+
+    def format_stream_start(self, persona_name: str, stream_id: str) -> str:
+        """
+        Opening markup of a reply while it streams.
+
+        The streamed text is appended to it as html.escape(chunk) with no
+        closing tags (the browser closes them), so every update extends the
+        previous one and Gradio sends only the appended delta. Markdown is
+        rendered once, by format_message(), when the reply is complete.
+
+        Args:
+            persona_name: Name of the current persona.
+            stream_id: Id voice.js uses to follow the reply.
+
+        Returns:
+            HTML prefix for the live message.
+        """
+        return (f'<div class="message assistant streaming persona-{persona_name.lower()}"'
+                f' data-stream-id="{html.escape(stream_id)}" data-complete="false">')
 
     def get_welcome_message(self, persona_name: str) -> List[Tuple[Optional[str], str]]:
         """
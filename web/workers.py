@@ -0,0 +1,255 @@
+# web/workers.py
+"""
+Multi-process deployment: N worker processes (API server or Gradio UI) on
+private ports behind one public port.
+
+The front process is a small aiohttp proxy with sticky routing. A session
+(X-Session-Id header, "session_id" in a JSON body, or a routing cookie for
+browsers) always reaches the same worker, so per-session state such as the
+memory write-through cache and Gradio session state stays local to one
+process. Workers share the sharded SQLite memory (WAL) and a SQLite response
+cache (main.shared_cache). Dead workers are restarted; while one is down its
+sessions go to the next live worker. Session ids are client-supplied, so only
+short ids of safe characters are used for routing; anything else routes like a
+request without one. API workers trust the proxy's X-Forwarded-For, so their
+per-client limits still see the real client address.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+from main.shared_cache import SHARED_CACHE_ENV
+
+ROUTE_COOKIE = "quietedge_worker"
+MAX_ROUTED_BODY = 64 * 1024  # Larger JSON bodies are not inspected for session_id
+SESSION_ID_PATTERN = re.compile(r"[A-Za-z0-9_.:-]{1,128}")
+HOP_BY_HOP = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailer",
+    "transfer-encoding", "upgrade", "host", "content-length",
+}
+
+
+class Worker:
+    """One supervised worker process."""
+
+    def __init__(self, index: int, port: int, command: List[str], env: Dict[str, str]):
+        self.index = index
+        self.port = port
+        self.command = command
+        self.env = env
+        self.process: Optional[subprocess.Popen] = None
+        self.restarts = 0
+
+    def start(self):
+        self.process = subprocess.Popen(self.command, env=self.env)
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def ready(self) -> bool:
+        """True once the worker accepts connections."""
+        try:
+            with socket.create_connection(("127.0.0.1", self.port), timeout=0.2):
+                return True
+        except OSError:
+            return False
+
+    def stop(self, timeout: float = 10.0):
+        if not self.alive:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+class StickyProxy:
+    """Reverse proxy that pins each session to one worker."""
+
+    def __init__(self, workers: List[Worker], supervise_interval: float = 1.0):
+        """
+        Initialize the proxy.
+
+        Args:
+            workers: Worker processes to route to (started by the proxy).
+            supervise_interval: Seconds between liveness checks.
+        """
+        self.workers = workers
+        self.supervise_interval = supervise_interval
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._supervisor: Optional[asyncio.Task] = None
+
+    def create_app(self) -> web.Application:
+        app = web.Application(client_max_size=MAX_ROUTED_BODY * 16)
+        app.router.add_route("*", "/{path:.*}", self.handle)
+        app.on_startup.append(self._on_startup)
+        app.on_shutdown.append(self._on_shutdown)
+        return app
+
+    def pick(self, request: web.Request, body: bytes) -> Worker:
+        """
+        Worker for a request: by session id, then routing cookie, then client address.
+
+        Args:
+            request: Incoming request.
+            body: Request body (inspected for a JSON session_id).
+
+        Returns:
+            A live worker (the preferred one unless it is down).
+        """
+        key = valid_session_id(request.headers.get("X-Session-Id")) or self._body_session(request, body)
+        cookie = request.cookies.get(ROUTE_COOKIE, "")
+        if key:
+            start = self._hash(key)
+        elif cookie.isdigit() and int(cookie) < len(self.workers):
+            start = int(cookie)
+        else:
+            start = self._hash(request.remote or "")
+        for offset in range(len(self.workers)):
+            worker = self.workers[(start + offset) % len(self.workers)]
+            if worker.alive:
+                return worker
+        raise web.HTTPServiceUnavailable(text="No live workers")
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        body = await request.read()
+        worker = self.pick(request, body)
+        url = f"http://127.0.0.1:{worker.port}{request.rel_url}"
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP}
+        headers["X-Forwarded-For"] = request.remote or ""
+
+        if request.headers.get("Upgrade", "").lower() == "websocket":
+            return await self._relay_websocket(request, url, headers)
+
+        try:
+            upstream = await self._session.request(
+                request.method, url, headers=headers, data=body or None, allow_redirects=False
+            )
+        except aiohttp.ClientError as e:
+            raise web.HTTPBadGateway(text=f"Worker {worker.index} unavailable: {str(e)}")
+        try:
+            response = web.StreamResponse(status=upstream.status, reason=upstream.reason)
+            for name, value in upstream.headers.items():
+                if name.lower() not in HOP_BY_HOP:
+                    response.headers.add(name, value)
+            if request.cookies.get(ROUTE_COOKIE) != str(worker.index):
+                response.set_cookie(ROUTE_COOKIE, str(worker.index), httponly=True, samesite="Lax")
+            if upstream.headers.get("Content-Length"):
+                response.content_length = int(upstream.headers["Content-Length"])
+            await response.prepare(request)
+            async for chunk in upstream.content.iter_any():
+                await response.write(chunk)  # Streams SSE/NDJSON through without buffering
+            await response.write_eof()
+            return response
+        finally:
+            upstream.release()
+
+    async def _relay_websocket(self, request: web.Request, url: str, headers: Dict[str, str]) -> web.WebSocketResponse:
+        client_ws = web.WebSocketResponse()
+        await client_ws.prepare(request)
+        headers = {k: v for k, v in headers.items() if not k.lower().startswith("sec-websocket")}
+        async with self._session.ws_connect(url, headers=headers) as worker_ws:
+            async def pump(source, sink):
+                async for message in source:
+                    if message.type == aiohttp.WSMsgType.TEXT:
+                        await sink.send_str(message.data)
+                    elif message.type == aiohttp.WSMsgType.BINARY:
+                        await sink.send_bytes(message.data)
+                    else:
+                        break
+                await sink.close()
+
+            await asyncio.gather(pump(client_ws, worker_ws), pump(worker_ws, client_ws), return_exceptions=True)
+        return client_ws
+
+    async def _on_startup(self, app: web.Application):
+        self._session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=5),
+            auto_decompress=False,
+            cookie_jar=aiohttp.DummyCookieJar(),
+        )
+        for worker in self.workers:
+            worker.start()
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline and not all(w.ready() or not w.alive for w in self.workers):
+            await asyncio.sleep(0.2)
+        self._supervisor = asyncio.create_task(self._supervise())
+
+    async def _on_shutdown(self, app: web.Application):
+        if self._supervisor:
+            self._supervisor.cancel()
+        await asyncio.get_running_loop().run_in_executor(None, lambda: [w.stop() for w in self.workers])
+        await self._session.close()
+
+    async def _supervise(self):
+        while True:
+            await asyncio.sleep(self.supervise_interval)
+            for worker in self.workers:
+                if not worker.alive:
+                    worker.restarts += 1
+                    print(f"Worker {worker.index} exited; restarting (restart #{worker.restarts})")
+                    worker.start()
+
+    def _hash(self, key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big") % len(self.workers)
+
+    @staticmethod
+    def _body_session(request: web.Request, body: bytes) -> Optional[str]:
+        if not body or len(body) > MAX_ROUTED_BODY or "json" not in request.content_type:
+            return None
+        try:
+            data = json.loads(body)
+        except (ValueError, UnicodeDecodeError):
+            return None
+        session_id = data.get("session_id") if isinstance(data, dict) else None
+        return valid_session_id(session_id) if isinstance(session_id, str) else None
+
+
+def valid_session_id(session_id: Optional[str]) -> Optional[str]:
+    """``session_id`` if it is usable as a routing key, else None."""
+    if session_id and SESSION_ID_PATTERN.fullmatch(session_id):
+        return session_id
+    return None
+
+
+def build_workers(mode: str, count: int, base_port: int, shared_cache: str) -> List[Worker]:
+    """
+    Worker definitions for the launcher.
+
+    Args:
+        mode: 'api' (scripts/launch_api_server.py) or 'ui' (scripts/launch_web_ui.py).
+        count: Number of worker processes.
+        base_port: First private port; workers use base_port .. base_port+count-1.
+        shared_cache: Response cache file shared by all workers.
+
+    Returns:
+        Unstarted workers.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = os.path.join(root, "scripts", "launch_api_server.py" if mode == "api" else "launch_web_ui.py")
+    env = dict(os.environ, **{SHARED_CACHE_ENV: os.path.abspath(shared_cache)})
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+    workers = []
+    for index in range(count):
+        port = base_port + index
+        command = [sys.executable, script, "--host", "127.0.0.1", "--port", str(port)]
+        if index > 0:
+            command.append("--no-maintenance")  # One process enforces retention on the shared shards
+        if mode == "ui":
+            command.append("--no-open-browser")
+        else:
+            command += ["--trusted-proxy", "127.0.0.1"]
+        workers.append(Worker(index, port, command, env))
+    return workers